@@ -10,11 +10,22 @@ verification systems can be plugged in later by replacing the stub components.
 
 from __future__ import annotations
 
+import asyncio
+import functools
+import hashlib
+import json
+import os
 import random
+import subprocess
 import textwrap
-from dataclasses import dataclass, field
+import threading
+import time
+import tracemalloc
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Protocol, Sequence, Tuple
 
 
 # ---------------------------------------------------------------------------
@@ -44,6 +55,15 @@ class PerturbationInstruction:
     suggested_parameters: Dict[str, Any] = field(default_factory=dict)
 
 
+@dataclass
+class PerturbationRequest:
+    """One prompt for the LLM agent, as grouped by batched generation."""
+
+    audio_path: Path
+    codec_info: CodecDetectionResult
+    previous_feedback: Optional[str] = None
+
+
 @dataclass
 class VerificationResult:
     """Result returned by the (stubbed) speaker verification system."""
@@ -53,6 +73,29 @@ class VerificationResult:
     reasoning: str
 
 
+@dataclass
+class StageTiming:
+    """Cost of one orchestrator stage (summed if it ran more than once)."""
+
+    stage: str
+    wall_s: float
+    cpu_s: float
+    calls: int = 1
+    memory_delta_kb: Optional[float] = None
+
+    def merge(self, other: "StageTiming") -> "StageTiming":
+        memory = None
+        if self.memory_delta_kb is not None or other.memory_delta_kb is not None:
+            memory = (self.memory_delta_kb or 0.0) + (other.memory_delta_kb or 0.0)
+        return StageTiming(
+            stage=self.stage,
+            wall_s=self.wall_s + other.wall_s,
+            cpu_s=self.cpu_s + other.cpu_s,
+            calls=self.calls + other.calls,
+            memory_delta_kb=memory,
+        )
+
+
 @dataclass
 class LoopStep:
     """Holds trace information for each iteration of the feedback loop."""
@@ -62,6 +105,8 @@ class LoopStep:
     perturbation: PerturbationInstruction
     verification: VerificationResult
     feedback: str
+    timings: Dict[str, StageTiming] = field(default_factory=dict)
+    candidates: List[Dict[str, Any]] = field(default_factory=list)
 
 
 @dataclass
@@ -72,6 +117,18 @@ class AgenticRunSummary:
     success: bool
     steps: List[LoopStep] = field(default_factory=list)
 
+    def best_step(self) -> Optional[LoopStep]:
+        """Step with the highest verification confidence, if any."""
+        return max(self.steps, key=lambda step: step.verification.confidence, default=None)
+
+    def stage_totals(self) -> Dict[str, StageTiming]:
+        """Per-stage timings summed over every step of the run."""
+        totals: Dict[str, StageTiming] = {}
+        for step in self.steps:
+            for name, timing in step.timings.items():
+                totals[name] = totals[name].merge(timing) if name in totals else timing
+        return totals
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert the run summary into serializable primitives."""
         return {
@@ -84,12 +141,116 @@ class AgenticRunSummary:
                     "perturbation": step.perturbation.__dict__,
                     "verification": step.verification.__dict__,
                     "feedback": step.feedback,
+                    "timings": {name: asdict(t) for name, t in step.timings.items()},
+                    "candidates": step.candidates,
                 }
                 for step in self.steps
             ],
+            "best_iteration": best.iteration if (best := self.best_step()) else None,
+            "profile": {name: asdict(t) for name, t in self.stage_totals().items()},
         }
 
 
+# ---------------------------------------------------------------------------
+# Instrumentation
+# ---------------------------------------------------------------------------
+
+
+class MetricsHook(Protocol):
+    """Receives every stage measurement as it is taken."""
+
+    def record(self, timing: StageTiming, context: Dict[str, Any]) -> None:
+        ...
+
+
+class JsonlMetricsSink:
+    """MetricsHook that appends one JSON line per stage call to a local file."""
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+
+    def record(self, timing: StageTiming, context: Dict[str, Any]) -> None:
+        record = {"timestamp": time.time(), **context, **asdict(timing)}
+        with self.path.open("a") as handle:
+            handle.write(json.dumps(record, default=str) + "\n")
+
+
+class StageProfiler:
+    """
+    Measures wall time, CPU time and (optionally) traced memory per stage.
+
+    Each measurement is merged into the dict passed to `stage()` and
+    forwarded to the registered hooks, so one profiler can be shared by
+    concurrent loops. CPU time is that of the thread running the stage
+    (`time.thread_time`), so stages on other threads are not counted in.
+    With `track_memory`, tracemalloc runs only while a stage is active,
+    unless something else already started it.
+    """
+
+    def __init__(
+        self,
+        hooks: Sequence[MetricsHook] = (),
+        track_memory: bool = False,
+    ) -> None:
+        self.hooks = list(hooks)
+        self.track_memory = track_memory
+        self._lock = threading.Lock()
+        self._active_stages = 0
+        self._owns_tracing = False
+
+    def _start_tracing(self) -> None:
+        with self._lock:
+            if self._active_stages == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._owns_tracing = True
+            self._active_stages += 1
+
+    def _stop_tracing(self) -> None:
+        with self._lock:
+            self._active_stages -= 1
+            if self._active_stages == 0 and self._owns_tracing:
+                # Tracing slows every allocation; don't leave it on between stages
+                tracemalloc.stop()
+                self._owns_tracing = False
+
+    @contextmanager
+    def stage(
+        self,
+        name: str,
+        into: Dict[str, StageTiming],
+        measure_cpu: bool = True,
+        **context: Any,
+    ) -> Iterator[StageTiming]:
+        """
+        Time the body as stage `name` and yield its StageTiming.
+
+        With measure_cpu=False the calling thread's CPU time is not measured
+        (awaited stages, whose work runs elsewhere); the body can add CPU time
+        measured elsewhere to the yielded timing's `cpu_s`.
+        """
+        if self.track_memory:
+            self._start_tracing()
+        timing = StageTiming(stage=name, wall_s=0.0, cpu_s=0.0)
+        memory_before = tracemalloc.get_traced_memory()[0] if self.track_memory else None
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield timing
+        finally:
+            timing.wall_s = time.perf_counter() - wall_start
+            if measure_cpu:
+                timing.cpu_s += time.thread_time() - cpu_start
+            if memory_before is not None:
+                timing.memory_delta_kb = (
+                    tracemalloc.get_traced_memory()[0] - memory_before
+                ) / 1024
+                self._stop_tracing()
+            with self._lock:
+                into[name] = into[name].merge(timing) if name in into else timing
+            for hook in self.hooks:
+                hook.record(timing, context)
+
+
 # ---------------------------------------------------------------------------
 # Component implementations (placeholders)
 # ---------------------------------------------------------------------------
@@ -132,6 +293,168 @@ class CodecDetector:
         )
 
 
+class FFprobeCodecDetector(CodecDetector):
+    """
+    Codec detector backed by ffprobe, as in the notebooks' `CodecDetector.detect`.
+
+    Falls back to the extension heuristics of `CodecDetector` when ffprobe is
+    missing or cannot read the file. Each call spawns a subprocess, so wrap it
+    in `CachedCodecDetector` for repeated use.
+    """
+
+    def __init__(self, timeout_s: float = 30.0) -> None:
+        self.timeout_s = timeout_s
+
+    def detect_codec(self, audio_path: Path) -> CodecDetectionResult:
+        cmd = [
+            "ffprobe", "-v", "quiet", "-print_format", "json",
+            "-show_format", "-show_streams", str(audio_path),
+        ]
+        try:
+            result = subprocess.run(
+                cmd, capture_output=True, text=True, check=True, timeout=self.timeout_s
+            )
+            data = json.loads(result.stdout)
+            stream = next(
+                (s for s in data.get("streams", []) if s.get("codec_type") == "audio"),
+                {},
+            )
+            format_info = data.get("format", {})
+        except (OSError, subprocess.SubprocessError, json.JSONDecodeError) as exc:
+            fallback = super().detect_codec(audio_path)
+            fallback.details.update({"heuristic": "ffprobe_fallback", "error": str(exc)})
+            return fallback
+
+        return CodecDetectionResult(
+            codec_name=stream.get("codec_name", "unknown"),
+            bitrate_kbps=int(stream.get("bit_rate") or format_info.get("bit_rate") or 0) // 1000,
+            channels=int(stream.get("channels", 1)),
+            sample_rate=int(stream.get("sample_rate", 16000)),
+            container=format_info.get("format_name", "").split(",")[0],
+            details={"filename": audio_path.name, "heuristic": "ffprobe"},
+        )
+
+
+class CachedCodecDetector:
+    """
+    Memoizing wrapper around any codec detector.
+
+    Results are keyed by (resolved path, mtime, size), so a file is probed
+    once per version rather than once per loop iteration. With `cache_path`
+    the cache is persisted as JSON and reused across runs; new entries are
+    written every `save_every` misses and on `close()` (or leaving a `with`
+    block), not on each miss. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        detector: Optional[CodecDetector] = None,
+        cache_path: Optional[Path | str] = None,
+        save_every: int = 64,
+    ) -> None:
+        self.detector = detector or CodecDetector()
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.save_every = max(1, save_every)
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._unsaved = 0
+        self.hits = 0
+        self.misses = 0
+        if self.cache_path and self.cache_path.exists():
+            with self.cache_path.open("r") as handle:
+                self._cache = json.load(handle)
+
+    @staticmethod
+    def _cache_key(audio_path: Path) -> Tuple[str, str]:
+        """(path key, version key); the version is empty for unreadable paths."""
+        path = Path(audio_path).expanduser().resolve()
+        try:
+            stat = path.stat()
+        except OSError:
+            return str(path), ""
+        return str(path), f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    def _lookup(self, audio_path: Path) -> Optional[CodecDetectionResult]:
+        path_key, version = self._cache_key(audio_path)
+        with self._lock:
+            entry = self._cache.get(path_key)
+            if entry is not None and entry["version"] == version:
+                self.hits += 1
+                result = entry["result"]
+                return CodecDetectionResult(**{**result, "details": dict(result["details"])})
+            self.misses += 1
+        return None
+
+    def _store(self, audio_path: Path, result: CodecDetectionResult) -> int:
+        """Add an entry; returns the number of entries not yet saved."""
+        path_key, version = self._cache_key(audio_path)
+        with self._lock:
+            self._cache[path_key] = {"version": version, "result": asdict(result)}
+            self._unsaved += 1
+            return self._unsaved
+
+    def save(self) -> None:
+        """Persist the cache to `cache_path` (no-op without one)."""
+        if self.cache_path is None:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path.with_suffix(f"{self.cache_path.suffix}.tmp")
+        with self._lock:
+            with tmp.open("w") as handle:
+                json.dump(self._cache, handle)
+            os.replace(tmp, self.cache_path)
+            self._unsaved = 0
+
+    def close(self) -> None:
+        """Save entries added since the last save."""
+        if self._unsaved:
+            self.save()
+
+    def __enter__(self) -> "CachedCodecDetector":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def detect_codec(self, audio_path: Path) -> CodecDetectionResult:
+        cached = self._lookup(audio_path)
+        if cached is not None:
+            return cached
+        result = self.detector.detect_codec(audio_path)
+        if self._store(audio_path, result) >= self.save_every:
+            self.save()
+        return result
+
+    def detect_many(
+        self,
+        audio_paths: Iterable[Path | str],
+        max_workers: int = 8,
+    ) -> Dict[Path, CodecDetectionResult]:
+        """
+        Probe many files in one pass, running only cache misses concurrently.
+
+        ffprobe takes a single input per call, so the batch is a pool of
+        probes followed by one cache write instead of one write per file.
+        """
+        paths = [Path(p) for p in audio_paths]
+        results: Dict[Path, CodecDetectionResult] = {}
+        misses = []
+        for path in paths:
+            cached = self._lookup(path)
+            if cached is None:
+                misses.append(path)
+            else:
+                results[path] = cached
+
+        if misses:
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+                for path, result in zip(misses, pool.map(self.detector.detect_codec, misses)):
+                    self._store(path, result)
+                    results[path] = result
+            self.save()
+        return results
+
+
 class PerturbationLLMAgent:
     """
     Placeholder multimodal LLM interface.
@@ -146,6 +469,7 @@ class PerturbationLLMAgent:
         "apply codec-specific quantization bias to vowel segments",
         "blend reversed phonemes with time-stretched whisper noise",
     )
+    MIX_DB_STEP = 3
 
     def generate_perturbation(
         self,
@@ -154,8 +478,10 @@ class PerturbationLLMAgent:
         previous_feedback: Optional[str] = None,
     ) -> PerturbationInstruction:
         seed_material = f"{audio_path.name}-{previous_feedback or ''}"
-        random.seed(seed_material)
-        prompt = random.choice(self.PROMPT_LIBRARY)
+        # Local generator: same sequence as seeding the global one, but safe
+        # when loops run concurrently in executor threads
+        rng = random.Random(seed_material)
+        prompt = rng.choice(self.PROMPT_LIBRARY)
         description = (
             f"Create perturbation optimized for {codec_info.codec_name} "
             f"({codec_info.container.upper()}, {codec_info.bitrate_kbps} kbps). "
@@ -186,6 +512,347 @@ class PerturbationLLMAgent:
             suggested_parameters=params,
         )
 
+    def generate_batch(
+        self, requests: Sequence[PerturbationRequest]
+    ) -> List[PerturbationInstruction]:
+        """Answer many prompts in one backend call (one call per prompt here)."""
+        return [
+            self.generate_perturbation(r.audio_path, r.codec_info, r.previous_feedback)
+            for r in requests
+        ]
+
+    def candidate_requests(
+        self,
+        audio_path: Path,
+        codec_info: CodecDetectionResult,
+        previous_feedback: Optional[str] = None,
+        k: int = 4,
+    ) -> List[PerturbationRequest]:
+        """The k prompts behind `generate_candidates`: the plain one, then variants."""
+        base_hint = previous_feedback or "initial_attempt"
+        return [
+            PerturbationRequest(
+                audio_path,
+                codec_info,
+                previous_feedback if i == 0 else f"{base_hint} (variant {i + 1})",
+            )
+            for i in range(max(1, k))
+        ]
+
+    def step_candidates(
+        self, candidates: List[PerturbationInstruction]
+    ) -> List[PerturbationInstruction]:
+        """Step variant i's mix level down by MIX_DB_STEP * i (in place)."""
+        for i, candidate in enumerate(candidates[1:], start=1):
+            params = candidate.suggested_parameters
+            params["mix_db"] = params.get("mix_db", -24) - self.MIX_DB_STEP * i
+        return candidates
+
+    def generate_candidates(
+        self,
+        audio_path: Path,
+        codec_info: CodecDetectionResult,
+        previous_feedback: Optional[str] = None,
+        k: int = 4,
+    ) -> List[PerturbationInstruction]:
+        """
+        Produce k alternative instructions for one prompt.
+
+        The first candidate is exactly what `generate_perturbation` returns;
+        the others come from variant prompts and step the mix level down by
+        MIX_DB_STEP each, standing in for a sampled LLM's diversity.
+        """
+        requests = self.candidate_requests(audio_path, codec_info, previous_feedback, k)
+        return self.step_candidates(self.generate_batch(requests))
+
+
+class LatencyLLMAgent(PerturbationLLMAgent):
+    """
+    PerturbationLLMAgent stand-in that adds a fixed response latency.
+
+    Lets batch and async runs be exercised locally with LLM-like waits; the
+    async variant sleeps without blocking the event loop.
+    """
+
+    def __init__(self, latency_s: float = 0.5) -> None:
+        self.latency_s = latency_s
+
+    def generate_perturbation(
+        self,
+        audio_path: Path,
+        codec_info: CodecDetectionResult,
+        previous_feedback: Optional[str] = None,
+    ) -> PerturbationInstruction:
+        time.sleep(self.latency_s)
+        return super().generate_perturbation(audio_path, codec_info, previous_feedback)
+
+    async def generate_perturbation_async(
+        self,
+        audio_path: Path,
+        codec_info: CodecDetectionResult,
+        previous_feedback: Optional[str] = None,
+    ) -> PerturbationInstruction:
+        await asyncio.sleep(self.latency_s)
+        return super().generate_perturbation(audio_path, codec_info, previous_feedback)
+
+    def generate_batch(
+        self, requests: Sequence[PerturbationRequest]
+    ) -> List[PerturbationInstruction]:
+        # A batched backend call pays the round-trip latency once
+        time.sleep(self.latency_s)
+        return [
+            PerturbationLLMAgent.generate_perturbation(
+                self, r.audio_path, r.codec_info, r.previous_feedback
+            )
+            for r in requests
+        ]
+
+
+def prompt_fingerprint(
+    audio_path: Path,
+    codec_info: CodecDetectionResult,
+    previous_feedback: Optional[str] = None,
+) -> str:
+    """
+    Stable hash of everything the agent's prompt depends on.
+
+    Feedback text is case- and whitespace-normalized so trivially different
+    hints share an entry; codec `details` are excluded as they are free-form.
+    """
+    payload = {
+        "file": Path(audio_path).name,
+        "codec": codec_info.codec_name.lower(),
+        "container": codec_info.container.lower(),
+        "bitrate_kbps": codec_info.bitrate_kbps,
+        "channels": codec_info.channels,
+        "sample_rate": codec_info.sample_rate,
+        "feedback": " ".join((previous_feedback or "").lower().split()),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class CachedLLMAgent:
+    """
+    Memoizing wrapper around a PerturbationLLMAgent.
+
+    Instructions are keyed by `prompt_fingerprint`, expire after `ttl_s`
+    seconds and are evicted least-recently-used beyond `max_entries`. With
+    `cache_path` the cache is persisted as JSON so repeated experiments over
+    the same dataset skip the backend entirely; new entries are written every
+    `save_every` misses (off the event loop in the async methods) and on
+    `close()` or leaving a `with` block. `generate_batch` and
+    `generate_candidates` send all cache misses to the wrapped agent in a
+    single batched call. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        agent: Optional[PerturbationLLMAgent] = None,
+        cache_path: Optional[Path | str] = None,
+        ttl_s: Optional[float] = 7 * 24 * 3600,
+        max_entries: int = 10_000,
+        save_every: int = 64,
+    ) -> None:
+        self.agent = agent or PerturbationLLMAgent()
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.save_every = max(1, save_every)
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._unsaved = 0
+        self.hits = 0
+        self.misses = 0
+        if self.cache_path and self.cache_path.exists():
+            with self.cache_path.open("r") as handle:
+                self._cache = json.load(handle)
+
+    def _lookup(self, fingerprint: str) -> Optional[PerturbationInstruction]:
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(fingerprint)
+            if entry is not None and self.ttl_s is not None and now - entry["created"] > self.ttl_s:
+                del self._cache[fingerprint]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry["last_used"] = now
+            instruction = entry["instruction"]
+        return PerturbationInstruction(
+            **{**instruction, "suggested_parameters": dict(instruction["suggested_parameters"])}
+        )
+
+    def _store(self, fingerprint: str, instruction: PerturbationInstruction) -> None:
+        now = time.time()
+        with self._lock:
+            self._cache[fingerprint] = {
+                "created": now,
+                "last_used": now,
+                "instruction": asdict(instruction),
+            }
+            self._unsaved += 1
+            overflow = len(self._cache) - self.max_entries
+            if overflow > 0:
+                oldest = sorted(self._cache, key=lambda k: self._cache[k]["last_used"])
+                for key in oldest[:overflow]:
+                    del self._cache[key]
+
+    def save(self) -> None:
+        """Persist the cache to `cache_path` (no-op without one)."""
+        if self.cache_path is None:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path.with_suffix(f"{self.cache_path.suffix}.tmp")
+        with self._lock:
+            with tmp.open("w") as handle:
+                json.dump(self._cache, handle)
+            os.replace(tmp, self.cache_path)
+            self._unsaved = 0
+
+    def _save_due(self) -> bool:
+        with self._lock:
+            return self.cache_path is not None and self._unsaved >= self.save_every
+
+    def close(self) -> None:
+        """Save entries added since the last save."""
+        if self._unsaved:
+            self.save()
+
+    def __enter__(self) -> "CachedLLMAgent":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def generate_perturbation(
+        self,
+        audio_path: Path,
+        codec_info: CodecDetectionResult,
+        previous_feedback: Optional[str] = None,
+    ) -> PerturbationInstruction:
+        fingerprint = prompt_fingerprint(audio_path, codec_info, previous_feedback)
+        cached = self._lookup(fingerprint)
+        if cached is not None:
+            return cached
+        instruction = self.agent.generate_perturbation(audio_path, codec_info, previous_feedback)
+        self._store(fingerprint, instruction)
+        if self._save_due():
+            self.save()
+        return instruction
+
+    async def generate_perturbation_async(
+        self,
+        audio_path: Path,
+        codec_info: CodecDetectionResult,
+        previous_feedback: Optional[str] = None,
+    ) -> PerturbationInstruction:
+        fingerprint = prompt_fingerprint(audio_path, codec_info, previous_feedback)
+        cached = self._lookup(fingerprint)
+        if cached is not None:
+            return cached
+        async_generate = getattr(self.agent, "generate_perturbation_async", None)
+        if async_generate is not None:
+            instruction = await async_generate(audio_path, codec_info, previous_feedback)
+        else:
+            instruction = await asyncio.to_thread(
+                self.agent.generate_perturbation, audio_path, codec_info, previous_feedback
+            )
+        self._store(fingerprint, instruction)
+        if self._save_due():
+            await asyncio.to_thread(self.save)
+        return instruction
+
+    def generate_batch(
+        self, requests: Sequence[PerturbationRequest]
+    ) -> List[PerturbationInstruction]:
+        """Serve hits from the cache and send every miss in one batched call."""
+        fingerprints = [
+            prompt_fingerprint(r.audio_path, r.codec_info, r.previous_feedback)
+            for r in requests
+        ]
+        results: List[Optional[PerturbationInstruction]] = [
+            self._lookup(fingerprint) for fingerprint in fingerprints
+        ]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            generated = self.agent.generate_batch([requests[i] for i in missing])
+            for i, instruction in zip(missing, generated):
+                self._store(fingerprints[i], instruction)
+                results[i] = instruction
+            if self._save_due():
+                self.save()
+        return results  # type: ignore[return-value]
+
+    async def generate_batch_async(
+        self, requests: Sequence[PerturbationRequest]
+    ) -> List[PerturbationInstruction]:
+        """`generate_batch` with the backend call run off the event loop."""
+        fingerprints = [
+            prompt_fingerprint(r.audio_path, r.codec_info, r.previous_feedback)
+            for r in requests
+        ]
+        results: List[Optional[PerturbationInstruction]] = [
+            self._lookup(fingerprint) for fingerprint in fingerprints
+        ]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            generated = await asyncio.to_thread(
+                self.agent.generate_batch, [requests[i] for i in missing]
+            )
+            for i, instruction in zip(missing, generated):
+                self._store(fingerprints[i], instruction)
+                results[i] = instruction
+            if self._save_due():
+                await asyncio.to_thread(self.save)
+        return results  # type: ignore[return-value]
+
+    def _candidate_requests(
+        self,
+        audio_path: Path,
+        codec_info: CodecDetectionResult,
+        previous_feedback: Optional[str],
+        k: int,
+    ) -> List[PerturbationRequest]:
+        candidate_requests = getattr(self.agent, "candidate_requests", None)
+        if candidate_requests is not None:
+            return candidate_requests(audio_path, codec_info, previous_feedback, k)
+        return PerturbationLLMAgent.candidate_requests(self.agent, audio_path, codec_info, previous_feedback, k)
+
+    def _step_candidates(
+        self, candidates: List[PerturbationInstruction]
+    ) -> List[PerturbationInstruction]:
+        step_candidates = getattr(self.agent, "step_candidates", None)
+        return step_candidates(candidates) if step_candidates is not None else candidates
+
+    def generate_candidates(
+        self,
+        audio_path: Path,
+        codec_info: CodecDetectionResult,
+        previous_feedback: Optional[str] = None,
+        k: int = 4,
+    ) -> List[PerturbationInstruction]:
+        """
+        The wrapped agent's k candidates, each variant prompt cached on its own.
+
+        Misses go to the backend in one batched call; the agent's per-variant
+        parameter stepping is applied to the returned copies, so cached entries
+        stay the agent's raw answers.
+        """
+        requests = self._candidate_requests(audio_path, codec_info, previous_feedback, k)
+        return self._step_candidates(self.generate_batch(requests))
+
+    async def generate_candidates_async(
+        self,
+        audio_path: Path,
+        codec_info: CodecDetectionResult,
+        previous_feedback: Optional[str] = None,
+        k: int = 4,
+    ) -> List[PerturbationInstruction]:
+        requests = self._candidate_requests(audio_path, codec_info, previous_feedback, k)
+        return self._step_candidates(await self.generate_batch_async(requests))
+
 
 class AudioPerturbationEngine:
     """
@@ -193,6 +860,7 @@ class AudioPerturbationEngine:
 
     Returns the same path alongside a metadata dictionary to mimic downstream
     processing artifacts. Real implementations would write modified audio.
+    The reported SNR is the nominal one of a mix at `mix_db`.
     """
 
     def apply(
@@ -200,12 +868,16 @@ class AudioPerturbationEngine:
         audio_path: Path,
         instruction: PerturbationInstruction,
     ) -> Dict[str, Any]:
-        return {
+        metadata = {
             "output_path": str(audio_path),
             "applied": True,
             "technique": instruction.target_codec,
             "parameters": instruction.suggested_parameters,
         }
+        mix_db = instruction.suggested_parameters.get("mix_db")
+        if mix_db is not None:
+            metadata["snr_db"] = -float(mix_db)
+        return metadata
 
 
 class SpeakerVerifierStub:
@@ -218,8 +890,7 @@ class SpeakerVerifierStub:
 
     def verify(self, audio_path: Path, metadata: Dict[str, Any]) -> VerificationResult:
         seed = f"{audio_path.name}-{metadata.get('technique')}-{metadata['parameters']['mix_db']}"
-        random.seed(seed)
-        confidence = random.uniform(0.3, 0.99)
+        confidence = random.Random(seed).uniform(0.3, 0.99)
         passed = confidence > 0.75
         reasoning = (
             "PASS: Voiceprint matches expected speaker."
@@ -229,6 +900,30 @@ class SpeakerVerifierStub:
         return VerificationResult(passed=passed, confidence=confidence, reasoning=reasoning)
 
 
+class ConstraintPrefilter:
+    """
+    Cheap quality gate applied to perturbation metadata before verification.
+
+    Rejects candidates whose reported `snr_db` or `stoi` falls below the
+    limits (the notebooks' MIN_SNR / MIN_STOI). Metrics the perturbation
+    engine does not report are not checked.
+    """
+
+    def __init__(self, min_snr_db: Optional[float] = 20.0, min_stoi: Optional[float] = 0.85) -> None:
+        self.min_snr_db = min_snr_db
+        self.min_stoi = min_stoi
+
+    def __call__(self, metadata: Dict[str, Any]) -> Optional[str]:
+        """Return a rejection reason, or None if the candidate may be verified."""
+        snr = metadata.get("snr_db")
+        if self.min_snr_db is not None and snr is not None and snr < self.min_snr_db:
+            return f"SNR {snr:.1f} dB below {self.min_snr_db:.1f} dB"
+        stoi = metadata.get("stoi")
+        if self.min_stoi is not None and stoi is not None and stoi < self.min_stoi:
+            return f"STOI {stoi:.3f} below {self.min_stoi:.3f}"
+        return None
+
+
 # ---------------------------------------------------------------------------
 # Feedback Orchestrator
 # ---------------------------------------------------------------------------
@@ -239,15 +934,18 @@ class FeedbackOrchestrator:
 
     def __init__(
         self,
-        detector: Optional[CodecDetector] = None,
+        detector: Optional[CodecDetector | CachedCodecDetector] = None,
         llm_agent: Optional[PerturbationLLMAgent] = None,
         perturb_engine: Optional[AudioPerturbationEngine] = None,
         verifier: Optional[SpeakerVerifierStub] = None,
+        profiler: Optional[StageProfiler] = None,
     ) -> None:
-        self.detector = detector or CodecDetector()
+        # The file's codec cannot change within a loop, so probe it once
+        self.detector = detector or CachedCodecDetector(CodecDetector())
         self.llm_agent = llm_agent or PerturbationLLMAgent()
         self.perturb_engine = perturb_engine or AudioPerturbationEngine()
         self.verifier = verifier or SpeakerVerifierStub()
+        self.profiler = profiler or StageProfiler()
 
     def run_feedback_loop(
         self,
@@ -266,41 +964,367 @@ class FeedbackOrchestrator:
         feedback_hint: Optional[str] = None
 
         for iteration in range(1, max_iterations + 1):
-            codec_info = self.detector.detect_codec(path)
-            perturb_instruction = self.llm_agent.generate_perturbation(
-                path, codec_info, previous_feedback=feedback_hint
-            )
-            perturb_metadata = self.perturb_engine.apply(path, perturb_instruction)
-            verification = self.verifier.verify(path, perturb_metadata)
+            timings: Dict[str, StageTiming] = {}
+            context = {"audio_path": str(path), "iteration": iteration}
+            with self.profiler.stage("detect", timings, **context):
+                codec_info = self.detector.detect_codec(path)
+            with self.profiler.stage("generate", timings, **context):
+                perturb_instruction = self.llm_agent.generate_perturbation(
+                    path, codec_info, previous_feedback=feedback_hint
+                )
+            with self.profiler.stage("perturb", timings, **context):
+                perturb_metadata = self.perturb_engine.apply(path, perturb_instruction)
+            with self.profiler.stage("verify", timings, **context):
+                verification = self.verifier.verify(path, perturb_metadata)
 
-            feedback_hint = (
-                "increase subtlety"
-                if not verification.passed
-                else "reinforce winning strategy"
+            feedback_hint = self._record_step(
+                summary, iteration, codec_info, perturb_instruction, verification, timings
             )
+            if verification.passed and verification.confidence >= target_confidence:
+                summary.success = True
+                break
 
-            loop_feedback = self._compose_feedback(
-                iteration=iteration,
-                verification=verification,
-                next_hint=feedback_hint,
-            )
+        return summary
+
+    async def run_feedback_loop_async(
+        self,
+        audio_path: Path | str,
+        max_iterations: int = 3,
+        target_confidence: float = 0.85,
+        executor: Optional[Executor] = None,
+    ) -> AgenticRunSummary:
+        """
+        Awaitable counterpart of `run_feedback_loop` with identical results.
+
+        Each stage awaits the component's `<method>_async` variant when it has
+        one (I/O-bound work such as LLM requests); otherwise the synchronous
+        method runs in `executor` (the loop's default thread pool if None).
+        Stage CPU time is what the executor thread spent on the call (zero
+        for awaited `_async` methods).
+        """
+        path = Path(audio_path).expanduser().resolve()
+        summary = AgenticRunSummary(audio_path=path, success=False)
+        feedback_hint: Optional[str] = None
 
-            summary.steps.append(
-                LoopStep(
-                    iteration=iteration,
-                    codec_result=codec_info,
-                    perturbation=perturb_instruction,
-                    verification=verification,
-                    feedback=loop_feedback,
+        for iteration in range(1, max_iterations + 1):
+            timings: Dict[str, StageTiming] = {}
+            context = {"audio_path": str(path), "iteration": iteration}
+            with self.profiler.stage("detect", timings, measure_cpu=False, **context) as timing:
+                codec_info = await self._call_stage(
+                    executor, timing, self.detector, "detect_codec", path
+                )
+            with self.profiler.stage("generate", timings, measure_cpu=False, **context) as timing:
+                perturb_instruction = await self._call_stage(
+                    executor, timing, self.llm_agent, "generate_perturbation",
+                    path, codec_info, previous_feedback=feedback_hint,
+                )
+            with self.profiler.stage("perturb", timings, measure_cpu=False, **context) as timing:
+                perturb_metadata = await self._call_stage(
+                    executor, timing, self.perturb_engine, "apply", path, perturb_instruction
+                )
+            with self.profiler.stage("verify", timings, measure_cpu=False, **context) as timing:
+                verification = await self._call_stage(
+                    executor, timing, self.verifier, "verify", path, perturb_metadata
                 )
-            )
 
+            feedback_hint = self._record_step(
+                summary, iteration, codec_info, perturb_instruction, verification, timings
+            )
             if verification.passed and verification.confidence >= target_confidence:
                 summary.success = True
                 break
 
         return summary
 
+    async def run_batch_async(
+        self,
+        audio_paths: Iterable[Path | str],
+        max_concurrency: int = 4,
+        max_iterations: int = 3,
+        target_confidence: float = 0.85,
+        executor: Optional[Executor] = None,
+    ) -> AsyncIterator[AgenticRunSummary]:
+        """
+        Run feedback loops for many files with at most `max_concurrency` active.
+
+        Yields each AgenticRunSummary as soon as its loop finishes, so results
+        arrive in completion order rather than input order:
+
+            async for summary in orchestrator.run_batch_async(paths):
+                print(summary.audio_path, summary.success)
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def run_one(audio_path: Path | str) -> AgenticRunSummary:
+            async with semaphore:
+                return await self.run_feedback_loop_async(
+                    audio_path, max_iterations, target_confidence, executor
+                )
+
+        tasks = [asyncio.ensure_future(run_one(audio_path)) for audio_path in audio_paths]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def run_search_loop(
+        self,
+        audio_path: Path | str,
+        max_iterations: int = 3,
+        target_confidence: float = 0.85,
+        candidates_per_iteration: int = 4,
+        max_workers: Optional[int] = None,
+        prefilter: Optional[Callable[[Dict[str, Any]], Optional[str]]] = ConstraintPrefilter(),
+        verify_batch_size: int = 2,
+    ) -> AgenticRunSummary:
+        """
+        Candidate-parallel variant of `run_feedback_loop`.
+
+        Each iteration asks the agent for `candidates_per_iteration`
+        instructions, then perturbs and verifies them concurrently. Candidates
+        the `prefilter` (by default `ConstraintPrefilter()`; None disables it)
+        rejects on cheap metrics skip verification. The iteration's LoopStep
+        records the best verified candidate (all candidates are traced in
+        `LoopStep.candidates`), and the search stops as soon as any candidate
+        reaches `target_confidence`, cancelling candidates that have not
+        started. Verifiers with a `verify_batch` method instead get the
+        candidates in order, `verify_batch_size` at a time (perturbed in
+        parallel, surviving ones scored in one call), and no further batch is
+        dispatched once one passes. With one candidate per iteration it
+        reproduces `run_feedback_loop`.
+        """
+        path = Path(audio_path).expanduser().resolve()
+        summary = AgenticRunSummary(audio_path=path, success=False)
+        feedback_hint: Optional[str] = None
+        k = max(1, candidates_per_iteration)
+
+        with ThreadPoolExecutor(max_workers=max_workers or k) as pool:
+            for iteration in range(1, max_iterations + 1):
+                timings: Dict[str, StageTiming] = {}
+                context = {"audio_path": str(path), "iteration": iteration}
+                with self.profiler.stage("detect", timings, **context):
+                    codec_info = self.detector.detect_codec(path)
+                with self.profiler.stage("generate", timings, **context):
+                    candidates = self._generate_candidates(path, codec_info, feedback_hint, k)
+
+                traces: List[Dict[str, Any]] = []
+                best: Optional[Tuple[PerturbationInstruction, VerificationResult]] = None
+                results = self._candidate_results(
+                    pool, path, candidates, prefilter, timings, context, verify_batch_size
+                )
+                for index, instruction, verification, trace in results:
+                    traces.append({"candidate": index, **trace})
+                    if verification is None:
+                        continue
+                    if best is None or verification.confidence > best[1].confidence:
+                        best = (instruction, verification)
+                    if verification.passed and verification.confidence >= target_confidence:
+                        results.close()
+                        break
+
+                if best is None:
+                    best = (
+                        candidates[0],
+                        VerificationResult(
+                            passed=False,
+                            confidence=0.0,
+                            reasoning="FAIL: Every candidate violated the quality constraints.",
+                        ),
+                    )
+
+                instruction, verification = best
+                feedback_hint = self._record_step(
+                    summary, iteration, codec_info, instruction, verification, timings
+                )
+                summary.steps[-1].candidates = sorted(traces, key=lambda t: t["candidate"])
+                if verification.passed and verification.confidence >= target_confidence:
+                    summary.success = True
+                    break
+
+        return summary
+
+    def _generate_candidates(
+        self,
+        path: Path,
+        codec_info: CodecDetectionResult,
+        feedback_hint: Optional[str],
+        k: int,
+    ) -> List[PerturbationInstruction]:
+        generate_candidates = getattr(self.llm_agent, "generate_candidates", None)
+        if generate_candidates is not None:
+            return generate_candidates(path, codec_info, feedback_hint, k)
+        # Agents without a candidate API still get k distinct prompts
+        return [
+            self.llm_agent.generate_perturbation(
+                path, codec_info,
+                previous_feedback=feedback_hint if i == 0 else f"{feedback_hint or 'initial_attempt'} (variant {i + 1})",
+            )
+            for i in range(k)
+        ]
+
+    def _candidate_results(
+        self,
+        pool: ThreadPoolExecutor,
+        path: Path,
+        candidates: List[PerturbationInstruction],
+        prefilter: Optional[Callable[[Dict[str, Any]], Optional[str]]],
+        timings: Dict[str, StageTiming],
+        context: Dict[str, Any],
+        batch_size: int,
+    ) -> Iterator[Tuple[int, PerturbationInstruction, Optional[VerificationResult], Dict[str, Any]]]:
+        """
+        Yield (index, instruction, verification, trace) as candidates finish.
+
+        Closing the generator early cancels candidates that have not started,
+        or with `verify_batch`, the batches that have not been dispatched.
+        """
+        verify_batch = getattr(self.verifier, "verify_batch", None)
+        if verify_batch is None:
+            futures = {
+                pool.submit(
+                    self._evaluate_candidate, path, candidate, prefilter, timings,
+                    {**context, "candidate": index},
+                ): index
+                for index, candidate in enumerate(candidates)
+            }
+            try:
+                for future in as_completed(futures):
+                    yield (futures[future], *future.result())
+            finally:
+                for pending in futures:
+                    pending.cancel()
+            return
+
+        batch_size = max(1, batch_size)
+        for start in range(0, len(candidates), batch_size):
+            indices = range(start, min(start + batch_size, len(candidates)))
+            perturbed = list(
+                pool.map(
+                    lambda index: self._perturb_candidate(
+                        path, candidates[index], prefilter, timings, {**context, "candidate": index}
+                    ),
+                    indices,
+                )
+            )
+            survivors = [i for i, (metadata, _) in enumerate(perturbed) if metadata is not None]
+            verifications: Dict[int, VerificationResult] = {}
+            if survivors:
+                with self.profiler.stage("verify", timings, **context, batch_size=len(survivors)):
+                    batch = verify_batch(path, [perturbed[i][0] for i in survivors])
+                verifications = dict(zip(survivors, batch))
+            for offset, (index, (_, trace)) in enumerate(zip(indices, perturbed)):
+                verification = verifications.get(offset)
+                if verification is not None:
+                    trace.update(self._verification_trace(verification))
+                yield index, candidates[index], verification, trace
+
+    def _perturb_candidate(
+        self,
+        path: Path,
+        instruction: PerturbationInstruction,
+        prefilter: Optional[Callable[[Dict[str, Any]], Optional[str]]],
+        timings: Dict[str, StageTiming],
+        context: Dict[str, Any],
+    ) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        """Perturb and prefilter one candidate; metadata is None if pruned."""
+        with self.profiler.stage("perturb", timings, **context):
+            metadata = self.perturb_engine.apply(path, instruction)
+        trace: Dict[str, Any] = {
+            "description": instruction.description,
+            "parameters": instruction.suggested_parameters,
+        }
+        rejection = prefilter(metadata) if prefilter else None
+        if rejection is not None:
+            trace.update({"status": "pruned", "reason": rejection})
+            return None, trace
+        return metadata, trace
+
+    @staticmethod
+    def _verification_trace(verification: VerificationResult) -> Dict[str, Any]:
+        return {
+            "status": "verified",
+            "passed": verification.passed,
+            "confidence": verification.confidence,
+        }
+
+    def _evaluate_candidate(
+        self,
+        path: Path,
+        instruction: PerturbationInstruction,
+        prefilter: Optional[Callable[[Dict[str, Any]], Optional[str]]],
+        timings: Dict[str, StageTiming],
+        context: Dict[str, Any],
+    ) -> Tuple[PerturbationInstruction, Optional[VerificationResult], Dict[str, Any]]:
+        """Perturb, prefilter and verify one candidate; verification is None if pruned."""
+        metadata, trace = self._perturb_candidate(path, instruction, prefilter, timings, context)
+        if metadata is None:
+            return instruction, None, trace
+
+        with self.profiler.stage("verify", timings, **context):
+            verification = self.verifier.verify(path, metadata)
+        trace.update(self._verification_trace(verification))
+        return instruction, verification, trace
+
+    @staticmethod
+    async def _call_stage(
+        executor: Optional[Executor],
+        timing: StageTiming,
+        component: Any,
+        method: str,
+        *args: Any,
+        **kwargs: Any,
+    ) -> Any:
+        async_method = getattr(component, f"{method}_async", None)
+        if async_method is not None:
+            return await async_method(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        call = functools.partial(getattr(component, method), *args, **kwargs)
+
+        def timed_call() -> Any:
+            cpu_start = time.thread_time()
+            try:
+                return call()
+            finally:
+                timing.cpu_s += time.thread_time() - cpu_start
+
+        return await loop.run_in_executor(executor, timed_call)
+
+    def _record_step(
+        self,
+        summary: AgenticRunSummary,
+        iteration: int,
+        codec_info: CodecDetectionResult,
+        perturb_instruction: PerturbationInstruction,
+        verification: VerificationResult,
+        timings: Dict[str, StageTiming],
+    ) -> str:
+        """Append the iteration's LoopStep and return the next feedback hint."""
+        feedback_hint = (
+            "increase subtlety"
+            if not verification.passed
+            else "reinforce winning strategy"
+        )
+
+        loop_feedback = self._compose_feedback(
+            iteration=iteration,
+            verification=verification,
+            next_hint=feedback_hint,
+        )
+
+        summary.steps.append(
+            LoopStep(
+                iteration=iteration,
+                codec_result=codec_info,
+                perturbation=perturb_instruction,
+                verification=verification,
+                feedback=loop_feedback,
+                timings=timings,
+            )
+        )
+        return feedback_hint
+
     @staticmethod
     def _compose_feedback(
         iteration: int,
@@ -318,13 +1342,24 @@ class FeedbackOrchestrator:
 __all__ = [
     "AgenticRunSummary",
     "AudioPerturbationEngine",
+    "CachedCodecDetector",
+    "CachedLLMAgent",
     "CodecDetectionResult",
     "CodecDetector",
+    "ConstraintPrefilter",
+    "FFprobeCodecDetector",
     "FeedbackOrchestrator",
+    "JsonlMetricsSink",
+    "LatencyLLMAgent",
     "LoopStep",
+    "MetricsHook",
     "PerturbationInstruction",
     "PerturbationLLMAgent",
+    "PerturbationRequest",
     "SpeakerVerifierStub",
+    "StageProfiler",
+    "StageTiming",
     "VerificationResult",
+    "prompt_fingerprint",
 ]
 
@@ -2,23 +2,79 @@
 """
 Audio Quality Analysis Script
 Analyzes SNR, PESQ, and STOI metrics for original vs adversarial audio samples.
+
+The DSP stack (librosa, scipy.fft, pesq, pystoi) is imported on first use, so
+importing this module for pair planning or result inspection stays cheap.
+Worker processes warm the libraries their stage needs (`warm_imports`).
+Recordings too long to hold in memory can be analyzed block by block with
+--streaming (see streaming.py).
 """
 
 import os
 import json
+import argparse
+import importlib
+import socket
 import numpy as np
 from pathlib import Path
 import random
-from typing import Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
 
-from scipy.signal import correlate
-from pesq import pesq as pesq_metric
-from pystoi.stoi import stoi as stoi_metric
+from audio_cache import DecodedAudioCache
+from dataset_index import SAMPLING_STRATEGIES, load_or_scan, parse_filename
+from features import FeatureCache, stoi_with_reference
+from results_stream import ResultsWriter, SummaryAccumulator, iter_results, result_key
+from results_table import ResultsTable
 
 # Configuration
 TARGET_SR = 16000
 NORMALIZE_PEAK = 0.99
 MAX_ALIGNMENT_SHIFT_S = 0.5
+SAMPLES_PER_SIGNAL_TYPE = 10
+DEFAULT_CHUNKSIZE = 6  # a multiple of the 3 targets per original keeps siblings in one worker
+ALIGNMENT_BLOCK_SIZE = 16384
+AUDIO_CACHE_DIR = Path(__file__).resolve().parent / ".audio_cache"
+AUDIO_CACHE_MAX_BYTES = 2 * 1024 ** 3
+FEATURE_CACHE_MAX_BYTES = 64 * 1024 ** 2
+RESULTS_FILE = 'audio_analysis_results.jsonl'
+ANALYSIS_QUEUE = 'analysis'
+SAMPLING_SEED = 42
+PAIRS_FILE = 'adversarial_pairs.json'
+DATASET_ROOT = Path("/Users/kunal/Downloads/adversarial_dataset-A/Adversarial-Examples")
+
+# Heavy modules each pipeline stage imports lazily
+STAGE_IMPORTS = {
+    "decode": ("librosa",),
+    "align": ("scipy.fft",),
+    "pesq": ("pesq",),
+    "stoi": ("pystoi.utils",),
+}
+ANALYSIS_STAGES = ("decode", "align", "pesq", "stoi")
+
+# Decoded-audio cache used by load_audio (None disables caching)
+_audio_cache: Optional[DecodedAudioCache] = DecodedAudioCache(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES)
+
+# Per-process reference features (STOI's clean side), shared by the targets of one original
+_feature_cache = FeatureCache(FEATURE_CACHE_MAX_BYTES)
+
+
+class PairTask(NamedTuple):
+    """Arguments for one `analyze_sample_pair` call (picklable for workers)."""
+
+    original_path: str
+    adversarial_path: str
+    original_signal_type: str
+    target_type: str
+
+
+class AlignmentInfo(NamedTuple):
+    """Lag chosen by `estimate_lag` and the correlation at that lag."""
+
+    lag: int
+    peak: float
+    normalized_peak: float
 
 def calculate_snr(original, noisy):
     """Calculate Signal-to-Noise Ratio (SNR) in dB."""
@@ -40,6 +96,7 @@ def compute_pesq(reference: np.ndarray, degraded: np.ndarray, sr: int = TARGET_S
     min_len = min(len(reference), len(degraded))
     reference = reference[:min_len]
     degraded = degraded[:min_len]
+    from pesq import pesq as pesq_metric
     return float(pesq_metric(sr, reference, degraded, 'wb'))
 
 def compute_stoi(reference: np.ndarray, degraded: np.ndarray, sr: int = TARGET_SR) -> float:
@@ -47,6 +104,7 @@ def compute_stoi(reference: np.ndarray, degraded: np.ndarray, sr: int = TARGET_S
     min_len = min(len(reference), len(degraded))
     reference = reference[:min_len]
     degraded = degraded[:min_len]
+    from pystoi.stoi import stoi as stoi_metric
     return float(stoi_metric(reference, degraded, sr, extended=False))
 
 def _peak_normalize(audio: np.ndarray, peak_target: float = NORMALIZE_PEAK) -> np.ndarray:
@@ -56,31 +114,119 @@ def _peak_normalize(audio: np.ndarray, peak_target: float = NORMALIZE_PEAK) -> n
     scale = peak_target / peak
     return (audio * scale).astype(np.float32)
 
-def load_audio(filepath: str, target_sr: int = TARGET_SR) -> Tuple[np.ndarray, int]:
-    """Load audio as mono at target_sr, float32, then peak-normalize."""
+def configure_audio_cache(cache_dir: Optional[str] = str(AUDIO_CACHE_DIR),
+                          max_bytes: int = AUDIO_CACHE_MAX_BYTES) -> None:
+    """Point load_audio at a decoded-audio cache, or disable it with cache_dir=None.
+    Also used as the process-pool initializer so workers share the same cache.
+    """
+    global _audio_cache
+    _audio_cache = DecodedAudioCache(Path(cache_dir), max_bytes) if cache_dir is not None else None
+
+def warm_imports(*stages: str) -> None:
+    """Import the heavy modules the given STAGE_IMPORTS stages use.
+    Used as (part of) a pool initializer, so the import cost is paid once per
+    worker up front rather than inside the first timed task.
+    """
+    for stage in stages:
+        for module in STAGE_IMPORTS[stage]:
+            importlib.import_module(module)
+
+def _init_analysis_worker(cache_args: Tuple, stages: Sequence[str] = ANALYSIS_STAGES) -> None:
+    """Process-pool initializer for pair analysis workers."""
+    configure_audio_cache(*cache_args)
+    warm_imports(*stages)
+
+def _audio_cache_args() -> Tuple:
+    """configure_audio_cache arguments reproducing the current cache settings."""
+    if _audio_cache is None:
+        return (None,)
+    return (str(_audio_cache.cache_dir), _audio_cache.max_bytes)
+
+def _decode_audio(filepath: str, target_sr: int) -> np.ndarray:
     import librosa
-    audio, sr = librosa.load(filepath, sr=target_sr, mono=True)
+    audio, _ = librosa.load(filepath, sr=target_sr, mono=True)
     audio = _peak_normalize(audio, NORMALIZE_PEAK)
-    return audio.astype(np.float32), sr
+    return audio.astype(np.float32)
+
+def load_audio(filepath: str, target_sr: int = TARGET_SR) -> Tuple[np.ndarray, int]:
+    """Load audio as mono at target_sr, float32, then peak-normalize.
+    Served from the decoded-audio cache when one is configured; cached arrays
+    are read-only memory maps.
+    """
+    if _audio_cache is None:
+        return _decode_audio(filepath, target_sr), target_sr
+    audio = _audio_cache.get_or_load(
+        filepath, target_sr, NORMALIZE_PEAK, lambda: _decode_audio(filepath, target_sr)
+    )
+    return audio, target_sr
+
+def bounded_xcorr(reference: np.ndarray, estimate: np.ndarray, max_lag: int,
+                  block_size: int = ALIGNMENT_BLOCK_SIZE) -> np.ndarray:
+    """Cross-correlation restricted to lags in [-max_lag, max_lag].
+
+    Returns c with c[max_lag + k] = sum_n estimate[n + k] * reference[n], i.e.
+    the same values as `scipy.signal.correlate(estimate, reference, 'full')`
+    over that window. The reference is processed in blocks (overlap-save):
+    each block is correlated against the estimate segment it can reach within
+    ±max_lag, so working memory is O(block_size + max_lag) and does not grow
+    with signal length.
+    """
+    from scipy.fft import irfft, next_fast_len, rfft
+
+    n_est = len(estimate)
+    window = 2 * max_lag + 1
+    block = max(block_size, window)
+    nfft = next_fast_len(block + 2 * max_lag)
+    corr = np.zeros(window, dtype=np.float64)
+    segment = np.zeros(block + 2 * max_lag, dtype=np.float64)
+
+    for start in range(0, len(reference), block):
+        ref_block = np.asarray(reference[start:start + block], dtype=np.float64)
+        # estimate[start - max_lag : start + len(ref_block) + max_lag], zero padded
+        lo = start - max_lag
+        hi = start + len(ref_block) + max_lag
+        segment[:] = 0.0
+        src_lo, src_hi = max(lo, 0), min(hi, n_est)
+        if src_hi > src_lo:
+            segment[src_lo - lo:src_hi - lo] = estimate[src_lo:src_hi]
+        spectrum = rfft(segment, nfft) * np.conj(rfft(ref_block, nfft))
+        corr += irfft(spectrum, nfft)[:window]
+
+    return corr
+
+def estimate_lag(reference: np.ndarray, estimate: np.ndarray, sr: int = TARGET_SR,
+                 max_shift_s: float = MAX_ALIGNMENT_SHIFT_S) -> AlignmentInfo:
+    """Find the lag of estimate relative to reference within ±max_shift_s.
+
+    Positive lags mean the estimate is delayed. `normalized_peak` is the
+    correlation at that lag divided by the signal energies (1.0 = identical).
+    """
+    n = min(len(reference), len(estimate))
+    if n == 0:
+        return AlignmentInfo(0, 0.0, 0.0)
+    ref = reference[:n]
+    est = estimate[:n]
+    max_shift = min(int(max_shift_s * sr), n - 1)
+
+    corr = bounded_xcorr(ref, est, max_shift)
+    idx = int(np.argmax(corr))
+    peak = float(corr[idx])
+    energy = np.sqrt(np.dot(ref.astype(np.float64), ref) * np.dot(est.astype(np.float64), est))
+    normalized = peak / energy if energy > 0 else 0.0
+    return AlignmentInfo(idx - max_shift, peak, float(normalized))
 
 def align_signals(reference: np.ndarray, estimate: np.ndarray, sr: int = TARGET_SR,
-                  max_shift_s: float = MAX_ALIGNMENT_SHIFT_S) -> Tuple[np.ndarray, np.ndarray]:
+                  max_shift_s: float = MAX_ALIGNMENT_SHIFT_S, return_info: bool = False):
     """Align estimate to reference using cross-correlation within ±max_shift_s.
-    Returns trimmed aligned copies of (reference, estimate).
+    Returns trimmed aligned copies of (reference, estimate), plus the
+    AlignmentInfo used when return_info is True.
     """
-    max_shift = int(max_shift_s * sr)
     # limit to same length for correlation speed
     n = min(len(reference), len(estimate))
     ref = reference[:n]
     est = estimate[:n]
-    # compute correlation around zero lag window
-    corr_full = correlate(est, ref, mode='full')
-    lags = np.arange(-len(ref) + 1, len(est))
-    # restrict to lag window
-    mask = (lags >= -max_shift) & (lags <= max_shift)
-    corr = corr_full[mask]
-    lag_window = lags[mask]
-    best_lag = lag_window[np.argmax(corr)]
+    info = estimate_lag(ref, est, sr, max_shift_s)
+    best_lag = info.lag
 
     if best_lag > 0:
         # est lags behind ref -> advance est
@@ -94,6 +240,8 @@ def align_signals(reference: np.ndarray, estimate: np.ndarray, sr: int = TARGET_
         ref_aligned, est_aligned = ref, est
 
     m = min(len(ref_aligned), len(est_aligned))
+    if return_info:
+        return ref_aligned[:m], est_aligned[:m], info
     return ref_aligned[:m], est_aligned[:m]
 
 def analyze_sample_pair(original_path, adversarial_path, original_signal_type, target_type):
@@ -105,6 +253,8 @@ def analyze_sample_pair(original_path, adversarial_path, original_signal_type, t
         'snr': None,
         'pesq': None,
         'stoi': None,
+        'alignment_lag': None,
+        'alignment_peak': None,
         'error': None
     }
     
@@ -123,12 +273,20 @@ def analyze_sample_pair(original_path, adversarial_path, original_signal_type, t
             return results
         
         # Align signals and trim
-        orig_audio, adv_audio = align_signals(orig_audio, adv_audio, sr_orig, MAX_ALIGNMENT_SHIFT_S)
+        orig_features = _feature_cache.get(orig_audio, sr_orig)
+        orig_audio, adv_audio, alignment = align_signals(
+            orig_audio, adv_audio, sr_orig, MAX_ALIGNMENT_SHIFT_S, return_info=True
+        )
+        orig_start = max(0, -alignment.lag)
+        results['alignment_lag'] = alignment.lag
+        results['alignment_peak'] = alignment.normalized_peak
         
         # Calculate metrics
         snr = calculate_snr(orig_audio, adv_audio)
         pesq = compute_pesq(orig_audio, adv_audio, sr_orig)
-        stoi = compute_stoi(orig_audio, adv_audio, sr_orig)
+        # Same as compute_stoi; targets aligned to the same region of the
+        # original share its reference side through one cache entry
+        stoi = stoi_with_reference(orig_features, adv_audio, orig_start, orig_start + len(orig_audio))
         
         results['snr'] = float(snr)
         results['pesq'] = float(pesq)
@@ -139,86 +297,257 @@ def analyze_sample_pair(original_path, adversarial_path, original_signal_type, t
     
     return results
 
-def main():
-    # Load the adversarial pairs JSON
-    pairs_file = 'adversarial_pairs.json'
-    if not os.path.exists(pairs_file):
-        print(f"Error: {pairs_file} not found!")
+def _error_result(task: PairTask, message: str) -> Dict:
+    """Result dict for a pair whose analysis never produced metrics."""
+    return {
+        'original_file': os.path.basename(task.original_path),
+        'adversarial_file': os.path.basename(task.adversarial_path),
+        'signal_type': f"{task.original_signal_type}2{task.target_type}",
+        'snr': None,
+        'pesq': None,
+        'stoi': None,
+        'alignment_lag': None,
+        'alignment_peak': None,
+        'error': message
+    }
+
+def _pair_analyzer(streaming: bool):
+    """analyze_sample_pair, or its memory-bounded streaming counterpart."""
+    if streaming:
+        from streaming import analyze_sample_pair_streaming
+        return analyze_sample_pair_streaming
+    return analyze_sample_pair
+
+def _analyze_chunk(chunk: Sequence[PairTask], streaming: bool = False) -> List[Dict]:
+    """Worker entry point: analyze a chunk of pairs sequentially."""
+    analyze = _pair_analyzer(streaming)
+    return [analyze(*task) for task in chunk]
+
+def run_pair_job(payload: Dict) -> Dict:
+    """work_queue handler: analyze the PairTask in payload["task"]."""
+    return _pair_analyzer(payload.get("streaming", False))(*PairTask(**payload["task"]))
+
+def export_queue_results(queue, output_file: str, summary: SummaryAccumulator) -> None:
+    """Write every finished job of an analysis queue (all nodes) to output_file.
+    Jobs that ran out of attempts (their workers died) get error results.
+    The file is written under a temporary name and renamed, so nodes that
+    finish together never interleave their copies.
+    """
+    partial = Path(f"{output_file}.{socket.gethostname()}.{os.getpid()}.part")
+    with ResultsWriter(partial) as writer:
+        for _, status, payload, result, error in queue.results():
+            if status == "failed":
+                result = _error_result(PairTask(**payload["task"]), f"Worker failed: {error}")
+            writer.write(result)
+            summary.update(result)
+    os.replace(partial, output_file)
+
+def analyze_pairs(tasks: Sequence[PairTask], workers: int = 1,
+                  chunksize: int = DEFAULT_CHUNKSIZE, streaming: bool = False,
+                  chunk_sizes: Optional[Sequence[int]] = None) -> Iterator[Dict]:
+    """Yield one result per task, in task order.
+
+    With workers > 1 the tasks are split into chunks of `chunksize` pairs and
+    fanned out over a process pool; at most two chunks per worker are in
+    flight so memory stays bounded on large runs. A chunk whose worker dies
+    (e.g. a native crash inside PESQ) is reported through the `error` field of
+    each of its pairs instead of aborting the whole run. With streaming=True
+    pairs are analyzed block by block (streaming.analyze_sample_pair_streaming).
+    `chunk_sizes` overrides the fixed chunksize with explicit consecutive
+    chunk lengths, e.g. the cost-balanced ones of `DatasetIndex.schedule`.
+    """
+    if workers <= 1:
+        analyze = _pair_analyzer(streaming)
+        for task in tasks:
+            yield analyze(*task)
         return
-    
-    with open(pairs_file, 'r') as f:
-        data = json.load(f)
-    
-    # Base path for audio files
-    base_path = Path("/Users/kunal/Downloads/adversarial_dataset-A/Adversarial-Examples")
-    
-    all_results = []
-    
-    print("Starting audio analysis...")
-    print("="*80)
-    
-    # Process each signal type
+
+    if chunk_sizes is None:
+        chunksize = max(1, chunksize)
+        chunks = [tasks[i:i + chunksize] for i in range(0, len(tasks), chunksize)]
+    else:
+        bounds = np.cumsum([0, *chunk_sizes])
+        chunks = [tasks[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+    max_in_flight = 2 * workers
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_analysis_worker,
+                             initargs=(_audio_cache_args(),)) as executor:
+        pending = deque()
+        next_chunk = 0
+        while pending or next_chunk < len(chunks):
+            while next_chunk < len(chunks) and len(pending) < max_in_flight:
+                chunk = chunks[next_chunk]
+                pending.append((chunk, executor.submit(_analyze_chunk, chunk, streaming)))
+                next_chunk += 1
+
+            chunk, future = pending.popleft()
+            try:
+                chunk_results = future.result()
+            except Exception as e:
+                chunk_results = [_error_result(task, f"Worker failed: {e}") for task in chunk]
+            yield from chunk_results
+
+def build_pair_tasks(data: Dict, base_path: Path,
+                     sample_size: int = SAMPLES_PER_SIGNAL_TYPE) -> List[PairTask]:
+    """Sample pairs from each signal type and expand them into per-target tasks."""
+    tasks = []
     for signal_type, pairs in data.items():
-        print(f"\nProcessing {signal_type}...")
-        
-        # Sample 10 files from each signal type (or all if less than 10)
-        sample_size = min(10, len(pairs))
-        sampled_pairs = random.sample(pairs, sample_size)
-        
-        print(f"  Analyzing {sample_size} samples from {len(pairs)} total...")
-        
-        for i, pair in enumerate(sampled_pairs, 1):
+        # Sample up to `sample_size` files from each signal type
+        n = min(sample_size, len(pairs))
+        sampled_pairs = random.sample(pairs, n)
+        print(f"  {signal_type}: sampled {n} of {len(pairs)} originals")
+
+        for pair in sampled_pairs:
             original_file = pair['original']
             original_path = base_path / signal_type / "Original-examples" / original_file
-            
+
             for adv_type, adv_file in pair['adversarial_samples'].items():
-                # Determine target type from adversarial type
-                if '2short' in adv_file:
-                    target = 'short'
-                elif '2medium' in adv_file:
-                    target = 'medium'
-                else:
-                    target = 'long'
-                
+                # Target type from the adv-<source>2<target>-<id> filename
+                parsed = parse_filename(adv_file)
+                target = parsed.target_type if parsed and parsed.target_type else 'long'
+
                 adv_path = base_path / signal_type / adv_type / adv_file
-                
-                print(f"  [{i}/{sample_size}] {original_file} -> {target} target...", end=' ')
-                
-                # Analyze the pair
-                result = analyze_sample_pair(
+                tasks.append(PairTask(
                     str(original_path),
                     str(adv_path),
                     signal_type.replace('-signals', ''),
                     target
-                )
-                
+                ))
+    return tasks
+
+def main(workers: int = 1, chunksize: int = DEFAULT_CHUNKSIZE,
+         output_file: str = RESULTS_FILE, resume: bool = False, streaming: bool = False,
+         index_file: Optional[str] = None, sampling: str = "stratified",
+         queue_file: Optional[str] = None):
+    if queue_file is not None and resume:
+        # The queue already keeps finished pairs; rerunning a node resumes it
+        raise ValueError("--queue cannot be combined with --resume")
+
+    # Base path for audio files
+    base_path = DATASET_ROOT
+    
+    summary = SummaryAccumulator()
+    
+    print("Starting audio analysis...")
+    print("="*80)
+    
+    index = None
+    if index_file is not None:
+        # Sample and schedule from the dataset index instead of the pairs JSON
+        index = load_or_scan(index_file, base_path)
+        originals = index.sample_originals(SAMPLES_PER_SIGNAL_TYPE, sampling, SAMPLING_SEED)
+        tasks = index.pair_tasks(originals)
+        print(f"  {index_file}: sampled {len(originals)} originals ({sampling})")
+    else:
+        # Load the adversarial pairs JSON
+        pairs_file = PAIRS_FILE
+        if not os.path.exists(pairs_file):
+            print(f"Error: {pairs_file} not found!")
+            return
+        
+        with open(pairs_file, 'r') as f:
+            data = json.load(f)
+        
+        tasks = build_pair_tasks(data, base_path)
+    
+    if queue_file is not None:
+        # Distributed run: every node seeds the same plan (idempotent), works
+        # the shared queue until it drains, then exports all nodes' results
+        from work_queue import WorkQueue, format_progress, run_nodes
+        queue = WorkQueue(queue_file, ANALYSIS_QUEUE)
+        if index is not None:
+            tasks, _ = index.schedule(tasks, workers)  # longest originals are leased first
+        added = queue.enqueue(
+            ("/".join((os.path.basename(t.original_path), os.path.basename(t.adversarial_path))),
+             {"task": t._asdict(), "streaming": streaming},
+             index.task_cost(t) if index is not None else 1.0)
+            for t in tasks
+        )
+        print(f"\nQueue {queue_file}: {added} new of {len(tasks)} planned pairs; "
+              f"working it with {workers} process(es)...")
+        run_nodes(queue_file, ANALYSIS_QUEUE, run_pair_job, workers, batch=chunksize,
+                  initializer=_init_analysis_worker, initargs=(_audio_cache_args(),))
+        print(format_progress(queue.progress()))
+        export_queue_results(queue, output_file, summary)
+    else:
+        if resume and os.path.exists(output_file):
+            # Seed the summary with what earlier runs recorded and skip those pairs
+            done = set()
+            for result in iter_results(output_file):
+                done.add(result_key(result))
+                summary.update(result)
+            tasks = [t for t in tasks
+                     if (os.path.basename(t.original_path), os.path.basename(t.adversarial_path)) not in done]
+            print(f"\nResuming: {summary.total} pairs already recorded in {output_file}")
+    
+        chunk_sizes = None
+        if index is not None and workers > 1:
+            tasks, chunk_sizes = index.schedule(tasks, workers)
+    
+        mode = " (streaming)" if streaming else ""
+        print(f"\nAnalyzing {len(tasks)} pairs with {workers} worker(s){mode}...")
+    
+        with ResultsWriter(output_file, resume=resume) as writer:
+            for i, (task, result) in enumerate(zip(tasks, analyze_pairs(tasks, workers, chunksize, streaming, chunk_sizes)), 1):
+                original_file = os.path.basename(task.original_path)
+                print(f"  [{i}/{len(tasks)}] {original_file} -> {task.target_type} target...", end=' ')
+            
                 if result['error']:
                     print(f"ERROR: {result['error']}")
                 else:
                     print(f"SNR: {result['snr']:.2f} dB, PESQ: {result['pesq']:.2f}, STOI: {result['stoi']:.3f}")
-                
-                all_results.append(result)
+            
+                writer.write(result)
+                summary.update(result)
     
-    # Save results
-    output_file = 'audio_analysis_results.json'
-    with open(output_file, 'w') as f:
-        json.dump(all_results, f, indent=2)
+    # Columnar copy for fast filtering / group-by (see results_table)
+    table_file = Path(output_file).with_suffix('.npz')
+    ResultsTable.from_results(output_file).save(table_file)
     
     print("\n" + "="*80)
-    print(f"Analysis complete! Results saved to: {output_file}")
-    print(f"Total pairs analyzed: {len(all_results)}")
+    print(f"Analysis complete! Results saved to: {output_file} (table: {table_file})")
+    print(f"Total pairs analyzed: {summary.total}")
     
     # Print summary statistics
-    valid_results = [r for r in all_results if r['error'] is None]
-    if valid_results:
+    if summary.valid:
+        stats = summary.stats
         print("\nSummary Statistics:")
-        print(f"  Valid results: {len(valid_results)}")
-        snr_values = [r['snr'] for r in valid_results if r['snr'] != float('inf')]
-        print(f"  Average SNR: {np.mean(snr_values):.2f} dB")
-        print(f"  Average PESQ: {np.mean([r['pesq'] for r in valid_results]):.2f}")
-        print(f"  Average STOI: {np.mean([r['stoi'] for r in valid_results]):.3f}")
+        print(f"  Valid results: {summary.valid}")
+        print(f"  Average SNR: {stats['snr'].mean:.2f} dB (std {stats['snr'].std:.2f})")
+        print(f"  Average PESQ: {stats['pesq'].mean:.2f} (std {stats['pesq'].std:.2f})")
+        print(f"  Average STOI: {stats['stoi'].mean:.3f} (std {stats['stoi'].std:.3f})")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for pair analysis (0 = all cores)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help="Pairs submitted to a worker per task")
+    parser.add_argument("--cache-dir", default=str(AUDIO_CACHE_DIR),
+                        help="Directory for cached decoded audio")
+    parser.add_argument("--cache-max-gb", type=float, default=AUDIO_CACHE_MAX_BYTES / 1024 ** 3,
+                        help="Size bound for the decoded-audio cache")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always decode audio from source files")
+    parser.add_argument("--output", default=RESULTS_FILE,
+                        help="JSONL file results are streamed to")
+    parser.add_argument("--resume", action="store_true",
+                        help="Append to --output and skip pairs it already records")
+    parser.add_argument("--index", default=None,
+                        help="Plan from this dataset index (built on first use, see dataset_index.py)")
+    parser.add_argument("--sampling", choices=SAMPLING_STRATEGIES, default="stratified",
+                        help="How --index samples originals per signal type")
+    parser.add_argument("--queue", default=None,
+                        help="Shared SQLite work queue; run this on every node (see work_queue.py)")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Read audio block by block with bounded memory (for long recordings)")
+    args = parser.parse_args()
+
+    configure_audio_cache(None if args.no_cache else args.cache_dir,
+                          int(args.cache_max_gb * 1024 ** 3))
+
     # Set random seed for reproducibility
     random.seed(42)
-    main()
+    main(workers=args.workers or os.cpu_count() or 1, chunksize=args.chunksize,
+         output_file=args.output, resume=args.resume, streaming=args.streaming,
+         index_file=args.index, sampling=args.sampling, queue_file=args.queue)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Content-addressed store for compressed audio artifacts.
+
+`compress_adversarial_audio` used to decide whether to re-encode by checking
+whether the output path existed, which misses changed inputs and changed
+encoder options. Here every artifact is keyed by the SHA-256 of its input
+file, the format name and the exact ffmpeg option list, and stored once under
+`objects/`. The familiar `compressed_audio/<codec>/<type>/` files are hard
+links into the store, so byte-identical sources share one encode across
+signal types. A JSON manifest indexes sources, artifacts and output links for
+O(1) lookups, and `gc()` removes objects no output refers to.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from audio_cache import file_digest
+
+MANIFEST_VERSION = 1
+
+
+def artifact_key(input_digest: str, format_name: str, options: Iterable[str]) -> str:
+    """Key of the artifact produced by encoding input_digest with options."""
+    payload = json.dumps([input_digest, format_name, list(options)])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ArtifactStore:
+    """
+    Manifest-indexed object store for encoded outputs.
+
+    Thread-safe: the encode scheduler calls it from its worker threads.
+    Call `save()` to persist the manifest (done once per scheduler run).
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.manifest_path = self.root / "manifest.json"
+        self._lock = threading.Lock()
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict:
+        if self.manifest_path.exists():
+            with self.manifest_path.open("r") as handle:
+                manifest = json.load(handle)
+            if manifest.get("version") == MANIFEST_VERSION:
+                return manifest
+        return {"version": MANIFEST_VERSION, "sources": {}, "artifacts": {}, "outputs": {}}
+
+    def save(self) -> None:
+        """Atomically write the manifest."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".json.tmp")
+        with self._lock:
+            with tmp.open("w") as handle:
+                json.dump(self.manifest, handle, indent=2, sort_keys=True)
+            os.replace(tmp, self.manifest_path)
+
+    def source_digest(self, path: Path) -> str:
+        """Content digest of path, re-hashed only when its mtime or size changed."""
+        path = Path(path).resolve()
+        stat = path.stat()
+        with self._lock:
+            entry = self.manifest["sources"].get(str(path))
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return entry["digest"]
+
+        digest = file_digest(path)
+        with self._lock:
+            self.manifest["sources"][str(path)] = {
+                "digest": digest,
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+            }
+        return digest
+
+    def key_for(self, input_path: Path, format_name: str, options: Iterable[str]) -> str:
+        return artifact_key(self.source_digest(input_path), format_name, options)
+
+    def object_path(self, key: str, extension: str) -> Path:
+        return self.objects_dir / key[:2] / f"{key}{extension}"
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """Stored object for key, or None if it was never built or has gone missing."""
+        with self._lock:
+            entry = self.manifest["artifacts"].get(key)
+        if entry is None:
+            return None
+        path = self.root / entry["path"]
+        return path if path.exists() else None
+
+    def is_current(self, key: str, output_path: Path) -> bool:
+        """True if output_path is already linked to the artifact for key."""
+        with self._lock:
+            linked = self.manifest["outputs"].get(str(output_path))
+        return linked == key and output_path.exists() and self.lookup(key) is not None
+
+    def add(self, key: str, produced: Path, format_name: str, options: Iterable[str]) -> Path:
+        """Move a freshly encoded file into the store under key."""
+        target = self.object_path(key, produced.suffix)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(produced, target)
+        with self._lock:
+            self.manifest["artifacts"][key] = {
+                "path": str(target.relative_to(self.root)),
+                "format": format_name,
+                "options": list(options),
+                "size": target.stat().st_size,
+            }
+        return target
+
+    def materialize(self, key: str, output_path: Path) -> None:
+        """Expose the artifact for key at output_path (hard link, copy as fallback)."""
+        source = self.lookup(key)
+        if source is None:
+            raise KeyError(f"Artifact {key} is not in the store")
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = output_path.with_name(f".{output_path.name}.link")
+        tmp.unlink(missing_ok=True)
+        try:
+            os.link(source, tmp)
+        except OSError:
+            shutil.copy2(source, tmp)
+        os.replace(tmp, output_path)
+        with self._lock:
+            self.manifest["outputs"][str(output_path)] = key
+
+    def gc(self, dry_run: bool = False) -> List[Path]:
+        """Delete objects not referenced by any output link; return what was removed."""
+        with self._lock:
+            outputs = self.manifest["outputs"]
+            # Links whose files were deleted by hand no longer keep objects alive
+            stale = {o for o in outputs if not Path(o).exists()}
+            referenced = {key for output, key in outputs.items() if output not in stale}
+            if not dry_run:
+                for output in stale:
+                    del outputs[output]
+            artifacts = self.manifest["artifacts"]
+            known = {self.root / entry["path"] for entry in artifacts.values()}
+
+            removed = []
+            for key in [k for k in artifacts if k not in referenced]:
+                removed.append(self.root / artifacts[key]["path"])
+                if not dry_run:
+                    del artifacts[key]
+
+        # Objects on disk the manifest never recorded (e.g. from a crashed run)
+        if self.objects_dir.exists():
+            removed.extend(
+                path for path in self.objects_dir.glob("*/*") if path not in known
+            )
+
+        if not dry_run:
+            for path in removed:
+                path.unlink(missing_ok=True)
+            self.save()
+        return removed
+
+
+__all__ = ["ArtifactStore", "artifact_key"]
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+ASR service layer: cached transcripts, batched inference, vectorized WER/CER.
+
+The notebooks' `ASRBaseline` / `MetricsComputer.compute_all_metrics`
+transcribe every perturbed clip on every call, re-transcribe the original
+baseline repeatedly, and score WER/CER with a Python double loop per pair.
+This module puts one service in front of the model:
+
+* transcripts are cached by the SHA-256 of the float32 samples plus the model
+  name, so a clip is transcribed once per model (optionally persisted as
+  JSON across runs),
+* cache misses are converted to Whisper-style log-mel spectrograms, padded
+  into one (batch, n_mels, frames) array, and decoded in a single model call,
+* WER and CER for many (reference, hypothesis) pairs are computed with a
+  Levenshtein recurrence vectorized across the batch.
+
+`WhisperASRModel` wraps openai-whisper (imported lazily); `TinyTemplateASR`
+is a deterministic pure-NumPy stand-in for tests and offline runs.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Protocol, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Configuration
+TARGET_SR = 16000
+N_MELS = 80
+MEL_N_FFT = 400
+MEL_HOP = 160
+LOG_MEL_DYNAMIC_RANGE = 8.0
+DEFAULT_BATCH_SIZE = 8
+ASR_MODEL_NAME = "base"
+EPS = 1e-10
+
+_mel_filters: Dict[Tuple[int, int, int], np.ndarray] = {}
+
+
+def mel_filters(sr: int = TARGET_SR, n_fft: int = MEL_N_FFT, n_mels: int = N_MELS) -> np.ndarray:
+    """Slaney mel filterbank (the one Whisper ships), cached per configuration."""
+    key = (sr, n_fft, n_mels)
+    if key not in _mel_filters:
+        import librosa
+
+        _mel_filters[key] = librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels)
+    return _mel_filters[key]
+
+
+def log_mel_batch(
+    audios: Sequence[np.ndarray],
+    sr: int = TARGET_SR,
+    n_mels: int = N_MELS,
+    n_fft: int = MEL_N_FFT,
+    hop: int = MEL_HOP,
+    pad_frames: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Whisper-style log-mel spectrograms for a batch, zero-padded to one width.
+
+    Follows `whisper.log_mel_spectrogram`: centered (reflect-padded) Hann
+    STFT, power spectrum, log10 clamped to 8 decades below each clip's peak,
+    scaled as (x + 4) / 4. Padding frames take each clip's floor value, as
+    Whisper's zero-padded audio would. Returns (mels, frame_lengths) with
+    mels of shape (batch, n_mels, max(frames) or pad_frames).
+    """
+    window = np.hanning(n_fft + 1)[:-1]  # periodic, as torch.hann_window
+    filters = mel_filters(sr, n_fft, n_mels)
+    lengths = np.array([len(audio) // hop for audio in audios], dtype=np.int64)
+    width = pad_frames or int(lengths.max(initial=0))
+    mels = np.zeros((len(audios), n_mels, width), dtype=np.float32)
+
+    for i, audio in enumerate(audios):
+        padded = np.pad(np.asarray(audio, dtype=np.float32), n_fft // 2, mode="reflect")
+        frames = sliding_window_view(padded, n_fft)[::hop][: lengths[i]]
+        power = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2
+        log_spec = np.log10(np.maximum(filters @ power.T, EPS))
+        floor = log_spec.max(initial=np.log10(EPS)) - LOG_MEL_DYNAMIC_RANGE
+        n = min(lengths[i], width)
+        mels[i] = (floor + 4.0) / 4.0
+        mels[i, :, :n] = (np.maximum(log_spec[:, :n], floor) + 4.0) / 4.0
+    return mels, np.minimum(lengths, width)
+
+
+class ASRModel(Protocol):
+    """Batch transcriber over padded log-mel input."""
+
+    name: str
+    pad_frames: Optional[int]
+
+    def transcribe_batch(self, mels: np.ndarray, lengths: np.ndarray) -> List[str]:
+        """One transcript per row of mels (batch, n_mels, frames)."""
+
+
+class WhisperASRModel:
+    """
+    openai-whisper behind the `ASRModel` interface.
+
+    Mels are padded to Whisper's 30 s window (3000 frames) and decoded with
+    `whisper.decode` in one batched call. Clips longer than 30 s are
+    truncated; the notebooks' samples are well below that.
+    """
+
+    pad_frames = 3000
+
+    def __init__(self, model_name: str = ASR_MODEL_NAME, device: Optional[str] = None) -> None:
+        import whisper
+
+        self._whisper = whisper
+        self.model = whisper.load_model(model_name, device=device)
+        self.name = f"whisper-{model_name}"
+        self.options = whisper.DecodingOptions(language="en", fp16=False, without_timestamps=True)
+
+    def transcribe_batch(self, mels: np.ndarray, lengths: np.ndarray) -> List[str]:
+        import torch
+
+        batch = torch.from_numpy(mels).to(self.model.device)
+        results = self._whisper.decode(self.model, batch, self.options)
+        return [result.text.strip() for result in results]
+
+
+class TinyTemplateASR:
+    """
+    Deterministic toy recognizer for tests.
+
+    Every `frames_per_word` frames of non-silent audio become one "word":
+    the index of the loudest of `n_groups` mel band groups. Perturbations
+    that reshape the spectrum therefore change the transcript, which is all
+    the WER/CER plumbing needs.
+    """
+
+    pad_frames = None
+
+    def __init__(self, frames_per_word: int = 25, n_groups: int = 8, silence_level: float = -0.5) -> None:
+        self.frames_per_word = frames_per_word
+        self.n_groups = n_groups
+        self.silence_level = silence_level
+        self.name = f"tiny-template-{frames_per_word}-{n_groups}"
+
+    def transcribe_batch(self, mels: np.ndarray, lengths: np.ndarray) -> List[str]:
+        n_words = mels.shape[2] // self.frames_per_word
+        usable = n_words * self.frames_per_word
+        n_mels = mels.shape[1] - mels.shape[1] % self.n_groups
+        segments = mels[:, :n_mels, :usable].reshape(
+            len(mels), self.n_groups, n_mels // self.n_groups, n_words, self.frames_per_word
+        ).mean(axis=(2, 4))  # (batch, groups, words)
+        words = np.argmax(segments, axis=1)
+        voiced = segments.max(axis=1) > self.silence_level
+        valid = np.arange(n_words)[None, :] < (lengths // self.frames_per_word)[:, None]
+        keep = voiced & valid
+        return [
+            " ".join(f"w{word}" for word in row[mask])
+            for row, mask in zip(words, keep)
+        ]
+
+
+def audio_digest(audio: np.ndarray, sr: int) -> str:
+    """SHA-256 of the float32 samples and sample rate."""
+    digest = hashlib.sha256(str(sr).encode())
+    digest.update(np.ascontiguousarray(audio, dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+class TranscriptCache:
+    """
+    Transcripts keyed by audio content hash and model name.
+
+    With `cache_path` the entries are loaded from and saved to a JSON file;
+    call `save()` after a run. Thread-safe.
+    """
+
+    def __init__(self, cache_path: Optional[Path | str] = None) -> None:
+        self.cache_path = Path(cache_path) if cache_path else None
+        self._lock = threading.Lock()
+        self._entries: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        if self.cache_path and self.cache_path.exists():
+            with self.cache_path.open("r") as handle:
+                self._entries = json.load(handle)
+
+    @staticmethod
+    def key(digest: str, model_name: str) -> str:
+        return f"{model_name}:{digest}"
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            transcript = self._entries.get(key)
+            if transcript is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return transcript
+
+    def put(self, key: str, transcript: str) -> None:
+        with self._lock:
+            self._entries[key] = transcript
+
+    def save(self) -> None:
+        """Persist the cache to `cache_path` (no-op without one)."""
+        if self.cache_path is None:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path.with_suffix(f"{self.cache_path.suffix}.tmp")
+        with self._lock:
+            with tmp.open("w") as handle:
+                json.dump(self._entries, handle)
+            os.replace(tmp, self.cache_path)
+
+
+def _encode_tokens(sequences: Sequence[Sequence[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Map token sequences to a padded int array (pad = -1) plus lengths."""
+    vocabulary: Dict[str, int] = {}
+    lengths = np.array([len(seq) for seq in sequences], dtype=np.int64)
+    codes = np.full((len(sequences), int(lengths.max(initial=0))), -1, dtype=np.int64)
+    for i, seq in enumerate(sequences):
+        codes[i, : len(seq)] = [vocabulary.setdefault(token, len(vocabulary)) for token in seq]
+    return codes, lengths
+
+
+def batch_edit_distance(
+    references: Sequence[Sequence[str]], hypotheses: Sequence[Sequence[str]]
+) -> np.ndarray:
+    """
+    Levenshtein distance for every (reference, hypothesis) token pair.
+
+    Runs the DP one reference position at a time for the whole batch:
+    substitutions and deletions come from the previous row, and insertions
+    are resolved with a running minimum along the row, so the only Python
+    loop is over the longest reference.
+    """
+    n = len(references)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    ref_codes, ref_lengths = _encode_tokens(list(references) + list(hypotheses))
+    ref_codes, hyp_codes = ref_codes[:n], ref_codes[n:]
+    ref_lengths, hyp_lengths = ref_lengths[:n], ref_lengths[n:]
+    width = hyp_codes.shape[1]
+    # Hypothesis padding must never match reference tokens (or padding)
+    hyp_codes = np.where(hyp_codes < 0, -2, hyp_codes)
+
+    columns = np.arange(width + 1)
+    row = np.broadcast_to(columns, (n, width + 1)).copy()
+    distances = row[np.arange(n), hyp_lengths].copy()  # empty references
+    for i in range(ref_codes.shape[1]):
+        cost = (ref_codes[:, i, None] != hyp_codes).astype(np.int64)
+        candidate = np.empty_like(row)
+        candidate[:, 0] = row[:, 0] + 1
+        candidate[:, 1:] = np.minimum(row[:, 1:] + 1, row[:, :-1] + cost)
+        row = np.minimum.accumulate(candidate - columns, axis=1) + columns
+        finished = ref_lengths == i + 1
+        distances[finished] = row[finished, hyp_lengths[finished]]
+    return distances
+
+
+def _words(text: str) -> List[str]:
+    return text.lower().split()
+
+
+def _chars(text: str) -> List[str]:
+    return list(text.lower().replace(" ", ""))
+
+
+def _error_rates(
+    references: Sequence[str],
+    hypotheses: Sequence[str],
+    tokenize: Callable[[str], List[str]],
+) -> np.ndarray:
+    ref_tokens = [tokenize(text) for text in references]
+    hyp_tokens = [tokenize(text) for text in hypotheses]
+    distances = batch_edit_distance(ref_tokens, hyp_tokens).astype(np.float64)
+    ref_lengths = np.array([len(tokens) for tokens in ref_tokens], dtype=np.float64)
+    hyp_lengths = np.array([len(tokens) for tokens in hyp_tokens])
+    # Empty reference: 1.0 if anything was hypothesized, else 0.0 (as ASRBaseline)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = distances / ref_lengths
+    return np.where(ref_lengths == 0, (hyp_lengths > 0).astype(np.float64), rates)
+
+
+def batch_wer(references: Sequence[str], hypotheses: Sequence[str]) -> np.ndarray:
+    """Word error rate per pair (lower-cased, whitespace tokenized)."""
+    return _error_rates(references, hypotheses, _words)
+
+
+def batch_cer(references: Sequence[str], hypotheses: Sequence[str]) -> np.ndarray:
+    """Character error rate per pair (lower-cased, spaces removed)."""
+    return _error_rates(references, hypotheses, _chars)
+
+
+class ASRService:
+    """
+    Cached, batched front end to an `ASRModel`.
+
+    `transcribe_batch` looks every clip up in the transcript cache, collapses
+    duplicate clips, and sends the remaining ones to the model in batches of
+    `batch_size`. Thread-safe as far as the cache is; model calls are
+    serialized.
+    """
+
+    def __init__(
+        self,
+        model: Optional[ASRModel] = None,
+        cache: Optional[TranscriptCache] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        sr: int = TARGET_SR,
+    ) -> None:
+        self.model = model or WhisperASRModel()
+        self.cache = cache or TranscriptCache()
+        self.batch_size = max(1, batch_size)
+        self.sr = sr
+        self._model_lock = threading.Lock()
+
+    def transcribe_batch(self, audios: Sequence[np.ndarray]) -> List[str]:
+        keys = [
+            TranscriptCache.key(audio_digest(audio, self.sr), self.model.name)
+            for audio in audios
+        ]
+        transcripts: List[Optional[str]] = [self.cache.get(key) for key in keys]
+        pending: Dict[str, int] = {}
+        for i, (key, transcript) in enumerate(zip(keys, transcripts)):
+            if transcript is None:
+                pending.setdefault(key, i)
+
+        misses = list(pending.items())
+        fresh: Dict[str, str] = {}
+        for lo in range(0, len(misses), self.batch_size):
+            chunk = misses[lo:lo + self.batch_size]
+            mels, lengths = log_mel_batch(
+                [audios[i] for _, i in chunk], self.sr, pad_frames=self.model.pad_frames
+            )
+            with self._model_lock:
+                texts = self.model.transcribe_batch(mels, lengths)
+            for (key, _), text in zip(chunk, texts):
+                self.cache.put(key, text)
+                fresh[key] = text
+
+        return [
+            transcript if transcript is not None else fresh[key]
+            for key, transcript in zip(keys, transcripts)
+        ]
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        return self.transcribe_batch([audio])[0]
+
+    def score_batch(
+        self, reference_transcript: str, audios: Sequence[np.ndarray]
+    ) -> Dict[str, object]:
+        """Transcripts of audios plus their WER and CER against reference_transcript."""
+        hypotheses = self.transcribe_batch(audios)
+        references = [reference_transcript] * len(hypotheses)
+        return {
+            "transcripts": hypotheses,
+            "wer": batch_wer(references, hypotheses),
+            "cer": batch_cer(references, hypotheses),
+        }
+
+    def wer_score_fn(self, reference_transcript: str) -> Callable[[Sequence[np.ndarray]], np.ndarray]:
+        """Score function for `EOTEvaluator`: WER of each decoded clip."""
+        return lambda audios: self.score_batch(reference_transcript, audios)["wer"]
+
+
+__all__ = [
+    "ASRModel",
+    "ASRService",
+    "TinyTemplateASR",
+    "TranscriptCache",
+    "WhisperASRModel",
+    "audio_digest",
+    "batch_cer",
+    "batch_edit_distance",
+    "batch_wer",
+    "log_mel_batch",
+]
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Persistent cache of decoded audio for the analysis scripts.
+
+Decoding and resampling with librosa dominates `load_audio`, and the same
+originals are loaded once per adversarial target on every run. This module
+stores the decoded, resampled, peak-normalized float32 arrays as `.npy` files
+keyed by the file's content hash plus the decode settings, so repeat runs can
+memory-map them instead of decoding again. An in-process LRU layer serves
+repeat hits within one run without touching disk.
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+# Configuration
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+DEFAULT_MEMORY_ENTRIES = 64
+HASH_CHUNK_BYTES = 1 << 20
+
+
+def file_digest(path: Path, chunk_bytes: int = HASH_CHUNK_BYTES) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_bytes), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DecodedAudioCache:
+    """
+    Two-level (memory + disk) cache of decoded audio arrays.
+
+    Disk entries live in `cache_dir` as `<digest>_<sr>_<peak>.npy`. Their
+    modification time is refreshed on every hit, and once the directory
+    exceeds `max_bytes` the least recently used entries are deleted.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+        mmap: bool = True,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.mmap = mmap
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+
+    def key(self, filepath: Path, target_sr: int, normalize_peak: float) -> str:
+        """Cache key for a source file decoded with the given settings."""
+        path = Path(filepath).resolve()
+        stat = path.stat()
+        stat_key = (str(path), stat.st_mtime_ns, stat.st_size)
+        digest = self._digests.get(stat_key)
+        if digest is None:
+            digest = file_digest(path)
+            self._digests[stat_key] = digest
+        return f"{digest}_{target_sr}_{normalize_peak:g}"
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.npy"
+
+    def _remember(self, key: str, audio: np.ndarray) -> None:
+        self._memory[key] = audio
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return the cached array for key, or None on a miss."""
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            return audio
+
+        entry = self._entry_path(key)
+        try:
+            audio = np.load(entry, mmap_mode="r" if self.mmap else None)
+            os.utime(entry)
+        except (OSError, ValueError):
+            return None
+
+        self._remember(key, audio)
+        return audio
+
+    def put(self, key: str, audio: np.ndarray) -> None:
+        """Store audio under key in memory and on disk, then enforce max_bytes."""
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        self._remember(key, audio)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = self._entry_path(key)
+        tmp = entry.with_name(f"{entry.name}.{os.getpid()}.tmp")
+        with tmp.open("wb") as handle:
+            np.save(handle, audio)
+        # Atomic so concurrent workers never observe a partial entry
+        os.replace(tmp, entry)
+        self.evict()
+
+    def get_or_load(
+        self,
+        filepath: Path,
+        target_sr: int,
+        normalize_peak: float,
+        loader: Callable[[], np.ndarray],
+    ) -> np.ndarray:
+        """Return the cached decode of filepath, calling loader() on a miss."""
+        key = self.key(filepath, target_sr, normalize_peak)
+        audio = self.get(key)
+        if audio is None:
+            audio = loader()
+            self.put(key, audio)
+        return audio
+
+    def size_bytes(self) -> int:
+        """Total size of the on-disk entries."""
+        if not self.cache_dir.exists():
+            return 0
+        return sum(entry.stat().st_size for entry in self.cache_dir.glob("*.npy"))
+
+    def evict(self) -> None:
+        """Delete least recently used disk entries until under max_bytes."""
+        entries = []
+        for entry in self.cache_dir.glob("*.npy"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            self._memory.pop(entry.stem, None)
+            total -= size
+
+    def clear(self) -> None:
+        """Drop every entry from memory and disk."""
+        self._memory.clear()
+        if self.cache_dir.exists():
+            for entry in self.cache_dir.glob("*.npy"):
+                entry.unlink(missing_ok=True)
+
+
+__all__ = ["DecodedAudioCache", "file_digest"]
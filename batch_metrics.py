@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Batched quality metrics over many (reference, degraded) pairs.
+
+`calculate_snr`, `compute_pesq` and `compute_stoi` in `analyze_audio` score
+one pair per call. Scoring hundreds of EOT variants per iteration needs the
+whole batch at once: pairs are trimmed to their common length (as the
+single-pair metrics do), packed into zero-padded 2-D arrays with their
+lengths, and SNR, segmental SNR and log-spectral distance are computed in
+NumPy across the batch. PESQ has no vectorized form, so it falls back to
+per-item calls spread over a process pool. STOI is computed per item too,
+but pairs sharing a reference (every EOT variant of one clip) reuse that
+reference's side of the computation (`features.stoi_with_reference`).
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Configuration
+TARGET_SR = 16000
+SEGSNR_FRAME_MS = 20
+SEGSNR_MIN_DB = -10.0
+SEGSNR_MAX_DB = 35.0
+LSD_N_FFT = 512
+LSD_HOP = 256
+LSD_ITEMS_PER_CHUNK = 32
+EPS = 1e-10
+
+Pair = Tuple[np.ndarray, np.ndarray]
+
+
+def pack_pairs(pairs: Sequence[Pair]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pack pairs into zero-padded (batch, max_len) float64 arrays.
+
+    Each pair is first trimmed to min(len(reference), len(degraded)). Returns
+    (references, degraded, lengths).
+    """
+    lengths = np.array([min(len(ref), len(deg)) for ref, deg in pairs], dtype=np.int64)
+    width = int(lengths.max()) if len(lengths) else 0
+    references = np.zeros((len(pairs), width), dtype=np.float64)
+    degraded = np.zeros((len(pairs), width), dtype=np.float64)
+    for i, ((ref, deg), n) in enumerate(zip(pairs, lengths)):
+        references[i, :n] = ref[:n]
+        degraded[i, :n] = deg[:n]
+    return references, degraded, lengths
+
+
+def batch_snr(references: np.ndarray, degraded: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """SNR in dB per row; inf where the signals are identical (as calculate_snr)."""
+    # Padding is zero in both arrays, so plain row sums only see valid samples
+    signal_power = np.sum(references ** 2, axis=1) / np.maximum(lengths, 1)
+    noise_power = np.sum((degraded - references) ** 2, axis=1) / np.maximum(lengths, 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        snr = 10 * np.log10(signal_power / noise_power)
+    return np.where(noise_power == 0, np.inf, snr)
+
+
+def batch_segmental_snr(
+    references: np.ndarray,
+    degraded: np.ndarray,
+    lengths: np.ndarray,
+    sr: int = TARGET_SR,
+    frame_ms: int = SEGSNR_FRAME_MS,
+    min_db: float = SEGSNR_MIN_DB,
+    max_db: float = SEGSNR_MAX_DB,
+) -> np.ndarray:
+    """
+    Segmental SNR in dB: mean of per-frame SNRs clamped to [min_db, max_db].
+
+    Uses non-overlapping frames; only frames entirely inside a row's length
+    count. Rows shorter than one frame get NaN.
+    """
+    frame_len = int(sr * frame_ms / 1000)
+    n_frames = references.shape[1] // frame_len
+    usable = n_frames * frame_len
+    ref_frames = references[:, :usable].reshape(len(references), n_frames, frame_len)
+    deg_frames = degraded[:, :usable].reshape(len(degraded), n_frames, frame_len)
+
+    signal = np.sum(ref_frames ** 2, axis=2)
+    noise = np.sum((deg_frames - ref_frames) ** 2, axis=2)
+    frame_snr = np.clip(10 * np.log10((signal + EPS) / (noise + EPS)), min_db, max_db)
+
+    valid = np.arange(n_frames)[None, :] < (lengths // frame_len)[:, None]
+    counts = valid.sum(axis=1)
+    with np.errstate(invalid="ignore"):
+        return np.where(counts > 0, np.sum(frame_snr * valid, axis=1) / counts, np.nan)
+
+
+def _power_spectra(frames: np.ndarray, window: np.ndarray) -> np.ndarray:
+    return np.abs(np.fft.rfft(frames * window, axis=-1)) ** 2
+
+
+def batch_log_spectral_distance(
+    references: np.ndarray,
+    degraded: np.ndarray,
+    lengths: np.ndarray,
+    n_fft: int = LSD_N_FFT,
+    hop: int = LSD_HOP,
+    items_per_chunk: int = LSD_ITEMS_PER_CHUNK,
+) -> np.ndarray:
+    """
+    Log-spectral distance in dB per row, averaged over valid STFT frames.
+
+    Frames are strided views of the padded arrays; rows are processed in
+    chunks of `items_per_chunk` to bound the size of the spectra.
+    """
+    width = references.shape[1]
+    if width < n_fft:
+        return np.full(len(references), np.nan)
+
+    window = np.hanning(n_fft)
+    starts = np.arange(0, width - n_fft + 1, hop)
+    valid = (starts[None, :] + n_fft) <= lengths[:, None]
+    lsd = np.full(len(references), np.nan)
+
+    for lo in range(0, len(references), items_per_chunk):
+        hi = lo + items_per_chunk
+        ref_frames = sliding_window_view(references[lo:hi], n_fft, axis=1)[:, ::hop]
+        deg_frames = sliding_window_view(degraded[lo:hi], n_fft, axis=1)[:, ::hop]
+        ref_db = 10 * np.log10(_power_spectra(ref_frames, window) + EPS)
+        deg_db = 10 * np.log10(_power_spectra(deg_frames, window) + EPS)
+        frame_lsd = np.sqrt(np.mean((ref_db - deg_db) ** 2, axis=2))
+
+        chunk_valid = valid[lo:hi]
+        counts = chunk_valid.sum(axis=1)
+        with np.errstate(invalid="ignore"):
+            lsd[lo:hi] = np.where(
+                counts > 0, np.sum(frame_lsd * chunk_valid, axis=1) / counts, np.nan
+            )
+    return lsd
+
+
+def _pesq_or_nan(args: Tuple[np.ndarray, np.ndarray, int]) -> float:
+    from analyze_audio import compute_pesq
+
+    reference, degraded, sr = args
+    try:
+        return compute_pesq(reference, degraded, sr)
+    except Exception:
+        return float("nan")
+
+
+def batch_pesq(pairs: Sequence[Pair], sr: int = TARGET_SR, workers: int = 1) -> np.ndarray:
+    """PESQ per pair (NaN where PESQ fails), using a process pool when workers > 1."""
+    tasks = [(ref, deg, sr) for ref, deg in pairs]
+    if workers <= 1:
+        return np.array([_pesq_or_nan(task) for task in tasks])
+    from analyze_audio import warm_imports
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=warm_imports,
+                             initargs=("pesq",)) as executor:
+        return np.array(list(executor.map(_pesq_or_nan, tasks, chunksize=4)))
+
+
+def _stoi_group(args: Tuple[np.ndarray, List[np.ndarray], int]) -> List[float]:
+    """STOI of each degraded signal against one reference (already trimmed to its length)."""
+    from features import SignalFeatures, stoi_with_reference
+
+    reference, degraded, sr = args
+    features = SignalFeatures(reference, sr)
+    scores = []
+    for deg in degraded:
+        try:
+            scores.append(stoi_with_reference(features, deg))
+        except Exception:
+            scores.append(float("nan"))
+    return scores
+
+
+def batch_stoi(pairs: Sequence[Pair], sr: int = TARGET_SR, workers: int = 1) -> np.ndarray:
+    """
+    STOI per pair (NaN where STOI fails), as `compute_stoi` would score it.
+
+    Pairs are grouped by reference array and common length so each
+    reference is framed and transformed once; groups are spread over a
+    process pool when workers > 1.
+    """
+    groups: Dict[Tuple[int, int], Tuple[np.ndarray, List[np.ndarray], List[int]]] = {}
+    for i, (ref, deg) in enumerate(pairs):
+        n = min(len(ref), len(deg))
+        reference, degraded, rows = groups.setdefault((id(ref), n), (ref[:n], [], []))
+        degraded.append(deg[:n])
+        rows.append(i)
+    tasks = [(reference, degraded, sr) for reference, degraded, _ in groups.values()]
+    if workers <= 1:
+        results = map(_stoi_group, tasks)
+    else:
+        from analyze_audio import warm_imports
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=warm_imports,
+                                 initargs=("stoi",)) as executor:
+            results = list(executor.map(_stoi_group, tasks))
+    stoi = np.full(len(pairs), np.nan)
+    for (_, _, rows), scores in zip(groups.values(), results):
+        stoi[rows] = scores
+    return stoi
+
+
+def compute_batch_metrics(
+    pairs: Sequence[Pair],
+    sr: int = TARGET_SR,
+    include_pesq: bool = True,
+    workers: int = 1,
+    include_stoi: bool = True,
+) -> Dict[str, np.ndarray]:
+    """Score every (reference, degraded) pair; returns one array per metric."""
+    if not pairs:
+        return {}
+    references, degraded, lengths = pack_pairs(pairs)
+    metrics = {
+        "snr": batch_snr(references, degraded, lengths),
+        "segmental_snr": batch_segmental_snr(references, degraded, lengths, sr),
+        "lsd": batch_log_spectral_distance(references, degraded, lengths),
+    }
+    if include_pesq:
+        metrics["pesq"] = batch_pesq(pairs, sr, workers)
+    if include_stoi:
+        metrics["stoi"] = batch_stoi(pairs, sr, workers)
+    return metrics
+
+
+__all__ = [
+    "batch_log_spectral_distance",
+    "batch_pesq",
+    "batch_segmental_snr",
+    "batch_snr",
+    "batch_stoi",
+    "compute_batch_metrics",
+    "pack_pairs",
+]
@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmarks for the analysis, compression and feedback pipeline.
+
+Generates seeded, speech-like WAV fixtures laid out like the adversarial
+dataset (short / medium / long signal types, originals plus one adversarial
+sample per target type and an `adversarial_pairs.json`). It then times:
+
+* `load_audio` (uncached decode),
+* `align_signals`,
+* SNR, PESQ, STOI and the batched metrics,
+* an in-memory round trip through every codec in `PIPE_CODECS`,
+* `EncodeScheduler` compressing the fixtures, per format and single-pass,
+* the end-to-end `analyze_pairs` batch,
+* a full `FeedbackOrchestrator` loop with the NumPy perturbation engine.
+
+Each case reports latency percentiles and throughput as JSON, together with
+the machine and library versions. `--baseline` compares the median latency
+against an earlier report and can fail the run on regressions. Cases whose
+dependencies are missing (e.g. no ffmpeg) are reported as skipped, not
+failed. Fixtures live in a subdirectory keyed by a hash of their settings,
+so changing the seed or durations never reuses stale files.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Configuration
+TARGET_SR = 16000
+FIXTURE_DURATIONS_S = {"short": 1.9, "medium": 3.5, "long": 6.4}
+FIXTURES_PER_TYPE = 2
+FIXTURE_SEED = 1234
+DEFAULT_REPEAT = 5
+DEFAULT_WARMUP = 1
+DEFAULT_TOLERANCE = 0.10
+ADVERSARIAL_NOISE_DB = -30.0
+BENCHMARK_FILE = "benchmark_results.json"
+PERCENTILES = (50, 90, 99)
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+def synthetic_speech(duration_s: float, sr: int = TARGET_SR, seed: int = FIXTURE_SEED) -> np.ndarray:
+    """
+    Seeded speech-like signal: voiced syllables separated by pauses.
+
+    Each syllable is a glottal-like harmonic series on a drifting pitch
+    contour, shaped by two formant resonances and a raised-cosine envelope;
+    short noise bursts stand in for consonants. Peak-normalized to 0.9.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(duration_s * sr)
+    audio = np.zeros(n, dtype=np.float64)
+    t_start = int(0.1 * sr)
+
+    while t_start < n - int(0.1 * sr):
+        length = min(int(rng.uniform(0.12, 0.3) * sr), n - t_start)
+        t = np.arange(length) / sr
+        f0 = rng.uniform(100, 220) * (1 + 0.1 * np.sin(2 * np.pi * rng.uniform(2, 5) * t))
+        phase = 2 * np.pi * np.cumsum(f0) / sr
+        formants = rng.uniform([300, 900], [800, 2400])
+        harmonics = np.arange(1, 30)
+        freqs = f0[None, :] * harmonics[:, None]
+        gains = sum(
+            1.0 / (1.0 + ((freqs - f) / (0.15 * f)) ** 2) for f in formants
+        ) / harmonics[:, None]
+        syllable = np.sum(gains * np.sin(harmonics[:, None] * phase[None, :]), axis=0)
+        syllable *= np.hanning(length)
+
+        burst = min(int(0.02 * sr), length)
+        syllable[:burst] += 0.3 * rng.standard_normal(burst) * np.hanning(burst)
+        audio[t_start:t_start + length] += syllable
+        t_start += length + int(rng.uniform(0.03, 0.15) * sr)
+
+    peak = np.max(np.abs(audio))
+    return (0.9 * audio / peak if peak > 0 else audio).astype(np.float32)
+
+
+def fixture_key(per_type: int = FIXTURES_PER_TYPE, seed: int = FIXTURE_SEED, sr: int = TARGET_SR) -> str:
+    """Short hash of every setting that shapes the fixtures, naming their directory."""
+    config = {
+        "per_type": per_type,
+        "seed": seed,
+        "sr": sr,
+        "durations_s": FIXTURE_DURATIONS_S,
+        "adversarial_noise_db": ADVERSARIAL_NOISE_DB,
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def generate_fixtures(
+    root: Path,
+    per_type: int = FIXTURES_PER_TYPE,
+    seed: int = FIXTURE_SEED,
+    sr: int = TARGET_SR,
+) -> Path:
+    """
+    Write a miniature dataset under root and return its pairs JSON path.
+
+    Layout follows the real dataset, so `analyze_audio.build_pair_tasks`
+    works on it unchanged: `<type>-signals/Original-examples/sample-N.wav`
+    and `<type>-signals/adv-<target>-target/adv-<type>2<target>-N.wav`. The
+    adversarial samples are the original plus seeded noise at
+    ADVERSARIAL_NOISE_DB. Existing files are reused.
+    """
+    import soundfile as sf
+
+    root = Path(root)
+    pairs: Dict[str, List[Dict[str, Any]]] = {}
+    for type_index, (signal_type, duration) in enumerate(FIXTURE_DURATIONS_S.items()):
+        type_dir = root / f"{signal_type}-signals"
+        entries = []
+        for i in range(per_type):
+            sample_id = f"{type_index * 1000 + i:06d}"
+            original_name = f"sample-{sample_id}.wav"
+            original_path = type_dir / "Original-examples" / original_name
+            item_seed = seed + type_index * 1000 + i
+            original = synthetic_speech(duration, sr, item_seed)
+            if not original_path.exists():
+                original_path.parent.mkdir(parents=True, exist_ok=True)
+                sf.write(original_path, original, sr)
+
+            adversarial = {}
+            for target_index, target in enumerate(FIXTURE_DURATIONS_S):
+                adv_type = f"adv-{target}-target"
+                adv_name = f"adv-{signal_type}2{target}-{sample_id}.wav"
+                adv_path = type_dir / adv_type / adv_name
+                if not adv_path.exists():
+                    rng = np.random.default_rng([item_seed, target_index])
+                    noise = rng.standard_normal(len(original)).astype(np.float32)
+                    rms = np.sqrt(np.mean(original ** 2))
+                    noise *= rms * 10 ** (ADVERSARIAL_NOISE_DB / 20) / (np.sqrt(np.mean(noise ** 2)) + 1e-10)
+                    adv_path.parent.mkdir(parents=True, exist_ok=True)
+                    sf.write(adv_path, np.clip(original + noise, -1.0, 1.0), sr)
+                adversarial[adv_type] = adv_name
+            entries.append({"original": original_name, "adversarial_samples": adversarial})
+        pairs[f"{signal_type}-signals"] = entries
+
+    pairs_path = root / "adversarial_pairs.json"
+    with pairs_path.open("w") as handle:
+        json.dump(pairs, handle, indent=2)
+    return pairs_path
+
+
+# ---------------------------------------------------------------------------
+# Timing
+# ---------------------------------------------------------------------------
+
+def time_call(fn: Callable[[], Any], repeat: int = DEFAULT_REPEAT, warmup: int = DEFAULT_WARMUP) -> List[float]:
+    """Wall-clock seconds of `repeat` calls to fn, after `warmup` untimed calls."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples: Sequence[float], items: int = 1, audio_s: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Latency percentiles (ms) and throughput of timed samples.
+
+    `items` is how many units one call processes; `audio_s` how many seconds
+    of audio, which adds a real-time factor (audio seconds per wall second).
+    """
+    values = np.asarray(samples, dtype=np.float64)
+    summary: Dict[str, Any] = {
+        "n": len(values),
+        "mean_ms": float(values.mean() * 1e3),
+        "min_ms": float(values.min() * 1e3),
+        "max_ms": float(values.max() * 1e3),
+        **{f"p{q}_ms": float(np.percentile(values, q) * 1e3) for q in PERCENTILES},
+        "items_per_call": items,
+        "items_per_s": float(items / np.median(values)) if np.median(values) > 0 else float("inf"),
+    }
+    if audio_s is not None:
+        summary["realtime_factor"] = float(audio_s / np.median(values))
+    return summary
+
+
+# ---------------------------------------------------------------------------
+# Cases
+# ---------------------------------------------------------------------------
+
+class Skip(Exception):
+    """Raised by a case whose dependencies are unavailable."""
+
+
+class BenchmarkContext:
+    """Fixtures and preloaded arrays shared by the cases."""
+
+    def __init__(self, fixtures_dir: Path, per_type: int, repeat: int, warmup: int) -> None:
+        from analyze_audio import build_pair_tasks, configure_audio_cache, load_audio
+
+        # Time real decoding, not cache hits
+        configure_audio_cache(None)
+        self.fixtures_dir = Path(fixtures_dir) / fixture_key(per_type)
+        self.pairs_path = generate_fixtures(self.fixtures_dir, per_type)
+        random.seed(FIXTURE_SEED)
+        with self.pairs_path.open("r") as handle:
+            self.tasks = build_pair_tasks(json.load(handle), self.fixtures_dir, sample_size=per_type)
+        self.repeat = repeat
+        self.warmup = warmup
+        # One representative pair per signal type
+        self.pairs: Dict[str, tuple] = {}
+        for task in self.tasks:
+            if task.original_signal_type not in self.pairs and task.target_type == task.original_signal_type:
+                original, _ = load_audio(task.original_path)
+                adversarial, _ = load_audio(task.adversarial_path)
+                self.pairs[task.original_signal_type] = (task, original, adversarial)
+
+    def run(self, fn: Callable[[], Any], items: int = 1, audio_s: Optional[float] = None,
+            repeat: Optional[int] = None) -> Dict[str, Any]:
+        samples = time_call(fn, repeat or self.repeat, self.warmup)
+        return summarize(samples, items, audio_s)
+
+
+def bench_load(ctx: BenchmarkContext) -> Dict[str, Any]:
+    from analyze_audio import load_audio
+
+    return {
+        signal_type: ctx.run(lambda: load_audio(task.original_path), audio_s=len(original) / TARGET_SR)
+        for signal_type, (task, original, _) in ctx.pairs.items()
+    }
+
+
+def bench_align(ctx: BenchmarkContext) -> Dict[str, Any]:
+    from analyze_audio import align_signals
+
+    return {
+        signal_type: ctx.run(lambda: align_signals(original, adversarial),
+                             audio_s=len(original) / TARGET_SR)
+        for signal_type, (_, original, adversarial) in ctx.pairs.items()
+    }
+
+
+def bench_metrics(ctx: BenchmarkContext) -> Dict[str, Any]:
+    from analyze_audio import calculate_snr, compute_pesq, compute_stoi
+    from batch_metrics import compute_batch_metrics
+
+    results: Dict[str, Any] = {}
+    for signal_type, (_, original, adversarial) in ctx.pairs.items():
+        audio_s = len(original) / TARGET_SR
+        results[f"snr/{signal_type}"] = ctx.run(lambda: calculate_snr(original, adversarial), audio_s=audio_s)
+        results[f"pesq/{signal_type}"] = ctx.run(lambda: compute_pesq(original, adversarial), audio_s=audio_s)
+        results[f"stoi/{signal_type}"] = ctx.run(lambda: compute_stoi(original, adversarial), audio_s=audio_s)
+
+    batch = [(original, adversarial) for _, original, adversarial in ctx.pairs.values()] * 8
+    results["batch_no_pesq"] = ctx.run(
+        lambda: compute_batch_metrics(batch, TARGET_SR, include_pesq=False, include_stoi=False),
+        items=len(batch),
+    )
+    return results
+
+
+def bench_codecs(ctx: BenchmarkContext) -> Dict[str, Any]:
+    if shutil.which("ffmpeg") is None:
+        raise Skip("ffmpeg not found on PATH")
+    from codec_roundtrip import PIPE_CODECS, CodecRoundTrip
+    from compress_adversarial_audio import CompressionError
+
+    round_trip = CodecRoundTrip()
+    _, original, _ = ctx.pairs["medium"]
+    results: Dict[str, Any] = {}
+    for codec in PIPE_CODECS:
+        try:
+            results[codec] = ctx.run(lambda: round_trip.round_trip(original, codec),
+                                     audio_s=len(original) / TARGET_SR)
+        except CompressionError as exc:
+            results[codec] = {"skipped": str(exc)}
+    return results
+
+
+def bench_compression(ctx: BenchmarkContext) -> Dict[str, Any]:
+    if shutil.which("ffmpeg") is None:
+        raise Skip("ffmpeg not found on PATH")
+    from compress_adversarial_audio import FORMATS, EncodeJob, EncodeScheduler
+
+    inputs = [Path(task.adversarial_path) for task in ctx.tasks]
+
+    def compress(single_pass: bool) -> None:
+        # Fresh outputs every call, so nothing is skipped as up to date
+        with tempfile.TemporaryDirectory() as output_dir:
+            jobs = [
+                EncodeJob(path, Path(output_dir) / name / (path.stem + config["extension"]),
+                          list(config["options"]), name)
+                for path in inputs
+                for name, config in FORMATS.items()
+            ]
+            failed = [o for o in EncodeScheduler(single_pass=single_pass).run(jobs) if o.status == "failed"]
+            if failed:
+                raise Skip(f"{failed[0].job.format_name}: {failed[0].error}")
+
+    return {
+        variant: ctx.run(lambda: compress(single_pass), items=len(inputs) * len(FORMATS),
+                         repeat=max(1, ctx.repeat // 2))
+        for variant, single_pass in (("per_format", False), ("single_pass", True))
+    }
+
+
+def bench_analyze_pairs(ctx: BenchmarkContext) -> Dict[str, Any]:
+    from analyze_audio import analyze_pairs
+
+    return {
+        "serial": ctx.run(lambda: list(analyze_pairs(ctx.tasks, workers=1)),
+                          items=len(ctx.tasks), repeat=max(1, ctx.repeat // 2)),
+    }
+
+
+def bench_feedback_loop(ctx: BenchmarkContext) -> Dict[str, Any]:
+    from agentic_feedback import FeedbackOrchestrator
+    from perturbations import NumpyPerturbationEngine
+
+    results: Dict[str, Any] = {}
+    for signal_type, (task, _, _) in ctx.pairs.items():
+        orchestrator = FeedbackOrchestrator(perturb_engine=NumpyPerturbationEngine())
+        results[signal_type] = ctx.run(
+            lambda: orchestrator.run_feedback_loop(task.original_path, max_iterations=3)
+        )
+    return results
+
+
+CASES: Dict[str, Callable[[BenchmarkContext], Dict[str, Any]]] = {
+    "load": bench_load,
+    "align": bench_align,
+    "metrics": bench_metrics,
+    "codec_round_trip": bench_codecs,
+    "compression": bench_compression,
+    "analyze_pairs": bench_analyze_pairs,
+    "feedback_loop": bench_feedback_loop,
+}
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment_info() -> Dict[str, Any]:
+    """Machine and library versions, so reports from different hosts can be told apart."""
+    import scipy
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "ffmpeg": shutil.which("ffmpeg") is not None,
+    }
+
+
+def run_benchmarks(
+    fixtures_dir: Path,
+    cases: Sequence[str] = tuple(CASES),
+    per_type: int = FIXTURES_PER_TYPE,
+    repeat: int = DEFAULT_REPEAT,
+    warmup: int = DEFAULT_WARMUP,
+) -> Dict[str, Any]:
+    """Run the selected cases and return the full JSON-serializable report."""
+    ctx = BenchmarkContext(fixtures_dir, per_type, repeat, warmup)
+    report: Dict[str, Any] = {
+        "environment": environment_info(),
+        "config": {
+            "repeat": repeat,
+            "warmup": warmup,
+            "fixtures_per_type": per_type,
+            "fixture_seed": FIXTURE_SEED,
+            "fixture_key": fixture_key(per_type),
+            "fixture_durations_s": FIXTURE_DURATIONS_S,
+        },
+        "cases": {},
+    }
+    for name in cases:
+        print(f"  {name}...", end=" ", flush=True)
+        start = time.perf_counter()
+        try:
+            report["cases"][name] = CASES[name](ctx)
+            print(f"{time.perf_counter() - start:.1f}s")
+        except Skip as exc:
+            report["cases"][name] = {"skipped": str(exc)}
+            print(f"skipped ({exc})")
+    return report
+
+
+def _flatten(cases: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """case/variant -> summary for every timed entry."""
+    flat = {}
+    for case, variants in cases.items():
+        for variant, summary in variants.items():
+            if isinstance(summary, dict) and "p50_ms" in summary:
+                flat[f"{case}/{variant}"] = summary
+    return flat
+
+
+def compare_reports(
+    current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Median-latency comparison of two reports.
+
+    For every entry timed in both, reports the baseline and current p50, their
+    ratio, and a status: "regression" if slower by more than `tolerance`,
+    "improvement" if faster by more than it, else "unchanged".
+    """
+    now, then = _flatten(current["cases"]), _flatten(baseline["cases"])
+    comparison = {}
+    for key in sorted(now.keys() & then.keys()):
+        ratio = now[key]["p50_ms"] / then[key]["p50_ms"] if then[key]["p50_ms"] > 0 else float("inf")
+        if ratio > 1 + tolerance:
+            status = "regression"
+        elif ratio < 1 - tolerance:
+            status = "improvement"
+        else:
+            status = "unchanged"
+        comparison[key] = {
+            "baseline_p50_ms": then[key]["p50_ms"],
+            "current_p50_ms": now[key]["p50_ms"],
+            "ratio": ratio,
+            "status": status,
+        }
+    return comparison
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print("\n" + "=" * 80)
+    print(f"{'case':<36}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'items/s':>12}")
+    for key, summary in _flatten(report["cases"]).items():
+        print(f"{key:<36}{summary['p50_ms']:>10.2f}{summary['p90_ms']:>10.2f}"
+              f"{summary['p99_ms']:>10.2f}{summary['items_per_s']:>12.1f}")
+    for key, entry in report.get("comparison", {}).items():
+        if entry["status"] != "unchanged":
+            print(f"  {entry['status'].upper():<12} {key}: x{entry['ratio']:.2f} "
+                  f"({entry['baseline_p50_ms']:.2f} -> {entry['current_p50_ms']:.2f} ms)")
+
+
+def main(output_file: str = BENCHMARK_FILE, fixtures_dir: str = ".benchmark_fixtures",
+         cases: Sequence[str] = tuple(CASES), per_type: int = FIXTURES_PER_TYPE,
+         repeat: int = DEFAULT_REPEAT, warmup: int = DEFAULT_WARMUP,
+         baseline: Optional[str] = None, tolerance: float = DEFAULT_TOLERANCE) -> int:
+    print("Running benchmarks...")
+    report = run_benchmarks(Path(fixtures_dir), cases, per_type, repeat, warmup)
+
+    regressions = 0
+    if baseline:
+        with open(baseline, "r") as handle:
+            report["baseline"] = baseline
+            report["comparison"] = compare_reports(report, json.load(handle), tolerance)
+        regressions = sum(e["status"] == "regression" for e in report["comparison"].values())
+
+    with open(output_file, "w") as handle:
+        json.dump(report, handle, indent=2)
+    print_report(report)
+    print(f"\nReport saved to: {output_file}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=BENCHMARK_FILE, help="JSON report path")
+    parser.add_argument("--fixtures-dir", default=".benchmark_fixtures",
+                        help="Where synthetic fixtures are generated (reused while their settings match)")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES),
+                        help="Cases to run")
+    parser.add_argument("--per-type", type=int, default=FIXTURES_PER_TYPE,
+                        help="Fixture originals per signal type")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed calls per case")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP, help="Untimed calls per case")
+    parser.add_argument("--baseline", help="Earlier report to compare median latencies against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Relative p50 change treated as a regression/improvement")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Exit non-zero if any case regressed beyond --tolerance")
+    args = parser.parse_args()
+
+    regressed = main(args.output, args.fixtures_dir, args.cases, args.per_type,
+                     args.repeat, args.warmup, args.baseline, args.tolerance)
+    if args.fail_on_regression and regressed:
+        sys.exit(1)
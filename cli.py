@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Lightweight command line front end for the analysis pipeline.
+
+Answers the quick questions without importing the DSP/ML stack (librosa,
+scipy, pesq, pystoi, whisper):
+
+  python cli.py pairs [--signal-type short] [--list]
+  python cli.py results [--output audio_analysis_results.npz] [--by target_type] [--errors]
+  python cli.py plan [--sample-size 10] [--workers 4] [--resume] [--index dataset_index.npz]
+  python cli.py index [--rescan]
+
+`plan` samples pairs exactly as `analyze_audio.main` does (same seed), then
+reports how many are already recorded, how many are left, which input files
+are missing, and how the work would be chunked across workers. With --index
+it samples from the dataset index instead and plans cost-balanced chunks
+from the indexed durations, without touching any audio file.
+
+`index` builds (or incrementally refreshes) the dataset index and prints
+what it holds per signal type.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict
+
+import analyze_audio
+from dataset_index import INDEX_FILE, SAMPLING_STRATEGIES, load_or_scan
+from results_stream import SUMMARY_METRICS, completed_keys
+from results_table import MISSING, ResultsTable
+
+PLAN_SEED = 42
+
+
+def _load_pairs(pairs_file: str) -> Dict:
+    if not os.path.exists(pairs_file):
+        sys.exit(f"Error: {pairs_file} not found!")
+    with open(pairs_file, "r") as f:
+        return json.load(f)
+
+
+def cmd_pairs(args: argparse.Namespace) -> None:
+    data = _load_pairs(args.pairs_file)
+    for signal_type, pairs in data.items():
+        if args.signal_type and signal_type.replace("-signals", "") != args.signal_type:
+            continue
+        n_adversarial = sum(len(pair["adversarial_samples"]) for pair in pairs)
+        print(f"{signal_type}: {len(pairs)} originals, {n_adversarial} adversarial samples")
+        if args.list:
+            for pair in pairs:
+                targets = ", ".join(sorted(pair["adversarial_samples"].values()))
+                print(f"  {pair['original']}: {targets}")
+
+
+def cmd_results(args: argparse.Namespace) -> None:
+    if not os.path.exists(args.output):
+        sys.exit(f"Error: {args.output} not found!")
+
+    if Path(args.output).suffix == ".npz":
+        table = ResultsTable.load(args.output)
+    else:
+        table = ResultsTable.from_results(args.output)
+    valid = table.valid()
+    errors = table.filter(table.codes("error") != MISSING)
+
+    print(f"{args.output}: {len(table)} pairs, {len(valid)} valid, {len(errors)} errors")
+    print(f"{args.by:<18}{'pairs':>7}{'SNR dB':>10}{'PESQ':>8}{'STOI':>8}")
+    sizes = valid.value_counts(args.by)
+    for group, stats in sorted(valid.group_by(args.by, SUMMARY_METRICS).items(),
+                               key=lambda item: str(item[0])):
+        print(f"{str(group):<18}{sizes[group]:>7}{stats['snr']['mean']:>10.2f}"
+              f"{stats['pesq']['mean']:>8.2f}{stats['stoi']['mean']:>8.3f}")
+    if args.errors:
+        for result in errors.to_records():
+            print(f"  {result['original_file']} -> {result['adversarial_file']}: {result['error']}")
+
+
+def cmd_index(args: argparse.Namespace) -> None:
+    index = load_or_scan(args.index, Path(args.base_path), rescan=args.rescan, workers=args.scan_workers)
+    errors = len(index.table) - len(index.table.valid())
+    print(f"{args.index}: {len(index)} files, {errors} unreadable")
+    print(f"{'signal type':<14}{'originals':>10}{'adversarial':>13}{'hours':>9}{'MB':>10}")
+    for signal_type, info in index.summary().items():
+        print(f"{signal_type:<14}{info['originals']:>10}{info['adversarial']:>13}"
+              f"{info['hours']:>9.2f}{info['bytes'] / 1024 ** 2:>10.1f}")
+
+
+def cmd_plan(args: argparse.Namespace) -> None:
+    index = None
+    if args.index:
+        if not os.path.exists(args.index):
+            sys.exit(f"Error: {args.index} not found! Build it with `cli.py index`.")
+        index = load_or_scan(args.index, Path(args.base_path))
+        originals = index.sample_originals(args.sample_size, args.sampling, analyze_audio.SAMPLING_SEED)
+        tasks = index.pair_tasks(originals)
+    else:
+        data = _load_pairs(args.pairs_file)
+        random.seed(PLAN_SEED)
+        tasks = analyze_audio.build_pair_tasks(data, Path(args.base_path), args.sample_size)
+
+    done = completed_keys(args.output) if args.resume and os.path.exists(args.output) else set()
+    remaining = [
+        task for task in tasks
+        if (os.path.basename(task.original_path), os.path.basename(task.adversarial_path)) not in done
+    ]
+    missing = sorted({
+        path for task in remaining
+        for path in (task.original_path, task.adversarial_path)
+        if not os.path.exists(path)
+    })
+    by_type = Counter(f"{t.original_signal_type}2{t.target_type}" for t in remaining)
+    workers = args.workers or os.cpu_count() or 1
+
+    print(f"\nPlanned pairs: {len(tasks)} ({len(tasks) - len(remaining)} already in {args.output})")
+    if index is not None:
+        _, sizes = index.schedule(remaining, workers)
+        hours = sum(index.task_cost(task) for task in remaining) / 3600
+        print(f"To analyze:    {len(remaining)} pairs ({hours:.2f} h of audio) in {len(sizes)} "
+              f"cost-balanced chunk(s) over {min(workers, max(len(sizes), 1))} worker(s)")
+    else:
+        chunks = -(-len(remaining) // max(1, args.chunksize))
+        print(f"To analyze:    {len(remaining)} pairs in {chunks} chunk(s) of {args.chunksize} "
+              f"over {min(workers, max(chunks, 1))} worker(s)")
+    for signal_type, count in sorted(by_type.items()):
+        print(f"  {signal_type:<16}{count:>5}")
+    if missing:
+        print(f"Missing input files: {len(missing)}")
+        for path in missing[:args.show_missing]:
+            print(f"  {path}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs-file", default=analyze_audio.PAIRS_FILE,
+                        help="Original-to-adversarial mapping JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pairs = commands.add_parser("pairs", help="List dataset pairs")
+    pairs.add_argument("--signal-type", choices=["short", "medium", "long"])
+    pairs.add_argument("--list", action="store_true", help="Print every original and its targets")
+    pairs.set_defaults(func=cmd_pairs)
+
+    results = commands.add_parser("results", help="Summarize a results file")
+    results.add_argument("--output", default=analyze_audio.RESULTS_FILE,
+                         help="Results JSONL, legacy JSON, or .npz results table")
+    results.add_argument("--by", default="signal_type",
+                         choices=["signal_type", "source_type", "target_type"],
+                         help="Column to group summary statistics by")
+    results.add_argument("--errors", action="store_true", help="List failed pairs")
+    results.set_defaults(func=cmd_results)
+
+    plan = commands.add_parser("plan", help="Show what an analysis run would do")
+    plan.add_argument("--base-path", default=str(analyze_audio.DATASET_ROOT), help="Dataset root")
+    plan.add_argument("--sample-size", type=int, default=analyze_audio.SAMPLES_PER_SIGNAL_TYPE,
+                      help="Originals sampled per signal type")
+    plan.add_argument("--workers", type=int, default=1, help="Worker processes (0 = all cores)")
+    plan.add_argument("--chunksize", type=int, default=analyze_audio.DEFAULT_CHUNKSIZE)
+    plan.add_argument("--output", default=analyze_audio.RESULTS_FILE)
+    plan.add_argument("--resume", action="store_true", help="Skip pairs --output already records")
+    plan.add_argument("--show-missing", type=int, default=10, help="Missing files to list")
+    plan.add_argument("--index", default=None, help="Plan from this dataset index")
+    plan.add_argument("--sampling", choices=SAMPLING_STRATEGIES, default="stratified",
+                      help="How --index samples originals per signal type")
+    plan.set_defaults(func=cmd_plan)
+
+    index = commands.add_parser("index", help="Build or refresh the dataset index")
+    index.add_argument("--base-path", default=str(analyze_audio.DATASET_ROOT), help="Dataset root")
+    index.add_argument("--index", default=INDEX_FILE, help="Index file to build or read")
+    index.add_argument("--rescan", action="store_true",
+                       help="Rescan the dataset, re-reading only new or changed files")
+    index.add_argument("--scan-workers", type=int, default=8, help="Threads reading headers and hashes")
+    index.set_defaults(func=cmd_index)
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    args.func(args)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+In-memory codec round trips through ffmpeg pipes.
+
+Evaluating robustness to compression used to write a WAV, encode it to a file
+with ffmpeg, decode that back to another WAV and reload it with librosa. Here
+raw float32 PCM is streamed into an ffmpeg encoder whose stdout feeds an
+ffmpeg decoder directly, and the decoded PCM is read back from its stdout: no
+temporary files, no WAV parsing, and no resampling in Python when the rate
+already matches.
+"""
+
+import subprocess
+import threading
+from typing import Any, Dict, Optional, Set
+
+import numpy as np
+
+from compress_adversarial_audio import CompressionError
+
+# Configuration
+TARGET_SR = 16000
+ROUND_TRIP_TIMEOUT_S = 60.0
+
+# ffmpeg encoder and a streamable container for each codec
+PIPE_CODECS: Dict[str, Dict[str, Any]] = {
+    "opus": {"codec": "libopus", "format": "ogg"},
+    "amr-wb": {"codec": "libvo_amrwbenc", "format": "amr"},
+    "mp3": {"codec": "libmp3lame", "format": "mp3"},
+    "alac": {"codec": "alac", "format": "matroska"},
+}
+
+
+def _pcm_args(sr: int) -> list:
+    return ["-f", "f32le", "-ar", str(sr), "-ac", "1"]
+
+
+def _ffmpeg_pipe_cmd(input_args: list, output_args: list) -> list:
+    return [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        *input_args, "-i", "pipe:0",
+        *output_args, "pipe:1",
+    ]
+
+
+class ChildProcesses:
+    """
+    The live ffmpeg processes of a group of round trips.
+
+    Threads cannot be interrupted, so a caller that abandons round trips
+    (e.g. EOT stopping early) kills their processes instead; the round trips
+    then fail with CompressionError. Processes started after `terminate` are
+    killed on registration.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._processes: Set[subprocess.Popen] = set()
+        self.terminated = False
+
+    def add(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.add(process)
+            if self.terminated:
+                process.kill()
+
+    def discard(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.discard(process)
+
+    def terminate(self) -> None:
+        with self._lock:
+            self.terminated = True
+            for process in self._processes:
+                process.kill()
+
+
+def _feed(stream, payload: bytes) -> None:
+    try:
+        stream.write(payload)
+    except BrokenPipeError:
+        # The encoder exited early; its return code reports the failure
+        pass
+    finally:
+        stream.close()
+
+
+def _drain(stream, chunks: list) -> None:
+    """Read stream to EOF into chunks, so its writer can never block on a full pipe."""
+    try:
+        for chunk in iter(lambda: stream.read(65536), b""):
+            chunks.append(chunk)
+    finally:
+        stream.close()
+
+
+def encode_decode(
+    audio: np.ndarray,
+    codec_name: str,
+    bitrate_kbps: Optional[float] = None,
+    sr: int = TARGET_SR,
+    codecs: Dict[str, Dict[str, Any]] = PIPE_CODECS,
+    timeout: Optional[float] = ROUND_TRIP_TIMEOUT_S,
+    processes: Optional[ChildProcesses] = None,
+) -> np.ndarray:
+    """
+    Encode mono float32 audio with codec_name and decode it straight back.
+
+    Returns the decoded float32 signal at `sr`. Codec delay and padding are
+    left in place, so the result may be slightly longer than the input.
+    The ffmpeg processes are registered with `processes` while they run.
+    """
+    if codec_name not in codecs:
+        raise ValueError(f"Unsupported codec: {codec_name}")
+    config = codecs[codec_name]
+
+    encode_args = ["-c:a", config["codec"]]
+    if bitrate_kbps is not None:
+        encode_args += ["-b:a", f"{bitrate_kbps:g}k"]
+    encode_args += [*config.get("options", []), "-f", config["format"]]
+
+    encoder = subprocess.Popen(
+        _ffmpeg_pipe_cmd(_pcm_args(sr), encode_args),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    decoder = subprocess.Popen(
+        _ffmpeg_pipe_cmd(["-f", config["format"]], _pcm_args(sr)),
+        stdin=encoder.stdout,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    # The decoder owns the read end now; closing ours lets it see EOF
+    encoder.stdout.close()
+    if processes is not None:
+        processes.add(encoder)
+        processes.add(decoder)
+
+    pcm = np.ascontiguousarray(audio, dtype="<f4").tobytes()
+    writer = threading.Thread(target=_feed, args=(encoder.stdin, pcm), daemon=True)
+    writer.start()
+    # A verbose encoder must not stall the chain on a full stderr pipe
+    encode_err_chunks: list = []
+    stderr_reader = threading.Thread(target=_drain, args=(encoder.stderr, encode_err_chunks),
+                                     daemon=True)
+    stderr_reader.start()
+
+    try:
+        decoded, decode_err = decoder.communicate(timeout=timeout)
+        encoder.wait(timeout=timeout)
+    except subprocess.TimeoutExpired as exc:
+        encoder.kill()
+        decoder.kill()
+        encoder.wait()
+        decoder.wait()
+        raise CompressionError(
+            f"{codec_name} round trip timed out after {timeout}s"
+        ) from exc
+    finally:
+        writer.join()
+        stderr_reader.join()
+        if processes is not None:
+            processes.discard(encoder)
+            processes.discard(decoder)
+
+    if encoder.returncode != 0 or decoder.returncode != 0:
+        encode_err = b"".join(encode_err_chunks)
+        message = (encode_err or decode_err).decode(errors="replace").strip()
+        raise CompressionError(f"{codec_name} round trip failed: {message}")
+
+    return np.frombuffer(decoded, dtype="<f4").astype(np.float32)
+
+
+class CodecRoundTrip:
+    """
+    Reusable encode→decode helper for iterative attack loops.
+
+    Drop-in for the notebooks' `CodecStack.encode` + `decode` + reload
+    sequence, operating on arrays instead of files.
+    """
+
+    def __init__(
+        self,
+        codecs: Dict[str, Dict[str, Any]] = PIPE_CODECS,
+        sr: int = TARGET_SR,
+        timeout: Optional[float] = ROUND_TRIP_TIMEOUT_S,
+    ) -> None:
+        self.codecs = codecs
+        self.sr = sr
+        self.timeout = timeout
+
+    def round_trip(
+        self,
+        audio: np.ndarray,
+        codec_name: str,
+        bitrate_kbps: Optional[float] = None,
+        match_length: bool = True,
+        processes: Optional[ChildProcesses] = None,
+    ) -> np.ndarray:
+        """Return audio after codec_name compression, trimmed or zero-padded to len(audio)."""
+        decoded = encode_decode(
+            audio, codec_name, bitrate_kbps, self.sr, self.codecs, self.timeout, processes
+        )
+        if not match_length:
+            return decoded
+        if len(decoded) >= len(audio):
+            return decoded[: len(audio)]
+        return np.pad(decoded, (0, len(audio) - len(decoded)))
+
+
+__all__ = ["ChildProcesses", "CodecRoundTrip", "PIPE_CODECS", "encode_decode"]
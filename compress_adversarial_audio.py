@@ -2,23 +2,34 @@
 """
 Compress adversarial audio samples to MP3 and ALAC formats using ffmpeg.
 
-The script reads the 90 sampled adversarial pairs stored in
-`audio_analysis_results.json`, locates the corresponding adversarial audio files
-under the dataset root, and creates compressed copies inside the local
-`compressed_audio/` directory.
+The script reads the 90 sampled adversarial pairs streamed to
+`audio_analysis_results.jsonl` (or a legacy `audio_analysis_results.json`),
+locates the corresponding adversarial audio files under the dataset root, and
+creates compressed copies inside the local `compressed_audio/` directory.
 """
-import json
+import argparse
+import os
+import socket
 import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from artifact_store import ArtifactStore
+from dataset_index import adversarial_relpath
+from results_stream import iter_results
 
 # Paths
 PROJECT_ROOT = Path(__file__).parent
-RESULTS_PATH = PROJECT_ROOT / "audio_analysis_results.json"
+RESULTS_PATH = PROJECT_ROOT / "audio_analysis_results.jsonl"
+LEGACY_RESULTS_PATH = PROJECT_ROOT / "audio_analysis_results.json"
 DATASET_ROOT = Path(
     "/Users/kunal/Downloads/adversarial_dataset-A/Adversarial-Examples"
 )
 OUTPUT_ROOT = PROJECT_ROOT / "compressed_audio"
+STORE_ROOT = OUTPUT_ROOT / ".store"
 
 # Compression formats and ffmpeg options
 FORMATS: Dict[str, Dict[str, Iterable[str]]] = {
@@ -32,15 +43,74 @@ FORMATS: Dict[str, Dict[str, Iterable[str]]] = {
     },
 }
 
+# Bitrate ladders mirroring the notebooks' CODECS (kbps); see ladder_formats()
+LADDER_CODECS: Dict[str, Dict] = {
+    "opus": {"codec": "libopus", "extension": ".opus", "bitrates": [32, 64, 96, 128]},
+    "amr-wb": {
+        "codec": "libvo_amrwbenc",
+        "extension": ".amr",
+        "bitrates": [6.6, 8.85, 12.65, 14.25, 15.85, 18.25, 19.85, 23.05, 23.85],
+    },
+}
+LADDER_SAMPLE_RATE = 16000
+
+# Scheduler defaults
+DEFAULT_CONCURRENCY = os.cpu_count() or 4
+COMPRESSION_QUEUE = "compression"
+FFMPEG_TIMEOUT_S = 300.0
+FFMPEG_RETRIES = 1
+
 
 class CompressionError(Exception):
     """Raised when ffmpeg fails to compress an audio file."""
 
 
+def ladder_formats(codecs: Dict[str, Dict] = LADDER_CODECS) -> Dict[str, Dict[str, Iterable[str]]]:
+    """Expand codec bitrate ladders into FORMATS-style entries, one per bitrate."""
+    formats: Dict[str, Dict[str, Iterable[str]]] = {}
+    for codec_name, config in codecs.items():
+        for bitrate in config["bitrates"]:
+            formats[f"{codec_name}-{bitrate:g}k"] = {
+                "extension": config["extension"],
+                "options": [
+                    "-codec:a", config["codec"],
+                    "-ar", str(LADDER_SAMPLE_RATE),
+                    "-ac", "1",
+                    "-b:a", f"{bitrate:g}k",
+                ],
+            }
+    return formats
+
+
+@dataclass
+class EncodeJob:
+    """One ffmpeg encode of an input file to a single configured format."""
+
+    input_path: Path
+    output_path: Path
+    options: Sequence[str]
+    format_name: str
+
+
+@dataclass
+class JobOutcome:
+    """What happened to an EncodeJob when the scheduler ran it."""
+
+    job: EncodeJob
+    status: str  # "encoded", "skipped" or "failed"
+    attempts: int
+    started: float
+    finished: float
+    error: Optional[str] = None
+
+    @property
+    def elapsed_s(self) -> float:
+        return self.finished - self.started
+
+
 def load_results(path: Path) -> Iterable[Dict]:
-    """Load analysis results JSON."""
-    with path.open("r") as handle:
-        return json.load(handle)
+    """Lazily iterate analysis results (JSONL stream or legacy JSON list)."""
+    return iter_results(path)
 
 
 def determine_paths(adversarial_filename: str) -> Optional[Path]:
@@ -50,17 +120,8 @@ def determine_paths(adversarial_filename: str) -> Optional[Path]:
     Filenames follow the pattern: adv-<orig>2<target>-<id>.wav
     Example: adv-short2long-000303.wav
     """
-    stem = adversarial_filename.removeprefix("adv-")
-    try:
-        orig_target, _ = stem.rsplit("-", 1)
-        original_type, target_type = orig_target.split("2", 1)
-    except ValueError:
-        return None
-
-    signal_dir = f"{original_type}-signals"
-    adv_dir = f"adv-{target_type}-target"
-
-    return DATASET_ROOT / signal_dir / adv_dir / adversarial_filename
+    relpath = adversarial_relpath(adversarial_filename)
+    return DATASET_ROOT / relpath if relpath is not None else None
 
 
 def ensure_directory(path: Path) -> None:
@@ -68,7 +129,12 @@ def ensure_directory(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
-def run_ffmpeg(input_path: Path, output_path: Path, options: Iterable[str]) -> None:
+def run_ffmpeg(
+    input_path: Path,
+    output_path: Path,
+    options: Iterable[str],
+    timeout: Optional[float] = None,
+) -> None:
     """Invoke ffmpeg with the given options."""
     cmd = [
         "ffmpeg",
@@ -83,36 +149,299 @@ def run_ffmpeg(input_path: Path, output_path: Path, options: Iterable[str]) -> N
     ]
 
     try:
-        subprocess.run(cmd, check=True)
+        subprocess.run(cmd, check=True, timeout=timeout)
     except subprocess.CalledProcessError as exc:
         raise CompressionError(
             f"ffmpeg failed for {input_path.name} -> {output_path.name}"
         ) from exc
+    except subprocess.TimeoutExpired as exc:
+        raise CompressionError(
+            f"ffmpeg timed out after {timeout}s for {input_path.name} -> {output_path.name}"
+        ) from exc
 
 
-def compress_file(adversarial_path: Path, original_type: str) -> None:
-    """Compress a single adversarial file to all configured formats."""
-    for name, config in FORMATS.items():
+def run_ffmpeg_multi(
+    input_path: Path,
+    outputs: Sequence[Tuple[Path, Iterable[str]]],
+    timeout: Optional[float] = None,
+) -> None:
+    """Decode input_path once and encode it to every (output_path, options) pair."""
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", str(input_path)]
+    for output_path, options in outputs:
+        cmd.extend([*options, str(output_path)])
+
+    names = ", ".join(output_path.name for output_path, _ in outputs)
+    try:
+        subprocess.run(cmd, check=True, timeout=timeout)
+    except subprocess.CalledProcessError as exc:
+        raise CompressionError(f"ffmpeg failed for {input_path.name} -> {names}") from exc
+    except subprocess.TimeoutExpired as exc:
+        raise CompressionError(
+            f"ffmpeg timed out after {timeout}s for {input_path.name} -> {names}"
+        ) from exc
+
+
+def plan_jobs(
+    adversarial_path: Path,
+    original_type: str,
+    formats: Optional[Dict[str, Dict[str, Iterable[str]]]] = None,
+) -> List[EncodeJob]:
+    """Build one EncodeJob per configured format for an adversarial file."""
+    jobs = []
+    for name, config in (formats or FORMATS).items():
         extension = config["extension"]
         output_dir = OUTPUT_ROOT / name / original_type
-        ensure_directory(output_dir)
         output_path = output_dir / (adversarial_path.stem + extension)
+        jobs.append(EncodeJob(adversarial_path, output_path, list(config["options"]), name))
+    return jobs
+
+
+def compress_file(adversarial_path: Path, original_type: str) -> None:
+    """Compress a single adversarial file to all configured formats."""
+    for job in plan_jobs(adversarial_path, original_type):
+        ensure_directory(job.output_path.parent)
 
-        if output_path.exists():
+        if job.output_path.exists():
             continue
 
-        run_ffmpeg(adversarial_path, output_path, config["options"])
+        run_ffmpeg(job.input_path, job.output_path, job.options)
+
+
+class EncodeScheduler:
+    """
+    Runs EncodeJobs concurrently on a bounded thread pool.
+
+    Each ffmpeg call is a blocking subprocess, so threads are enough to keep
+    `max_workers` encoders busy. Jobs whose output already exists are skipped;
+    failed or timed-out encodes are retried up to `retries` more times. Output
+    is written to a temporary name and renamed on success, so an interrupted
+    encode never leaves a file that a later run would mistake for a result.
+
+    With `single_pass`, jobs that share an input are run as one ffmpeg process
+    that decodes the input once and writes every pending format. If that
+    combined run fails, the group falls back to per-format encodes so each
+    failing format is still reported on its own.
+
+    With an ArtifactStore, "up to date" means the output is linked to the
+    artifact for the current input content and options rather than merely
+    existing, and new encodes are added to the store before being linked.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_CONCURRENCY,
+        timeout_s: Optional[float] = FFMPEG_TIMEOUT_S,
+        retries: int = FFMPEG_RETRIES,
+        single_pass: bool = False,
+        store: Optional[ArtifactStore] = None,
+    ) -> None:
+        self.max_workers = max(1, max_workers)
+        self.timeout_s = timeout_s
+        self.retries = max(0, retries)
+        self.single_pass = single_pass
+        self.store = store
+
+    def _up_to_date(self, job: EncodeJob) -> bool:
+        if self.store is None:
+            return job.output_path.exists()
+        key = self.store.key_for(job.input_path, job.format_name, job.options)
+        if self.store.is_current(key, job.output_path):
+            return True
+        if self.store.lookup(key) is not None:
+            # Same content and options already encoded elsewhere; just link it
+            self.store.materialize(key, job.output_path)
+            return True
+        return False
+
+    def _finish(self, job: EncodeJob, partial: Path) -> None:
+        if self.store is None:
+            os.replace(partial, job.output_path)
+            return
+        key = self.store.key_for(job.input_path, job.format_name, job.options)
+        self.store.add(key, partial, job.format_name, job.options)
+        self.store.materialize(key, job.output_path)
+
+    @staticmethod
+    def _partial_path(job: EncodeJob) -> Path:
+        return job.output_path.with_name(f".{job.output_path.stem}.part{job.output_path.suffix}")
+
+    def run_job(self, job: EncodeJob) -> JobOutcome:
+        started = time.perf_counter()
+        if self._up_to_date(job):
+            return JobOutcome(job, "skipped", 0, started, time.perf_counter())
+
+        ensure_directory(job.output_path.parent)
+        partial = self._partial_path(job)
+        error = None
+        for attempt in range(1, self.retries + 2):
+            try:
+                run_ffmpeg(job.input_path, partial, job.options, timeout=self.timeout_s)
+                self._finish(job, partial)
+                return JobOutcome(job, "encoded", attempt, started, time.perf_counter())
+            except CompressionError as exc:
+                error = str(exc)
+                partial.unlink(missing_ok=True)
+
+        return JobOutcome(job, "failed", self.retries + 1, started, time.perf_counter(), error)
+
+    def run_group(self, jobs: Sequence[EncodeJob]) -> List[JobOutcome]:
+        """Encode jobs sharing one input in a single ffmpeg pass."""
+        started = time.perf_counter()
+        outcomes, pending = [], []
+        for job in jobs:
+            if self._up_to_date(job):
+                outcomes.append(JobOutcome(job, "skipped", 0, started, started))
+            else:
+                pending.append(job)
+        if len(pending) <= 1:
+            return outcomes + [self.run_job(job) for job in pending]
+
+        for job in pending:
+            ensure_directory(job.output_path.parent)
+        partials = [self._partial_path(job) for job in pending]
+        try:
+            run_ffmpeg_multi(
+                pending[0].input_path,
+                [(partial, job.options) for partial, job in zip(partials, pending)],
+                timeout=self.timeout_s,
+            )
+        except CompressionError:
+            for partial in partials:
+                partial.unlink(missing_ok=True)
+            return outcomes + [self.run_job(job) for job in pending]
+
+        finished = time.perf_counter()
+        for partial, job in zip(partials, pending):
+            self._finish(job, partial)
+            outcomes.append(JobOutcome(job, "encoded", 1, started, finished))
+        return outcomes
+
+    def run(self, jobs: Sequence[EncodeJob]) -> List[JobOutcome]:
+        """Run all jobs and return their outcomes in completion order."""
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                if not self.single_pass:
+                    futures = [executor.submit(self.run_job, job) for job in jobs]
+                    return [future.result() for future in as_completed(futures)]
+
+                groups: Dict[Path, List[EncodeJob]] = {}
+                for job in jobs:
+                    groups.setdefault(job.input_path, []).append(job)
+                futures = [executor.submit(self.run_group, group) for group in groups.values()]
+                return [outcome for future in as_completed(futures) for outcome in future.result()]
+        finally:
+            if self.store is not None:
+                self.store.save()
+
+
+def run_encode_job(payload: Dict) -> Dict:
+    """
+    work_queue handler: run one EncodeJob described by payload.
 
+    Raises CompressionError when every local attempt failed, so the queue
+    can retry the job (possibly on another node) before marking it failed.
+    """
+    job = EncodeJob(Path(payload["input_path"]), Path(payload["output_path"]),
+                    payload["options"], payload["format_name"])
+    scheduler = EncodeScheduler(1, payload["timeout_s"], payload["retries"])
+    started = time.time()
+    outcome = scheduler.run_job(job)
+    if outcome.status == "failed":
+        raise CompressionError(outcome.error)
+    # Wall-clock times, comparable across worker processes for throughput_report
+    return {"status": outcome.status, "attempts": outcome.attempts,
+            "started": started, "finished": started + outcome.elapsed_s}
+
+
+def run_queued(
+    jobs: Sequence[EncodeJob],
+    queue_file: Path,
+    max_workers: int = DEFAULT_CONCURRENCY,
+    timeout_s: Optional[float] = FFMPEG_TIMEOUT_S,
+    retries: int = FFMPEG_RETRIES,
+) -> List[JobOutcome]:
+    """
+    Seed a shared work queue with jobs and encode from it until it drains.
 
-def main() -> None:
-    if not RESULTS_PATH.exists():
+    Run on every node with the same plan: enqueueing is idempotent, each
+    node works the queue with max_workers threads, and the returned
+    outcomes cover the jobs of all nodes.
+    """
+    from work_queue import WorkQueue, format_progress, run_nodes
+
+    queue = WorkQueue(queue_file, COMPRESSION_QUEUE)
+    added = queue.enqueue(
+        (f"{job.format_name}:{job.output_path}",
+         {"input_path": str(job.input_path), "output_path": str(job.output_path),
+          "options": list(job.options), "format_name": job.format_name,
+          "timeout_s": timeout_s, "retries": retries},
+         1.0)
+        for job in jobs
+    )
+    print(f"Queue {queue_file}: {added} new of {len(jobs)} planned encodes on {socket.gethostname()}")
+    run_nodes(queue_file, COMPRESSION_QUEUE, run_encode_job, max_workers, threads=True)
+    print(format_progress(queue.progress()))
+
+    outcomes = []
+    for _, status, payload, result, error in queue.results():
+        job = EncodeJob(Path(payload["input_path"]), Path(payload["output_path"]),
+                        payload["options"], payload["format_name"])
+        if status == "failed":
+            outcomes.append(JobOutcome(job, "failed", 0, 0.0, 0.0, error))
+        else:
+            outcomes.append(JobOutcome(job, result["status"], result["attempts"],
+                                       result["started"], result["finished"]))
+    return outcomes
+
+
+def throughput_report(outcomes: Sequence[JobOutcome], wall_time_s: float) -> Dict[str, Dict]:
+    """Per-format counts, wall time and encode throughput for a scheduler run."""
+    report: Dict[str, Dict] = {}
+    for name in sorted({outcome.job.format_name for outcome in outcomes}):
+        group = [o for o in outcomes if o.job.format_name == name]
+        encoded = [o for o in group if o.status == "encoded"]
+        wall = (
+            max(o.finished for o in encoded) - min(o.started for o in encoded)
+            if encoded
+            else 0.0
+        )
+        report[name] = {
+            "encoded": len(encoded),
+            "skipped": sum(o.status == "skipped" for o in group),
+            "failed": sum(o.status == "failed" for o in group),
+            "wall_time_s": wall,
+            "encode_time_s": sum(o.elapsed_s for o in encoded),
+            "files_per_s": len(encoded) / wall if wall > 0 else 0.0,
+        }
+    total_encoded = sum(entry["encoded"] for entry in report.values())
+    report["total"] = {
+        "encoded": total_encoded,
+        "wall_time_s": wall_time_s,
+        "files_per_s": total_encoded / wall_time_s if wall_time_s > 0 else 0.0,
+    }
+    return report
+
+
+def main(
+    max_workers: int = DEFAULT_CONCURRENCY,
+    timeout_s: Optional[float] = FFMPEG_TIMEOUT_S,
+    retries: int = FFMPEG_RETRIES,
+    single_pass: bool = False,
+    include_ladders: bool = False,
+    use_store: bool = False,
+    queue_file: Optional[Path] = None,
+) -> None:
+    results_path = RESULTS_PATH if RESULTS_PATH.exists() else LEGACY_RESULTS_PATH
+    if not results_path.exists():
         raise FileNotFoundError(
             f"Analysis results not found at {RESULTS_PATH}. Run analyze_audio.py first."
         )
 
     ensure_directory(OUTPUT_ROOT)
-    results = load_results(RESULTS_PATH)
+    results = load_results(results_path)
+    formats = {**FORMATS, **ladder_formats()} if include_ladders else FORMATS
 
+    jobs: List[EncodeJob] = []
     processed = 0
     skipped = 0
     for entry in results:
@@ -131,15 +460,67 @@ def main() -> None:
             continue
 
         original_type = filename.split("-")[1].split("2", 1)[0]
-        compress_file(adversarial_path, original_type)
+        jobs.extend(plan_jobs(adversarial_path, original_type, formats))
         processed += 1
 
+    store = ArtifactStore(STORE_ROOT) if use_store else None
+    scheduler = EncodeScheduler(max_workers, timeout_s, retries, single_pass, store)
+    start = time.perf_counter()
+    if queue_file is not None:
+        if use_store or single_pass:
+            # The store manifest has a single writer, and a queued job is one encode
+            raise ValueError("--queue cannot be combined with --store or --single-pass")
+        outcomes = run_queued(jobs, queue_file, max_workers, timeout_s, retries)
+    else:
+        outcomes = scheduler.run(jobs)
+    report = throughput_report(outcomes, time.perf_counter() - start)
+
+    for outcome in outcomes:
+        if outcome.status == "failed":
+            print(f"FAILED ({outcome.job.format_name}): {outcome.error}")
+
     print(
         f"Compression complete. Processed {processed} files. "
         f"Skipped {skipped} entries (errors or missing files)."
     )
+    for name, stats in report.items():
+        if name == "total":
+            continue
+        print(
+            f"  {name}: {stats['encoded']} encoded, {stats['skipped']} up to date, "
+            f"{stats['failed']} failed in {stats['wall_time_s']:.1f}s "
+            f"({stats['files_per_s']:.2f} files/s)"
+        )
+    total = report["total"]
+    print(
+        f"  total: {total['encoded']} encodes in {total['wall_time_s']:.1f}s "
+        f"({total['files_per_s']:.2f} files/s, {scheduler.max_workers} workers"
+        f"{', single-pass' if single_pass else ''})"
+    )
 
 
 if __name__ == "__main__":
-    main()
-
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Maximum concurrent ffmpeg processes")
+    parser.add_argument("--timeout", type=float, default=FFMPEG_TIMEOUT_S,
+                        help="Per-encode timeout in seconds (0 disables)")
+    parser.add_argument("--retries", type=int, default=FFMPEG_RETRIES,
+                        help="Extra attempts for a failed encode")
+    parser.add_argument("--single-pass", action="store_true",
+                        help="Decode each input once and encode all formats in one ffmpeg run")
+    parser.add_argument("--ladders", action="store_true",
+                        help="Also encode the Opus and AMR-WB bitrate ladders")
+    parser.add_argument("--store", action="store_true",
+                        help="Track outputs in the content-addressed artifact store")
+    parser.add_argument("--queue", type=Path, default=None,
+                        help="Shared SQLite work queue; run this on every node (see work_queue.py)")
+    parser.add_argument("--gc", action="store_true",
+                        help="Remove store objects no output links to, then exit")
+    args = parser.parse_args()
+    if args.gc:
+        removed = ArtifactStore(STORE_ROOT).gc()
+        print(f"Removed {len(removed)} unreferenced artifacts from {STORE_ROOT}.")
+    else:
+        main(args.jobs, args.timeout or None, args.retries, args.single_pass,
+             args.ladders, args.store, args.queue)
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Precomputed index of the adversarial dataset.
+
+Every script used to rediscover the dataset on its own: `analyze_audio`
+re-derives target types by substring search on filenames and samples pairs
+blindly from `adversarial_pairs.json`, and `compress_adversarial_audio`
+parses the same filenames again to find files. None of them know durations
+or sizes before opening the audio.
+
+`scan_dataset` walks the dataset root once and records, per audio file, its
+path (relative to the root), role (original/adversarial), signal and target
+type, the original it belongs to, duration, sample rate, frame and channel
+counts, size, mtime and SHA-256. Only file headers are read. The result is a
+`ResultsTable` saved as one `.npz` (`dataset_index.npz`), and a rescan
+reuses the entries of files whose size and mtime are unchanged.
+
+`DatasetIndex` then answers planning questions from metadata alone:
+stratified or duration-balanced sampling of originals, expansion into
+`PairTask`s, and work-size-aware chunking (`schedule`) that keeps an
+original's targets together and hands the longest work out first.
+
+Layout (as in the released dataset):
+
+    <root>/<type>-signals/Original-examples/sample-<id>.wav
+    <root>/<type>-signals/adv-<target>-target/adv-<type>2<target>-<id>.wav
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from audio_cache import file_digest
+from results_table import ResultsTable
+
+# Configuration
+INDEX_FILE = "dataset_index.npz"
+ORIGINALS_DIR = "Original-examples"
+AUDIO_EXTENSIONS = (".wav", ".flac", ".mp3", ".m4a")
+TARGET_ORDER = ("short", "medium", "long")
+INDEX_CATEGORICAL = ("path", "role", "signal_type", "target_type", "sample_id",
+                     "original", "sha256", "error")
+INDEX_NUMERIC = ("duration_s", "sr", "frames", "channels", "size", "mtime")
+SAMPLING_STRATEGIES = ("stratified", "duration")
+CHUNKS_PER_WORKER = 4
+DEFAULT_SCAN_WORKERS = 8
+
+
+class ParsedName(NamedTuple):
+    """What a dataset filename says about the file."""
+
+    role: str  # "original" or "adversarial"
+    source_type: Optional[str]  # from the name; None for originals
+    target_type: Optional[str]
+    sample_id: str
+
+
+def parse_filename(filename: str) -> Optional[ParsedName]:
+    """
+    Parse `sample-<id>.wav` or `adv-<source>2<target>-<id>.wav`.
+
+    Returns None for names that follow neither pattern.
+    """
+    stem = Path(filename).stem
+    if stem.startswith("adv-"):
+        pair, _, sample_id = stem[len("adv-"):].rpartition("-")
+        source, sep, target = pair.partition("2")
+        if not (sep and source and target and sample_id):
+            return None
+        return ParsedName("adversarial", source, target, sample_id)
+    if stem.startswith("sample-") and len(stem) > len("sample-"):
+        return ParsedName("original", None, None, stem[len("sample-"):])
+    return None
+
+
+def original_relpath(signal_type: str, filename: str) -> str:
+    return f"{signal_type}-signals/{ORIGINALS_DIR}/{filename}"
+
+
+def adversarial_relpath(filename: str) -> Optional[str]:
+    """Dataset-relative path of an adversarial file, from its name alone."""
+    parsed = parse_filename(filename)
+    if parsed is None or parsed.role != "adversarial":
+        return None
+    return f"{parsed.source_type}-signals/adv-{parsed.target_type}-target/{filename}"
+
+
+def _iter_audio_files(root: Path) -> Iterator[Path]:
+    """Audio files two levels below the `*-signals` directories of root, sorted."""
+    for signal_dir in sorted(root.glob("*-signals")):
+        for path in sorted(signal_dir.glob("*/*")):
+            if path.suffix.lower() in AUDIO_EXTENSIONS and path.is_file():
+                yield path
+
+
+def _scan_file(root: Path, path: Path, previous: Dict[str, Dict]) -> Dict:
+    """Index entry for one file; reuses the previous entry when size and mtime match."""
+    relpath = path.relative_to(root).as_posix()
+    stat = path.stat()
+    old = previous.get(relpath)
+    if old is not None and old["size"] == stat.st_size and old["mtime"] == stat.st_mtime:
+        return old
+
+    signal_type = relpath.split("/", 1)[0].removesuffix("-signals")
+    parsed = parse_filename(path.name)
+    entry = {
+        "path": relpath,
+        "role": parsed.role if parsed else None,
+        "signal_type": signal_type,
+        "target_type": parsed.target_type if parsed else None,
+        "sample_id": parsed.sample_id if parsed else None,
+        "original": original_relpath(signal_type, f"sample-{parsed.sample_id}{path.suffix}") if parsed else None,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "error": None if parsed else "Unrecognized filename",
+    }
+    try:
+        import soundfile as sf
+        info = sf.info(str(path))
+        entry.update(duration_s=info.frames / info.samplerate, sr=info.samplerate,
+                     frames=info.frames, channels=info.channels)
+    except Exception as e:
+        entry["error"] = str(e)
+    entry["sha256"] = file_digest(path)
+    return entry
+
+
+def scan_dataset(root: Path, previous: Optional["DatasetIndex"] = None,
+                 workers: int = DEFAULT_SCAN_WORKERS) -> "DatasetIndex":
+    """
+    Index every audio file under root (headers and hashes only).
+
+    Entries of `previous` whose size and mtime still match are reused, so a
+    rescan only reads new or changed files. Files that cannot be parsed or
+    opened are kept with an `error`.
+    """
+    root = Path(root)
+    old = {}
+    if previous is not None:
+        old = {record["path"]: record for record in previous.table.to_records()}
+    paths = list(_iter_audio_files(root))
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        entries = list(executor.map(lambda path: _scan_file(root, path, old), paths))
+    return DatasetIndex(ResultsTable.from_records(entries, INDEX_CATEGORICAL, INDEX_NUMERIC), root)
+
+
+class DatasetIndex:
+    """
+    Metadata-only view of the dataset for sampling and scheduling.
+
+    Wraps a `ResultsTable` with one row per file; paths are stored relative
+    to the dataset root so an index moves with the dataset.
+    """
+
+    def __init__(self, table: ResultsTable, root: Path) -> None:
+        self.table = table
+        self.root = Path(root)
+        self._durations: Optional[Dict[str, float]] = None
+
+    @classmethod
+    def load(cls, path: Path, root: Path) -> "DatasetIndex":
+        return cls(ResultsTable.load(path), root)
+
+    def save(self, path: Path) -> None:
+        self.table.save(path)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    @property
+    def originals(self) -> ResultsTable:
+        return self.table.where(role="original").valid()
+
+    @property
+    def adversarial(self) -> ResultsTable:
+        return self.table.where(role="adversarial").valid()
+
+    def duration(self, relpath: str) -> float:
+        """Indexed duration of a file in seconds (NaN if unknown)."""
+        if self._durations is None:
+            self._durations = dict(zip(self.table["path"].tolist(),
+                                       self.table["duration_s"].tolist()))
+        return self._durations.get(relpath, float("nan"))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per signal type: files, originals, adversarial samples, hours of audio, bytes."""
+        summary = {}
+        valid = self.table.valid()
+        for signal_type in sorted(t for t in valid.value_counts("signal_type") if t is not None):
+            rows = valid.where(signal_type=signal_type)
+            summary[signal_type] = {
+                "files": len(rows),
+                "originals": len(rows.where(role="original")),
+                "adversarial": len(rows.where(role="adversarial")),
+                "hours": float(np.nansum(rows["duration_s"]) / 3600),
+                "bytes": int(np.nansum(rows["size"])),
+            }
+        return summary
+
+    def sample_originals(self, per_type: int, strategy: str = "stratified",
+                         seed: int = 0) -> ResultsTable:
+        """
+        Up to per_type originals from each signal type.
+
+        "stratified" samples uniformly within each signal type. "duration"
+        splits each type's originals into per_type duration quantile bins and
+        draws one from each, so short and long recordings are both covered.
+        """
+        if strategy not in SAMPLING_STRATEGIES:
+            raise ValueError(f"Unknown sampling strategy {strategy!r}; expected one of {SAMPLING_STRATEGIES}")
+        rng = np.random.default_rng(seed)
+        originals = self.originals
+        selected = []
+        for signal_type in sorted(t for t in originals.value_counts("signal_type") if t is not None):
+            rows = originals.rows("signal_type", signal_type)
+            n = min(per_type, len(rows))
+            if n == 0:
+                continue
+            if strategy == "stratified":
+                picked = rng.choice(rows, n, replace=False)
+            else:
+                by_duration = rows[np.argsort(originals.data["duration_s"][rows], kind="stable")]
+                picked = np.array([group[rng.integers(len(group))]
+                                   for group in np.array_split(by_duration, n)])
+            selected.append(np.sort(picked))
+        return originals.take(np.concatenate(selected) if selected else np.zeros(0, dtype=np.int64))
+
+    def pair_tasks(self, originals: Optional[ResultsTable] = None) -> List:
+        """PairTasks (absolute paths) for each original's indexed adversarial samples."""
+        from analyze_audio import PairTask
+
+        originals = self.originals if originals is None else originals
+        adversarial = self.adversarial
+        target_rank = {target: i for i, target in enumerate(TARGET_ORDER)}
+        tasks = []
+        for relpath, signal_type in zip(originals["path"].tolist(), originals["signal_type"].tolist()):
+            rows = adversarial.take(adversarial.rows("original", relpath))
+            targets = sorted(zip(rows["target_type"].tolist(), rows["path"].tolist()),
+                             key=lambda item: (target_rank.get(item[0], len(target_rank)), item[1]))
+            for target, adv_relpath in targets:
+                tasks.append(PairTask(str(self.root / relpath), str(self.root / adv_relpath),
+                                      signal_type, target))
+        return tasks
+
+    def task_cost(self, task) -> float:
+        """Seconds of audio a PairTask decodes (original + adversarial); 0 if unindexed."""
+        cost = 0.0
+        for path in (task.original_path, task.adversarial_path):
+            try:
+                relpath = Path(path).relative_to(self.root).as_posix()
+            except ValueError:
+                continue
+            duration = self.duration(relpath)
+            cost += 0.0 if np.isnan(duration) else duration
+        return cost
+
+    def schedule(self, tasks: Sequence, workers: int,
+                 chunks_per_worker: int = CHUNKS_PER_WORKER) -> Tuple[List, List[int]]:
+        """
+        Reorder tasks into cost-balanced chunks for `analyze_pairs`.
+
+        Tasks sharing an original stay in one chunk (its features are cached
+        per worker). Groups go out longest first and are packed until a chunk
+        holds about total / (workers * chunks_per_worker) seconds of audio,
+        so no worker is left with one long recording at the end. Returns
+        (reordered tasks, chunk sizes).
+        """
+        groups: Dict[str, List] = {}
+        for task in tasks:
+            groups.setdefault(task.original_path, []).append(task)
+        costed = sorted(((sum(self.task_cost(t) for t in group), group) for group in groups.values()),
+                        key=lambda item: -item[0])
+        total = sum(cost for cost, _ in costed)
+        target = total / max(1, workers * chunks_per_worker)
+
+        ordered: List = []
+        sizes: List[int] = []
+        chunk_cost, chunk_size = 0.0, 0
+        for cost, group in costed:
+            ordered.extend(group)
+            chunk_cost += cost
+            chunk_size += len(group)
+            if chunk_cost >= target:
+                sizes.append(chunk_size)
+                chunk_cost, chunk_size = 0.0, 0
+        if chunk_size:
+            sizes.append(chunk_size)
+        return ordered, sizes
+
+
+def load_or_scan(index_file: Path, root: Path, rescan: bool = False,
+                 workers: int = DEFAULT_SCAN_WORKERS) -> DatasetIndex:
+    """Load index_file, or scan root (incrementally on rescan) and save it."""
+    index_file = Path(index_file)
+    previous = DatasetIndex.load(index_file, root) if index_file.exists() else None
+    if previous is not None and not rescan:
+        return previous
+    index = scan_dataset(root, previous, workers)
+    index.save(index_file)
+    return index
+
+
+__all__ = [
+    "DatasetIndex",
+    "ParsedName",
+    "adversarial_relpath",
+    "load_or_scan",
+    "original_relpath",
+    "parse_filename",
+    "scan_dataset",
+]
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Expectation-over-transformation (EOT) evaluation for perturbed audio.
+
+Scores one perturbed array against a set of codec/bitrate transforms. The
+codec round trips run concurrently (in-memory ffmpeg pipes, see
+`codec_roundtrip`), each decoded output is produced once and shared by the
+scorer (e.g. ASR) and the batched quality metrics, and evaluation stops early
+once the running mean score is confidently above or below the pass
+threshold, killing the ffmpeg processes of round trips still running.
+Decoded outputs are aligned to the reference before the quality metrics, so
+codec priming delay does not count as distortion. EOT is the inner loop of
+every attack iteration, so its wall time bounds the experiment budget.
+"""
+
+import math
+import random
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from analyze_audio import align_signals
+from batch_metrics import compute_batch_metrics
+from codec_roundtrip import ChildProcesses, CodecRoundTrip
+from compress_adversarial_audio import LADDER_CODECS, CompressionError
+
+# Configuration
+TARGET_SR = 16000
+EOT_NUM_SAMPLES = 10
+DEFAULT_BATCH_SIZE = 4
+DEFAULT_PASS_THRESHOLD = 0.5
+DEFAULT_CONFIDENCE_Z = 1.96
+DEFAULT_MIN_SAMPLES = 3
+
+ScoreFn = Callable[[Sequence[np.ndarray]], Sequence[float]]
+
+
+@dataclass(frozen=True)
+class Transform:
+    """One codec round trip in the EOT set."""
+
+    codec: str
+    bitrate_kbps: Optional[float] = None
+
+    @property
+    def label(self) -> str:
+        return self.codec if self.bitrate_kbps is None else f"{self.codec}@{self.bitrate_kbps:g}k"
+
+
+@dataclass
+class EOTResult:
+    """Aggregate EOT statistics plus per-transform scores and metrics."""
+
+    scores: Dict[str, float] = field(default_factory=dict)
+    metrics: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    mean: float = float("nan")
+    std: float = float("nan")
+    ci_low: float = float("nan")
+    ci_high: float = float("nan")
+    pass_rate: float = float("nan")
+    passed: Optional[bool] = None
+    stopped_early: bool = False
+    n_evaluated: int = 0
+    n_transforms: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+def sample_transforms(
+    codecs: Dict[str, Dict] = LADDER_CODECS,
+    n: int = EOT_NUM_SAMPLES,
+    seed: Optional[int] = None,
+) -> List[Transform]:
+    """Draw n distinct codec/bitrate transforms uniformly from the bitrate ladders."""
+    ladder = [
+        Transform(name, bitrate)
+        for name, config in codecs.items()
+        for bitrate in config["bitrates"]
+    ]
+    return random.Random(seed).sample(ladder, min(n, len(ladder)))
+
+
+class EOTEvaluator:
+    """
+    Concurrent EOT scorer with early termination.
+
+    `score_fn` maps a batch of decoded arrays to one score per array (higher
+    means the attack survived the transform better, e.g. WER against the
+    reference transcript). After every batch the evaluator computes a normal
+    confidence interval of the mean score; once at least `min_samples`
+    transforms are scored and the interval lies entirely above or below
+    `pass_threshold`, the remaining round trips are cancelled.
+    """
+
+    def __init__(
+        self,
+        score_fn: ScoreFn,
+        round_trip: Optional[CodecRoundTrip] = None,
+        max_workers: int = 4,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        pass_threshold: float = DEFAULT_PASS_THRESHOLD,
+        confidence_z: float = DEFAULT_CONFIDENCE_Z,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        include_pesq: bool = False,
+        include_stoi: bool = True,
+    ) -> None:
+        self.score_fn = score_fn
+        self.round_trip = round_trip or CodecRoundTrip()
+        self.max_workers = max(1, max_workers)
+        self.batch_size = max(1, batch_size)
+        self.pass_threshold = pass_threshold
+        self.confidence_z = confidence_z
+        self.min_samples = max(1, min_samples)
+        self.include_pesq = include_pesq
+        self.include_stoi = include_stoi
+
+    def _decide(self, scores: Sequence[float], result: EOTResult) -> Optional[bool]:
+        """Update result's aggregates; return True/False once the verdict is confident."""
+        values = np.asarray(scores, dtype=np.float64)
+        n = len(values)
+        result.mean = float(values.mean())
+        result.std = float(values.std(ddof=1)) if n > 1 else 0.0
+        half_width = self.confidence_z * result.std / math.sqrt(n)
+        result.ci_low = result.mean - half_width
+        result.ci_high = result.mean + half_width
+        result.pass_rate = float(np.mean(values >= self.pass_threshold))
+        if n < self.min_samples:
+            return None
+        if result.ci_low > self.pass_threshold:
+            return True
+        if result.ci_high < self.pass_threshold:
+            return False
+        return None
+
+    def _score_batch(
+        self,
+        batch: List[tuple],
+        reference: Optional[np.ndarray],
+        result: EOTResult,
+        scores: List[float],
+    ) -> None:
+        decoded = [audio for _, audio in batch]
+        batch_scores = self.score_fn(decoded)
+        metrics = {}
+        if reference is not None:
+            # Undo codec delay (e.g. mp3 priming without a gapless header)
+            aligned = [
+                align_signals(reference, audio, self.round_trip.sr, return_info=True)
+                for audio in decoded
+            ]
+            metrics = compute_batch_metrics(
+                [(ref, deg) for ref, deg, _ in aligned],
+                self.round_trip.sr,
+                include_pesq=self.include_pesq,
+                include_stoi=self.include_stoi,
+            )
+            metrics["alignment_lag"] = np.array([info.lag for _, _, info in aligned])
+        for i, (transform, _) in enumerate(batch):
+            result.scores[transform.label] = float(batch_scores[i])
+            result.metrics[transform.label] = {
+                name: float(values[i]) for name, values in metrics.items()
+            }
+            scores.append(float(batch_scores[i]))
+
+    def evaluate(
+        self,
+        perturbed: np.ndarray,
+        transforms: Sequence[Transform],
+        reference: Optional[np.ndarray] = None,
+    ) -> EOTResult:
+        """
+        Score perturbed under every transform (or until the verdict is confident).
+
+        With `reference` (the clean original), batched quality metrics of each
+        decoded output against it (after alignment, with the lag under
+        "alignment_lag") are reported as well. Round trips that fail
+        are recorded in `errors` (as are unsupported codecs) and left out of
+        the statistics.
+        """
+        # Duplicate draws of the same transform only need one round trip
+        unique = list(dict.fromkeys(transforms))
+        result = EOTResult(n_transforms=len(unique))
+        scores: List[float] = []
+        batch: List[tuple] = []
+        queue = iter(unique)
+        in_flight: Dict[Future, Transform] = {}
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        children = ChildProcesses()
+
+        def refill() -> None:
+            while len(in_flight) < self.max_workers:
+                transform = next(queue, None)
+                if transform is None:
+                    return
+                future = pool.submit(
+                    self.round_trip.round_trip,
+                    perturbed, transform.codec, transform.bitrate_kbps,
+                    processes=children,
+                )
+                in_flight[future] = transform
+
+        try:
+            refill()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    transform = in_flight.pop(future)
+                    try:
+                        batch.append((transform, future.result()))
+                    except (CompressionError, ValueError) as exc:
+                        result.errors[transform.label] = str(exc)
+                # Keep the encoders busy while this batch is scored
+                refill()
+
+                if len(batch) < self.batch_size and (in_flight or not batch):
+                    continue
+                self._score_batch(batch, reference, result, scores)
+                batch = []
+                verdict = self._decide(scores, result)
+                if verdict is not None:
+                    result.passed = verdict
+                    result.stopped_early = len(scores) + len(result.errors) < len(unique)
+                    break
+        finally:
+            # Drop queued round trips and kill the ones still encoding
+            pool.shutdown(wait=False, cancel_futures=True)
+            children.terminate()
+            pool.shutdown(wait=True)
+
+        result.n_evaluated = len(scores)
+        if scores and result.passed is None:
+            self._decide(scores, result)
+            result.passed = result.mean >= self.pass_threshold
+        return result
+
+
+__all__ = ["EOTEvaluator", "EOTResult", "Transform", "sample_transforms"]
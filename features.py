@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Per-signal feature cache shared by metrics and perturbations.
+
+The same reference signal is transformed again by every consumer: STOI
+resamples it, drops silent frames and takes a third-octave STFT; spectral
+metrics take their own STFT; the perturbation families re-derive frame
+energies and classes for every candidate; and `analyze_sample_pair` repeats
+all of it for each of the three adversarial targets sharing one original.
+
+`FeatureCache` maps a signal (by content hash and sample rate) to a
+`SignalFeatures` object that computes each feature on first request and
+keeps it: STFT magnitudes, third-octave band energies, frame energies, VAD
+masks, and the complete reference side of STOI (for the whole signal or any
+region of it, e.g. the part an alignment keeps, memoized per region). Consumers can memoize their
+own derived features through `SignalFeatures.memo`. The cache is LRU-bounded
+by the bytes the features occupy and supports explicit invalidation.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Configuration
+TARGET_SR = 16000
+DEFAULT_N_FFT = 512
+DEFAULT_HOP = 256
+DEFAULT_MAX_BYTES = 256 * 1024 ** 2
+THIRD_OCTAVE_BANDS = 15
+THIRD_OCTAVE_MIN_HZ = 150.0
+VAD_DYN_RANGE_DB = 40.0
+EPS = 1e-10
+
+# STOI constants (Taal et al. 2011; as in pystoi)
+STOI_FS = 10000
+STOI_N_FRAME = 256
+STOI_NFFT = 512
+STOI_N = 30
+STOI_BETA = -15.0
+STOI_EPS = np.finfo("float").eps
+
+
+def signal_key(audio: np.ndarray, sr: int) -> str:
+    """Content key of a signal: SHA-256 of its float32 samples plus the sample rate."""
+    digest = hashlib.sha256(str(sr).encode())
+    digest.update(np.ascontiguousarray(audio, dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+def _overlap_add(frames: np.ndarray, hop: int) -> np.ndarray:
+    """Overlap-add frames placed every hop samples (frame length a multiple of hop)."""
+    n_frames, frame_len = frames.shape
+    out = np.zeros((n_frames - 1) * hop + frame_len if n_frames else 0)
+    for offset in range(0, frame_len, hop):
+        out[offset:offset + n_frames * hop].reshape(n_frames, hop)[:] += frames[:, offset:offset + hop]
+    return out
+
+
+def _stoi_frames(audio: np.ndarray) -> np.ndarray:
+    """Hann-windowed STOI analysis frames (pystoi's framing: starts < len - N_FRAME)."""
+    window = np.hanning(STOI_N_FRAME + 2)[1:-1]
+    hop = STOI_N_FRAME // 2
+    if len(audio) < STOI_N_FRAME:
+        return np.zeros((0, STOI_N_FRAME))
+    starts = np.arange(0, len(audio) - STOI_N_FRAME, hop)
+    return sliding_window_view(audio, STOI_N_FRAME)[starts] * window
+
+
+def _stoi_tob(signal: np.ndarray) -> np.ndarray:
+    """(bands, frames) third-octave envelopes of a silence-removed STOI signal."""
+    from pystoi.utils import thirdoct
+
+    obm, _ = thirdoct(STOI_FS, STOI_NFFT, THIRD_OCTAVE_BANDS, THIRD_OCTAVE_MIN_HZ)
+    spec = np.fft.rfft(_stoi_frames(signal), n=STOI_NFFT, axis=1)
+    return np.sqrt(obm @ np.square(np.abs(spec)).T)
+
+
+def _segments(tob: np.ndarray) -> np.ndarray:
+    """(J, bands, N) sliding segments of N frames."""
+    # A C-ordered copy like pystoi's, so sums reduce in the same order
+    return np.ascontiguousarray(np.moveaxis(sliding_window_view(tob, STOI_N, axis=1), 1, 0))
+
+
+class SignalFeatures:
+    """
+    Lazily computed, memoized features of one signal.
+
+    Treat the audio as immutable: features are computed once from it.
+    """
+
+    def __init__(self, audio: np.ndarray, sr: int = TARGET_SR) -> None:
+        self.audio = np.ascontiguousarray(audio, dtype=np.float32)
+        self.sr = sr
+        self._features: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+        self.nbytes = self.audio.nbytes
+
+    def memo(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the feature stored under key, computing it on first use."""
+        with self._lock:
+            if key in self._features:
+                return self._features[key]
+        value = compute()
+        with self._lock:
+            if key not in self._features:
+                self._features[key] = value
+                self.nbytes += _nbytes(value)
+            return self._features[key]
+
+    def stft_magnitude(self, n_fft: int = DEFAULT_N_FFT, hop: int = DEFAULT_HOP) -> np.ndarray:
+        """(frames, n_fft // 2 + 1) Hann STFT magnitudes of full frames starting at 0."""
+        def compute() -> np.ndarray:
+            if len(self.audio) < n_fft:
+                return np.zeros((0, n_fft // 2 + 1))
+            frames = sliding_window_view(self.audio.astype(np.float64), n_fft)[::hop]
+            return np.abs(np.fft.rfft(frames * np.hanning(n_fft), axis=1))
+        return self.memo(("stft", n_fft, hop), compute)
+
+    def log_power_db(self, n_fft: int = DEFAULT_N_FFT, hop: int = DEFAULT_HOP) -> np.ndarray:
+        """10 log10 of the STFT power, as used by log-spectral distance."""
+        return self.memo(
+            ("log_power_db", n_fft, hop),
+            lambda: 10 * np.log10(self.stft_magnitude(n_fft, hop) ** 2 + EPS),
+        )
+
+    def third_octave_bands(
+        self,
+        n_fft: int = DEFAULT_N_FFT,
+        hop: int = DEFAULT_HOP,
+        n_bands: int = THIRD_OCTAVE_BANDS,
+        min_freq: float = THIRD_OCTAVE_MIN_HZ,
+    ) -> np.ndarray:
+        """(n_bands, frames) third-octave band magnitudes of the STFT."""
+        def compute() -> np.ndarray:
+            from pystoi.utils import thirdoct
+
+            obm, _ = thirdoct(self.sr, n_fft, n_bands, min_freq)
+            return np.sqrt(obm @ (self.stft_magnitude(n_fft, hop) ** 2).T)
+        return self.memo(("third_octave", n_fft, hop, n_bands, min_freq), compute)
+
+    def frame_energies_db(self, frame_len: int, hop: Optional[int] = None) -> np.ndarray:
+        """Energy in dB of Hann-windowed frames (hop defaults to frame_len // 2)."""
+        hop = hop or frame_len // 2
+        def compute() -> np.ndarray:
+            if len(self.audio) < frame_len:
+                return np.zeros(0)
+            frames = sliding_window_view(self.audio.astype(np.float64), frame_len)[::hop]
+            window = np.hanning(frame_len + 2)[1:-1]
+            return 20 * np.log10(np.linalg.norm(frames * window, axis=1) + EPS)
+        return self.memo(("frame_energies_db", frame_len, hop), compute)
+
+    def vad_mask(self, frame_len: int, hop: Optional[int] = None,
+                 dyn_range: float = VAD_DYN_RANGE_DB) -> np.ndarray:
+        """Frames within dyn_range dB of the loudest frame (STOI's silent-frame rule)."""
+        def compute() -> np.ndarray:
+            energies = self.frame_energies_db(frame_len, hop)
+            return (energies.max(initial=-np.inf) - dyn_range - energies) < 0
+        return self.memo(("vad", frame_len, hop, dyn_range), compute)
+
+    def stoi_reference(self, start: int = 0, stop: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Reference side of STOI for audio[start:stop]: VAD mask plus raw and
+        normalized segments.
+
+        Everything `stoi_with_reference` needs that depends only on the clean
+        signal, computed exactly as pystoi does on the region. Each region is
+        resampled on its own (a cut of the whole signal's resampling differs
+        at the edges) and memoized per (start, stop).
+        """
+        stop = len(self.audio) if stop is None else min(stop, len(self.audio))
+        start = min(max(start, 0), stop)
+
+        def compute() -> Dict[str, np.ndarray]:
+            from pystoi.utils import resample_oct
+
+            x = self.audio[start:stop].astype(np.float64)
+            if self.sr != STOI_FS:
+                x = resample_oct(x, STOI_FS, self.sr)
+            x_frames = _stoi_frames(x)
+            energies = 20 * np.log10(np.linalg.norm(x_frames, axis=1) + STOI_EPS)
+            mask = (np.max(energies, initial=-np.inf) - VAD_DYN_RANGE_DB - energies) < 0
+            x_tob = _stoi_tob(_overlap_add(x_frames[mask], STOI_N_FRAME // 2))
+            segments = _segments(x_tob) if x_tob.shape[1] >= STOI_N else np.zeros((0, THIRD_OCTAVE_BANDS, STOI_N))
+            centered = segments - segments.mean(axis=2, keepdims=True)
+            centered /= np.linalg.norm(centered, axis=2, keepdims=True) + STOI_EPS
+            return {
+                "length": np.array(stop - start),
+                "mask": mask,
+                "segments": segments,
+                "segment_norms": np.linalg.norm(segments, axis=2, keepdims=True),
+                "normalized": centered,
+            }
+        return self.memo(("stoi_reference", start, stop), compute)
+
+
+def _nbytes(value: Any) -> int:
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+
+def stoi_with_reference(reference: SignalFeatures, degraded: np.ndarray,
+                        start: int = 0, stop: Optional[int] = None) -> float:
+    """
+    STOI of degraded against a cached reference; equals `pystoi.stoi(x, y, sr)`.
+
+    With start/stop, degraded is scored against reference.audio[start:stop]
+    (see `SignalFeatures.stoi_reference`). Only the degraded side is
+    resampled, framed and transformed per call.
+    """
+    ref = reference.stoi_reference(start, stop)
+    if len(degraded) != int(ref["length"]):
+        raise ValueError(f"x and y should have the same length, found "
+                         f"{int(ref['length'])} and {len(degraded)}")
+    if ref["segments"].shape[0] == 0:
+        # pystoi warns and returns this when fewer than N frames remain
+        return 1e-5
+
+    from pystoi.utils import resample_oct
+
+    y = np.asarray(degraded, dtype=np.float64)
+    if reference.sr != STOI_FS:
+        y = resample_oct(y, STOI_FS, reference.sr)
+    y_tob = _stoi_tob(_overlap_add(_stoi_frames(y)[ref["mask"]], STOI_N_FRAME // 2))
+    y_segments = _segments(y_tob)
+
+    scale = ref["segment_norms"] / (np.linalg.norm(y_segments, axis=2, keepdims=True) + STOI_EPS)
+    clip_value = 10 ** (-STOI_BETA / 20)
+    y_primes = np.minimum(y_segments * scale, ref["segments"] * (1 + clip_value))
+    y_primes = y_primes - y_primes.mean(axis=2, keepdims=True)
+    y_primes /= np.linalg.norm(y_primes, axis=2, keepdims=True) + STOI_EPS
+    J, M = ref["segments"].shape[:2]
+    return float(np.sum(y_primes * ref["normalized"]) / (J * M))
+
+
+class FeatureCache:
+    """
+    LRU cache of `SignalFeatures` keyed by signal content and sample rate.
+
+    Bounded by `max_bytes` of stored audio and features (checked on every
+    access, since features grow as they are requested). Thread-safe.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, SignalFeatures]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, audio: np.ndarray, sr: int = TARGET_SR) -> SignalFeatures:
+        """Features of audio, reusing the entry of any identical signal."""
+        key = signal_key(audio, sr)
+        with self._lock:
+            features = self._entries.get(key)
+            if features is None:
+                self.misses += 1
+                features = SignalFeatures(audio, sr)
+                self._entries[key] = features
+            else:
+                self.hits += 1
+            self._entries.move_to_end(key)
+            self._evict()
+        return features
+
+    def _evict(self) -> None:
+        total = sum(features.nbytes for features in self._entries.values())
+        # Always keep the most recently used entry
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, features = self._entries.popitem(last=False)
+            total -= features.nbytes
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(features.nbytes for features in self._entries.values())
+
+    def invalidate(self, audio: np.ndarray, sr: int = TARGET_SR) -> bool:
+        """Drop the entry for audio; returns whether there was one."""
+        with self._lock:
+            return self._entries.pop(signal_key(audio, sr), None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+__all__ = [
+    "FeatureCache",
+    "SignalFeatures",
+    "signal_key",
+    "stoi_with_reference",
+]
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Built-in NumPy perturbation library for the agentic feedback loop.
+
+Implements the perturbation families named in
+`PerturbationLLMAgent.PROMPT_LIBRARY` as deterministic, vectorized operations
+instead of executing LLM-written snippets sample by sample:
+
+* narrowband noise (3-4 kHz by default) on plosive-like onset frames,
+* random phase jitter inside silence gaps,
+* codec-specific quantization bias on vowel-like (voiced) frames.
+
+Audio is viewed as non-overlapping 20 ms frames through stride tricks, frame
+classes are derived from per-frame energy and zero-crossing rate, and every
+operation acts on all selected frames at once. Parameters come from
+`PerturbationInstruction.suggested_parameters`; results are arrays.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from agentic_feedback import PerturbationInstruction
+from features import FeatureCache, SignalFeatures, stoi_with_reference
+
+# Configuration
+TARGET_SR = 16000
+FRAME_MS = 20
+DEFAULT_MIX_DB = -24.0
+DEFAULT_BAND_HZ = (3000.0, 4000.0)
+DEFAULT_JITTER_RAD = 0.5
+DEFAULT_QUANT_BIAS = 0.25
+SILENCE_DB = -40.0
+ONSET_DB = 6.0
+PLOSIVE_MIN_ZCR = 0.2
+VOWEL_MAX_ZCR = 0.15
+VOWEL_MIN_DB = -25.0
+EPS = 1e-10
+
+# Quantization step multipliers: coarser for codecs that discard more detail
+CODEC_QUANT_SCALE = {
+    "pcm": 0.5,
+    "alac": 0.5,
+    "flac": 0.5,
+    "mp3": 1.0,
+    "opus": 1.25,
+    "amr-wb": 1.5,
+    "amr_wb": 1.5,
+}
+
+
+def frame_view(audio: np.ndarray, frame_len: int, writeable: bool = False) -> np.ndarray:
+    """
+    (n_frames, frame_len) view of audio in non-overlapping frames, without copying.
+
+    Trailing samples that do not fill a frame are left out. Pass
+    writeable=True only for arrays the caller owns; writes go straight
+    through to `audio`.
+    """
+    n_frames = len(audio) // frame_len
+    stride = audio.strides[0]
+    return as_strided(
+        audio,
+        shape=(n_frames, frame_len),
+        strides=(frame_len * stride, stride),
+        writeable=writeable,
+    )
+
+
+def frame_features(frames: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-frame RMS, level in dB relative to the loudest frame, and zero-crossing rate."""
+    rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+    level_db = 20 * np.log10(rms + EPS) - 20 * np.log10(rms.max(initial=0.0) + EPS)
+    signs = np.signbit(frames)
+    zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+    return rms, level_db, zcr
+
+
+def classify_frames(frames: np.ndarray) -> Dict[str, np.ndarray]:
+    """Boolean masks for silence, plosive-like onset and vowel-like frames."""
+    rms, level_db, zcr = frame_features(frames)
+    silence = level_db < SILENCE_DB
+    onset = np.diff(level_db, prepend=level_db[:1]) > ONSET_DB
+    plosive = onset & ~silence & (zcr > PLOSIVE_MIN_ZCR)
+    if not plosive.any():
+        # Fall back to any energy onset so the family still has targets
+        plosive = onset & ~silence
+    vowel = ~silence & (zcr < VOWEL_MAX_ZCR) & (level_db > VOWEL_MIN_DB)
+    return {"rms": rms, "silence": silence, "plosive": plosive, "vowel": vowel}
+
+
+def narrowband_noise(
+    frames: np.ndarray,
+    out_frames: np.ndarray,
+    classes: Dict[str, np.ndarray],
+    params: Dict[str, Any],
+    sr: int,
+    rng: np.random.Generator,
+) -> int:
+    """Add band-limited noise at mix_db below each plosive frame's RMS."""
+    idx = np.flatnonzero(classes["plosive"])
+    if len(idx) == 0:
+        return 0
+    frame_len = frames.shape[1]
+    low, high = params.get("band_hz", DEFAULT_BAND_HZ)
+    mix_db = float(params.get("mix_db", DEFAULT_MIX_DB))
+
+    spectrum = np.fft.rfft(rng.standard_normal((len(idx), frame_len)), axis=1)
+    freqs = np.fft.rfftfreq(frame_len, 1.0 / sr)
+    spectrum[:, (freqs < low) | (freqs > high)] = 0.0
+    noise = np.fft.irfft(spectrum, n=frame_len, axis=1)
+
+    noise_rms = np.sqrt(np.mean(noise ** 2, axis=1))
+    gain = classes["rms"][idx] * 10 ** (mix_db / 20) / (noise_rms + EPS)
+    out_frames[idx] += (noise * gain[:, None]).astype(out_frames.dtype)
+    return len(idx)
+
+
+def silence_phase_jitter(
+    frames: np.ndarray,
+    out_frames: np.ndarray,
+    classes: Dict[str, np.ndarray],
+    params: Dict[str, Any],
+    sr: int,
+    rng: np.random.Generator,
+) -> int:
+    """Randomize the phase of silence frames by up to ±jitter_rad, keeping magnitudes."""
+    idx = np.flatnonzero(classes["silence"])
+    if len(idx) == 0:
+        return 0
+    frame_len = frames.shape[1]
+    jitter = float(params.get("jitter_rad", DEFAULT_JITTER_RAD))
+
+    spectrum = np.fft.rfft(frames[idx], axis=1)
+    phase = rng.uniform(-jitter, jitter, spectrum.shape)
+    phase[:, 0] = 0.0  # keep DC real
+    spectrum *= np.exp(1j * phase)
+    out_frames[idx] = np.fft.irfft(spectrum, n=frame_len, axis=1)
+    return len(idx)
+
+
+def vowel_quantization_bias(
+    frames: np.ndarray,
+    out_frames: np.ndarray,
+    classes: Dict[str, np.ndarray],
+    params: Dict[str, Any],
+    sr: int,
+    rng: np.random.Generator,
+) -> int:
+    """
+    Requantize vowel frames onto a biased grid.
+
+    The step is the frame RMS at mix_db scaled by the target codec's entry in
+    CODEC_QUANT_SCALE; `quant_bias` shifts the rounding point, so the error
+    per sample stays below (0.5 + |quant_bias|) steps.
+    """
+    idx = np.flatnonzero(classes["vowel"])
+    if len(idx) == 0:
+        return 0
+    mix_db = float(params.get("mix_db", DEFAULT_MIX_DB))
+    bias = float(params.get("quant_bias", DEFAULT_QUANT_BIAS))
+    scale = CODEC_QUANT_SCALE.get(str(params.get("codec_bias", "")).lower(), 1.0)
+
+    step = (classes["rms"][idx] * 10 ** (mix_db / 20) * scale)[:, None] + EPS
+    out_frames[idx] = np.floor(frames[idx] / step + 0.5 + bias) * step
+    return len(idx)
+
+
+Family = Callable[..., int]
+
+FAMILIES: Dict[str, Family] = {
+    "narrowband_noise": narrowband_noise,
+    "phase_jitter": silence_phase_jitter,
+    "quantization_bias": vowel_quantization_bias,
+}
+
+# Description keywords (from PROMPT_LIBRARY) identifying each family
+FAMILY_KEYWORDS = {
+    "narrowband": "narrowband_noise",
+    "phase jitter": "phase_jitter",
+    "quantization": "quantization_bias",
+}
+
+
+def family_for(instruction: PerturbationInstruction) -> Optional[str]:
+    """Family named by params["family"], else inferred from the description."""
+    family = instruction.suggested_parameters.get("family")
+    if family in FAMILIES:
+        return family
+    description = instruction.description.lower()
+    for keyword, name in FAMILY_KEYWORDS.items():
+        if keyword in description:
+            return name
+    return None
+
+
+def _seed_for(instruction: PerturbationInstruction) -> int:
+    params = instruction.suggested_parameters
+    if "seed" in params:
+        return int(params["seed"])
+    material = json.dumps([instruction.description, params], sort_keys=True, default=str)
+    return int(hashlib.sha256(material.encode()).hexdigest()[:16], 16)
+
+
+def apply_perturbation(
+    audio: np.ndarray,
+    instruction: PerturbationInstruction,
+    sr: int = TARGET_SR,
+    frame_ms: int = FRAME_MS,
+    features: Optional[SignalFeatures] = None,
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Apply the instruction's family to a copy of audio.
+
+    Returns (perturbed float32 audio clipped to [-1, 1], metadata). The
+    metadata includes the SNR and STOI of the perturbation; unknown families
+    leave the audio unchanged and report applied=False. Pass the source's
+    cached `features` to reuse its frame classes and STOI reference across
+    candidates.
+    """
+    source = np.ascontiguousarray(audio, dtype=np.float32)
+    perturbed = source.copy()
+    family = family_for(instruction)
+    metadata: Dict[str, Any] = {
+        "family": family,
+        "applied": False,
+        "frames_modified": 0,
+        "snr_db": float("inf"),
+        "stoi": 1.0,
+    }
+    if family is None:
+        return perturbed, metadata
+
+    frame_len = int(sr * frame_ms / 1000)
+    frames = frame_view(source, frame_len)
+    out_frames = frame_view(perturbed, frame_len, writeable=True)
+    if features is not None:
+        classes = features.memo(("frame_classes", frame_len), lambda: classify_frames(frames))
+    else:
+        classes = classify_frames(frames)
+    rng = np.random.default_rng(_seed_for(instruction))
+
+    modified = FAMILIES[family](
+        frames, out_frames, classes, instruction.suggested_parameters, sr, rng
+    )
+    np.clip(perturbed, -1.0, 1.0, out=perturbed)
+
+    # Quality figures for pre-verification pruning (ConstraintPrefilter)
+    signal_power = float(np.sum(source.astype(np.float64) ** 2))
+    noise_power = float(np.sum((perturbed.astype(np.float64) - source) ** 2))
+    snr_db = float("inf") if noise_power == 0 else 10 * np.log10(signal_power / noise_power)
+    reference = features if features is not None else SignalFeatures(source, sr)
+    stoi = 1.0 if noise_power == 0 else stoi_with_reference(reference, perturbed)
+    metadata.update({"applied": modified > 0, "frames_modified": modified,
+                     "snr_db": snr_db, "stoi": float(stoi)})
+    return perturbed, metadata
+
+
+class NumpyPerturbationEngine:
+    """
+    Drop-in replacement for `AudioPerturbationEngine` that really perturbs audio.
+
+    `apply` loads the file through `analyze_audio.load_audio` (and its decode
+    cache) and returns the perturbed array under "audio" alongside the
+    metadata keys the verifier expects. Frame classes of each source signal
+    are computed once and shared by every candidate through `feature_cache`.
+    """
+
+    def __init__(
+        self,
+        sr: int = TARGET_SR,
+        frame_ms: int = FRAME_MS,
+        feature_cache: Optional[FeatureCache] = None,
+    ) -> None:
+        self.sr = sr
+        self.frame_ms = frame_ms
+        self.feature_cache = feature_cache if feature_cache is not None else FeatureCache()
+
+    def apply_array(
+        self, audio: np.ndarray, instruction: PerturbationInstruction
+    ) -> Tuple[np.ndarray, Dict[str, Any]]:
+        features = self.feature_cache.get(audio, self.sr)
+        return apply_perturbation(audio, instruction, self.sr, self.frame_ms, features)
+
+    def apply(self, audio_path: Path, instruction: PerturbationInstruction) -> Dict[str, Any]:
+        from analyze_audio import load_audio
+
+        audio, sr = load_audio(str(audio_path), self.sr)
+        perturbed, metadata = self.apply_array(audio, instruction)
+        return {
+            "output_path": str(audio_path),
+            "technique": instruction.target_codec,
+            "parameters": instruction.suggested_parameters,
+            "audio": perturbed,
+            "sr": sr,
+            **metadata,
+        }
+
+
+__all__ = [
+    "FAMILIES",
+    "NumpyPerturbationEngine",
+    "apply_perturbation",
+    "classify_frames",
+    "family_for",
+    "frame_view",
+]
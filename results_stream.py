@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Append-only JSONL storage for per-pair analysis results.
+
+`analyze_audio.main` writes one JSON object per line as soon as each pair
+finishes, so an interrupted run keeps everything completed so far and can be
+resumed. Readers stream the file lazily; legacy `audio_analysis_results.json`
+lists are still accepted. Summary statistics are accumulated incrementally
+(Welford's algorithm) instead of from an in-memory list of results.
+"""
+
+import json
+import math
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+
+SUMMARY_METRICS = ("snr", "pesq", "stoi")
+
+
+def result_key(result: Dict) -> Tuple[str, str]:
+    """Identity of a result record: (original_file, adversarial_file)."""
+    return result["original_file"], result["adversarial_file"]
+
+
+def iter_results(path: Path) -> Iterator[Dict]:
+    """
+    Lazily yield result records from a JSONL stream or a legacy JSON list.
+
+    A truncated final line (e.g. from a crash mid-write) is ignored.
+    """
+    path = Path(path)
+    if path.suffix != ".jsonl":
+        with path.open("r") as handle:
+            yield from json.load(handle)
+        return
+
+    with path.open("r") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def completed_keys(path: Path) -> Set[Tuple[str, str]]:
+    """Keys of every record already present in path (empty if it is missing)."""
+    path = Path(path)
+    if not path.exists():
+        return set()
+    return {result_key(result) for result in iter_results(path)}
+
+
+class ResultsWriter:
+    """
+    Append-only JSONL sink; each record is flushed and fsynced as it is written.
+
+    Opens in append mode when `resume` is set, otherwise truncates.
+    """
+
+    def __init__(self, path: Path, resume: bool = False) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._handle = self.path.open("a" if resume else "w")
+        if resume:
+            self._terminate_partial_line()
+
+    def _terminate_partial_line(self) -> None:
+        # A crash mid-write can leave a line without its newline; start fresh
+        # so the next record is not glued onto it.
+        if self._handle.tell() == 0:
+            return
+        with self.path.open("rb") as handle:
+            handle.seek(-1, os.SEEK_END)
+            if handle.read(1) != b"\n":
+                self._handle.write("\n")
+
+    def write(self, result: Dict) -> None:
+        self._handle.write(json.dumps(result) + "\n")
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+
+    def close(self) -> None:
+        self._handle.close()
+
+    def __enter__(self) -> "ResultsWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class RunningStats:
+    """Streaming count/mean/variance (Welford)."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (0.0 with fewer than two values)."""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class SummaryAccumulator:
+    """Incremental summary over result records, mirroring the old main() report."""
+
+    def __init__(self, metrics: Iterable[str] = SUMMARY_METRICS) -> None:
+        self.total = 0
+        self.valid = 0
+        self.stats: Dict[str, RunningStats] = {name: RunningStats() for name in metrics}
+
+    def update(self, result: Dict) -> None:
+        self.total += 1
+        if result.get("error") is not None:
+            return
+        self.valid += 1
+        for name, stats in self.stats.items():
+            value: Optional[float] = result.get(name)
+            # Identical signals give SNR = inf; keep them out of the mean
+            if value is not None and math.isfinite(value):
+                stats.update(value)
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {"count": stats.count, "mean": stats.mean, "std": stats.std}
+            for name, stats in self.stats.items()
+        }
+
+
+__all__ = [
+    "ResultsWriter",
+    "RunningStats",
+    "SummaryAccumulator",
+    "completed_keys",
+    "iter_results",
+    "result_key",
+]
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Columnar, indexed store for per-pair results.
+
+Result records (from `analyze_audio`, or flattened experiment outputs such as
+`exp1precomp.json`) are dicts, and every consumer used to re-parse the whole
+file and filter lists of them in Python. `ResultsTable` keeps the same data
+as one NumPy structured array:
+
+* numeric columns (SNR, PESQ, STOI, alignment, WER, ...) as float64, with
+  missing values as NaN,
+* categorical columns (file names, signal/target type, error message) as
+  int32 codes into per-column category arrays (-1 = missing).
+
+Equality lookups go through sorted per-column indexes built on first use,
+and group-by aggregates are computed with `np.bincount` over the codes.
+Tables are saved as a single uncompressed `.npz` that loads without parsing.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from results_stream import iter_results
+
+TABLE_VERSION = 1
+RESULT_CATEGORICAL = ("original_file", "adversarial_file", "signal_type",
+                      "source_type", "target_type", "error")
+RESULT_NUMERIC = ("snr", "pesq", "stoi", "alignment_lag", "alignment_peak")
+MISSING = -1
+
+
+def _to_float(value: Any) -> float:
+    return float(value) if isinstance(value, (int, float)) else np.nan
+
+
+def _with_pair_types(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Split analyze_audio's "short2long" signal_type into source and target."""
+    source, _, target = str(record.get("signal_type") or "").partition("2")
+    return {**record, "source_type": source or None, "target_type": target or None}
+
+
+def _infer_schema(records: Sequence[Dict[str, Any]]) -> Tuple[List[str], List[str]]:
+    categorical: Dict[str, None] = {}
+    numeric: Dict[str, None] = {}
+    for record in records:
+        for key, value in record.items():
+            if isinstance(value, str):
+                categorical[key] = None
+            elif isinstance(value, (int, float)):
+                numeric[key] = None
+    # A column seen with both kinds is treated as categorical
+    return list(categorical), [k for k in numeric if k not in categorical]
+
+
+class ResultsTable:
+    """
+    Structured-array table with categorical codes, indexes and group-by.
+
+    Build with `from_records` / `from_results`, persist with `save` / `load`.
+    Filtering returns new tables sharing the category arrays.
+    """
+
+    def __init__(self, data: np.ndarray, categories: Dict[str, np.ndarray]) -> None:
+        self.data = data
+        self.categories = categories
+        self._indexes: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lookups: Dict[str, Dict[str, int]] = {}
+
+    # -- construction -------------------------------------------------------
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Iterable[Dict[str, Any]],
+        categorical: Optional[Sequence[str]] = None,
+        numeric: Optional[Sequence[str]] = None,
+    ) -> "ResultsTable":
+        """
+        Build a table from flat dicts.
+
+        Without an explicit schema, string-valued keys become categorical and
+        numeric-valued keys numeric. None, missing keys and non-numeric values
+        in numeric columns become NaN.
+        """
+        records = list(records)
+        if categorical is None or numeric is None:
+            inferred_categorical, inferred_numeric = _infer_schema(records)
+            categorical = inferred_categorical if categorical is None else categorical
+            numeric = inferred_numeric if numeric is None else numeric
+
+        dtype = [(name, np.int32) for name in categorical] + [(name, np.float64) for name in numeric]
+        data = np.empty(len(records), dtype=dtype)
+        categories = {}
+        for name in categorical:
+            values = [record.get(name) for record in records]
+            present = sorted({str(v) for v in values if v is not None})
+            lookup = {value: code for code, value in enumerate(present)}
+            data[name] = [MISSING if v is None else lookup[str(v)] for v in values]
+            categories[name] = np.array(present, dtype=str)
+        for name in numeric:
+            data[name] = [_to_float(record.get(name)) for record in records]
+        return cls(data, categories)
+
+    @classmethod
+    def from_results(cls, path: Path) -> "ResultsTable":
+        """Table of an analyze_audio results file (JSONL or legacy JSON list)."""
+        return cls.from_records(
+            (_with_pair_types(record) for record in iter_results(path)),
+            RESULT_CATEGORICAL, RESULT_NUMERIC,
+        )
+
+    # -- persistence --------------------------------------------------------
+
+    def save(self, path: Path) -> None:
+        """Write data and categories to one uncompressed .npz file."""
+        arrays = {"data": self.data, "version": np.array(TABLE_VERSION)}
+        arrays.update({f"categories/{name}": values for name, values in self.categories.items()})
+        with Path(path).open("wb") as handle:
+            np.savez(handle, **arrays)
+
+    @classmethod
+    def load(cls, path: Path) -> "ResultsTable":
+        with np.load(path, allow_pickle=False) as archive:
+            if int(archive["version"]) != TABLE_VERSION:
+                raise ValueError(f"{path}: unsupported table version {int(archive['version'])}")
+            data = archive["data"]
+            categories = {
+                key.split("/", 1)[1]: archive[key]
+                for key in archive.files if key.startswith("categories/")
+            }
+        return cls(data, categories)
+
+    # -- access -------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return self.data.dtype.names
+
+    @property
+    def numeric_columns(self) -> List[str]:
+        return [name for name in self.columns if name not in self.categories]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Numeric column as float64, or categorical column decoded to strings ('' = missing)."""
+        if name not in self.categories:
+            return self.data[name]
+        codes = self.data[name]
+        labels = np.append(self.categories[name], "")
+        return labels[codes]
+
+    def codes(self, name: str) -> np.ndarray:
+        return self.data[name]
+
+    def code_of(self, name: str, value: str) -> int:
+        """Category code of value in column name, or MISSING if it never occurs."""
+        lookup = self._lookups.get(name)
+        if lookup is None:
+            lookup = {value: code for code, value in enumerate(self.categories[name].tolist())}
+            self._lookups[name] = lookup
+        return lookup.get(value, MISSING)
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Rows as dicts (None for missing values), as analyze_audio produces them."""
+        columns = {name: self[name] for name in self.columns}
+        records = []
+        for i in range(len(self)):
+            record = {}
+            for name, values in columns.items():
+                value = values[i]
+                if name in self.categories:
+                    record[name] = str(value) if self.data[name][i] != MISSING else None
+                else:
+                    record[name] = None if np.isnan(value) else float(value)
+            records.append(record)
+        return records
+
+    # -- indexing and filtering ---------------------------------------------
+
+    def _index(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(row order sorted by code, start offset of each code) for a categorical column."""
+        if name not in self._indexes:
+            codes = self.data[name]
+            order = np.argsort(codes, kind="stable")
+            starts = np.searchsorted(codes[order], np.arange(MISSING, len(self.categories[name]) + 1))
+            self._indexes[name] = (order, starts)
+        return self._indexes[name]
+
+    def rows(self, name: str, value: Optional[str]) -> np.ndarray:
+        """Row numbers (ascending) whose categorical column equals value (None = missing)."""
+        code = MISSING if value is None else self.code_of(name, value)
+        if code == MISSING and value is not None:
+            return np.zeros(0, dtype=np.int64)
+        order, starts = self._index(name)
+        # starts[0] is the first MISSING row, starts[code + 1] the first row of code
+        return order[starts[code + 1]:starts[code + 2]]
+
+    def take(self, rows: np.ndarray) -> "ResultsTable":
+        return ResultsTable(self.data[rows], self.categories)
+
+    def filter(self, mask: np.ndarray) -> "ResultsTable":
+        return ResultsTable(self.data[np.asarray(mask, dtype=bool)], self.categories)
+
+    def where(self, **equals: Optional[str]) -> "ResultsTable":
+        """Rows where every given categorical column equals its value, via the indexes."""
+        selected: Optional[np.ndarray] = None
+        for name, value in equals.items():
+            rows = self.rows(name, value)
+            selected = rows if selected is None else np.intersect1d(selected, rows, assume_unique=True)
+        return self if selected is None else self.take(selected)
+
+    def valid(self) -> "ResultsTable":
+        """Rows without an error."""
+        if "error" not in self.categories:
+            return self
+        return self.filter(self.data["error"] == MISSING)
+
+    # -- aggregation --------------------------------------------------------
+
+    def value_counts(self, name: str) -> Dict[Optional[str], int]:
+        """Rows per category of a categorical column (None = missing)."""
+        counts = np.bincount(self.data[name].astype(np.int64) + 1,
+                             minlength=len(self.categories[name]) + 1)
+        labels: List[Optional[str]] = [None, *self.categories[name].tolist()]
+        return {labels[b]: int(counts[b]) for b in np.flatnonzero(counts)}
+
+    def group_by(
+        self, name: str, metrics: Optional[Sequence[str]] = None
+    ) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        Per-category count/mean/std/min/max of each metric, skipping non-finite values.
+
+        SNR = inf for identical signals is left out, as in SummaryAccumulator.
+        Rows with a missing category are grouped under None.
+        """
+        metrics = list(metrics or self.numeric_columns)
+        codes = self.data[name].astype(np.int64) + 1  # shift MISSING to bin 0
+        n_bins = len(self.categories[name]) + 1
+        labels: List[Optional[str]] = [None, *self.categories[name].tolist()]
+        rows_per_group = np.bincount(codes, minlength=n_bins)
+
+        summary: Dict[str, Dict[str, Dict[str, float]]] = {
+            labels[b]: {} for b in np.flatnonzero(rows_per_group)
+        }
+        for metric in metrics:
+            values = self.data[metric]
+            finite = np.isfinite(values)
+            clean = np.where(finite, values, 0.0)
+            count = np.bincount(codes, weights=finite, minlength=n_bins)
+            total = np.bincount(codes, weights=clean, minlength=n_bins)
+            squares = np.bincount(codes, weights=clean ** 2, minlength=n_bins)
+            minimum = np.full(n_bins, np.inf)
+            maximum = np.full(n_bins, -np.inf)
+            np.minimum.at(minimum, codes[finite], values[finite])
+            np.maximum.at(maximum, codes[finite], values[finite])
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = total / count
+                # Sample variance, as RunningStats reports
+                variance = (squares - count * mean ** 2) / (count - 1)
+            for b in np.flatnonzero(rows_per_group):
+                n = int(count[b])
+                summary[labels[b]][metric] = {
+                    "count": n,
+                    "mean": float(mean[b]) if n else float("nan"),
+                    "std": float(np.sqrt(max(variance[b], 0.0))) if n > 1 else 0.0,
+                    "min": float(minimum[b]) if n else float("nan"),
+                    "max": float(maximum[b]) if n else float("nan"),
+                }
+        return summary
+
+    def join(
+        self,
+        other: "ResultsTable",
+        on: Sequence[str] = ("original_file", "adversarial_file"),
+        metrics: Optional[Sequence[str]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Align two tables on their key columns and diff shared metrics.
+
+        Returns the matched keys plus, per metric, `<metric>` (self),
+        `<metric>_other` and `<metric>_delta` (self - other) arrays.
+        """
+        def keys(table: "ResultsTable") -> np.ndarray:
+            parts = [table[name].astype(object) for name in on]
+            return np.array(["\x1f".join(row) for row in zip(*parts)], dtype=str)
+
+        mine, theirs = keys(self), keys(other)
+        common, left, right = np.intersect1d(mine, theirs, return_indices=True)
+        shared = [m for m in (metrics or self.numeric_columns) if m in other.numeric_columns]
+        joined: Dict[str, np.ndarray] = {
+            name: self[name][left] for name in on
+        }
+        for metric in shared:
+            a, b = self.data[metric][left], other.data[metric][right]
+            joined[metric] = a
+            joined[f"{metric}_other"] = b
+            with np.errstate(invalid="ignore"):
+                joined[f"{metric}_delta"] = a - b
+        return joined
+
+
+def flatten_attack_results(records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    One row per (original, attack) from experiment files like exp1precomp.json.
+
+    Each `<name>_attack` entry with metrics becomes a row with original_file,
+    attack, attack_file and its metric values; empty attacks are skipped.
+    """
+    rows = []
+    for record in records:
+        for key, attack in record.items():
+            if not key.endswith("_attack") or not isinstance(attack, dict) or not attack:
+                continue
+            rows.append({
+                "original_file": record.get("original_file"),
+                "attack": key[: -len("_attack")],
+                "attack_file": attack.get("attack_file"),
+                **{
+                    name: value for name, value in attack.get("metrics", {}).items()
+                    if name != "transcript"
+                },
+            })
+    return rows
+
+
+def load_experiment(path: Path) -> ResultsTable:
+    """ResultsTable of an experiment JSON file (list of per-original attack records)."""
+    with Path(path).open("r") as handle:
+        return ResultsTable.from_records(flatten_attack_results(json.load(handle)))
+
+
+__all__ = [
+    "ResultsTable",
+    "flatten_attack_results",
+    "load_experiment",
+]
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Batched speaker verification with cached enrollment embeddings.
+
+`SpeakerVerifierStub` scores one file per call and a real verifier behind the
+same interface would re-embed the reference speaker every time. Here the
+backend embeds many signals in one call, the enrollment embedding of each
+original file is computed once and cached by content hash, and candidates are
+scored against it with a single vectorized cosine similarity. The bundled
+`MFCCStatsEmbedder` (per-utterance MFCC mean and standard deviation) is a
+deterministic offline reference; neural embedders plug in through the
+`SpeakerEmbedder` protocol.
+"""
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Protocol, Sequence
+
+import numpy as np
+
+from agentic_feedback import VerificationResult
+from audio_cache import file_digest
+
+# Configuration
+TARGET_SR = 16000
+N_MFCC = 20
+N_MELS = 128
+TOP_DB = 80.0
+MFCC_N_FFT = 512
+MFCC_HOP = 160
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_ENROLLMENT_ENTRIES = 256
+EPS = 1e-10
+
+
+class SpeakerEmbedder(Protocol):
+    """Maps a batch of mono signals to one fixed-size embedding per signal."""
+
+    name: str
+
+    def embed_batch(self, audios: Sequence[np.ndarray], sr: int) -> np.ndarray:
+        """Return a (len(audios), dim) float array."""
+
+
+def cosine_similarity(queries: np.ndarray, references: np.ndarray) -> np.ndarray:
+    """(n_queries, n_references) cosine similarities between two embedding sets."""
+    queries = np.atleast_2d(queries).astype(np.float64)
+    references = np.atleast_2d(references).astype(np.float64)
+    queries = queries / (np.linalg.norm(queries, axis=1, keepdims=True) + EPS)
+    references = references / (np.linalg.norm(references, axis=1, keepdims=True) + EPS)
+    return queries @ references.T
+
+
+class MFCCStatsEmbedder:
+    """
+    Utterance embedding from MFCC statistics.
+
+    The batch is zero-padded to its longest signal and its mel power
+    spectrogram is computed in one librosa call. The dB conversion and its
+    `top_db` floor are then applied per signal, against that signal's own
+    peak, so an embedding does not depend on what else is in the batch
+    (librosa's `mfcc` would clip against the peak of the whole batch).
+    Per-signal means and standard deviations are taken over that signal's
+    own frames only. The 0th coefficient (overall level) is dropped so gain
+    changes do not move the embedding.
+    """
+
+    def __init__(
+        self,
+        n_mfcc: int = N_MFCC,
+        n_fft: int = MFCC_N_FFT,
+        hop_length: int = MFCC_HOP,
+    ) -> None:
+        self.n_mfcc = n_mfcc
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+
+    @property
+    def name(self) -> str:
+        return f"mfcc-stats-{self.n_mfcc}-{self.n_fft}-{self.hop_length}"
+
+    def embed_batch(self, audios: Sequence[np.ndarray], sr: int = TARGET_SR) -> np.ndarray:
+        import librosa
+        from scipy.fft import dct
+
+        if not audios:
+            return np.zeros((0, 2 * (self.n_mfcc - 1)))
+        lengths = np.array([len(audio) for audio in audios])
+        width = max(int(lengths.max()), self.n_fft)
+        batch = np.zeros((len(audios), width), dtype=np.float32)
+        for i, audio in enumerate(audios):
+            batch[i, : len(audio)] = audio
+
+        mel = librosa.feature.melspectrogram(
+            y=batch, sr=sr, n_fft=self.n_fft, hop_length=self.hop_length,
+            n_mels=N_MELS, center=False,
+        )  # (batch, n_mels, frames)
+
+        # Frames lying entirely inside each signal
+        n_valid = np.maximum((lengths - self.n_fft) // self.hop_length + 1, 1)
+        valid = (np.arange(mel.shape[2])[None, :] < n_valid[:, None])[:, None, :]
+
+        # power_to_db(ref=1.0, top_db) with each signal's peak over its own frames
+        log_mel = 10.0 * np.log10(np.maximum(mel, 1e-10))
+        peak = np.max(np.where(valid, log_mel, -np.inf), axis=(1, 2), keepdims=True)
+        log_mel = np.maximum(log_mel, peak - TOP_DB)
+        mfcc = dct(log_mel, axis=1, type=2, norm="ortho")[:, 1:self.n_mfcc, :]
+        counts = n_valid[:, None].astype(np.float64)
+        mean = np.sum(mfcc * valid, axis=2) / counts
+        var = np.sum(((mfcc - mean[:, :, None]) ** 2) * valid, axis=2) / counts
+        return np.concatenate([mean, np.sqrt(var)], axis=1)
+
+
+class EnrollmentCache:
+    """
+    In-memory LRU of enrollment embeddings keyed by file content and embedder.
+
+    Keys combine the SHA-256 of the enrollment file with the embedder name, so
+    renamed copies share an entry and a different embedder never reuses one.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_ENROLLMENT_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._digests: Dict[tuple, str] = {}
+        self._lock = threading.Lock()
+
+    def key(self, path: Path, embedder_name: str) -> str:
+        path = Path(path).resolve()
+        stat = path.stat()
+        stat_key = (str(path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            digest = self._digests.get(stat_key)
+        if digest is None:
+            digest = file_digest(path)
+            with self._lock:
+                self._digests[stat_key] = digest
+        return f"{digest}:{embedder_name}"
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, key: str, embedding: np.ndarray) -> None:
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class BatchSpeakerVerifier:
+    """
+    Speaker verifier that scores candidates in batches against cached enrollments.
+
+    `verify(audio_path, metadata)` keeps the `SpeakerVerifierStub` interface
+    used by `FeedbackOrchestrator`: `audio_path` is the enrollment (original)
+    file and the candidate is `metadata["audio"]` when the perturbation engine
+    returns arrays, else the file at `metadata["output_path"]`. Confidence is
+    the cosine similarity clipped to [0, 1]; it passes at `threshold`.
+    """
+
+    def __init__(
+        self,
+        embedder: Optional[SpeakerEmbedder] = None,
+        threshold: float = DEFAULT_THRESHOLD,
+        sr: int = TARGET_SR,
+        enrollment_cache: Optional[EnrollmentCache] = None,
+    ) -> None:
+        self.embedder = embedder or MFCCStatsEmbedder()
+        self.threshold = threshold
+        self.sr = sr
+        self.enrollments = enrollment_cache or EnrollmentCache()
+
+    def _load(self, path: Path) -> np.ndarray:
+        from analyze_audio import load_audio
+
+        audio, _ = load_audio(str(path), self.sr)
+        return audio
+
+    def enroll(self, audio_path: Path) -> np.ndarray:
+        """Enrollment embedding of audio_path, computed once per file content."""
+        key = self.enrollments.key(audio_path, self.embedder.name)
+        embedding = self.enrollments.get(key)
+        if embedding is None:
+            embedding = self.embedder.embed_batch([self._load(audio_path)], self.sr)[0]
+            self.enrollments.put(key, embedding)
+        return embedding
+
+    def enroll_many(self, audio_paths: Sequence[Path]) -> np.ndarray:
+        """Enrollment embeddings for several files; cache misses are embedded in one batch."""
+        keys = [self.enrollments.key(path, self.embedder.name) for path in audio_paths]
+        embeddings: List[Optional[np.ndarray]] = [self.enrollments.get(key) for key in keys]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            fresh = self.embedder.embed_batch([self._load(audio_paths[i]) for i in missing], self.sr)
+            for i, embedding in zip(missing, fresh):
+                self.enrollments.put(keys[i], embedding)
+                embeddings[i] = embedding
+        return np.stack(embeddings)
+
+    def score_batch(self, audio_path: Path, candidates: Sequence[np.ndarray]) -> np.ndarray:
+        """Cosine similarity of every candidate signal to audio_path's speaker."""
+        if not candidates:
+            return np.zeros(0)
+        reference = self.enroll(audio_path)
+        return cosine_similarity(self.embedder.embed_batch(candidates, self.sr), reference)[:, 0]
+
+    def _candidate_audio(self, metadata: Dict[str, Any]) -> np.ndarray:
+        audio = metadata.get("audio")
+        if audio is not None:
+            return np.asarray(audio, dtype=np.float32)
+        return self._load(Path(metadata["output_path"]))
+
+    def _result(self, similarity: float) -> VerificationResult:
+        confidence = float(np.clip(similarity, 0.0, 1.0))
+        passed = confidence >= self.threshold
+        reasoning = (
+            f"PASS: Voiceprint matches expected speaker (cosine {similarity:.3f})."
+            if passed
+            else f"FAIL: Perturbation distorted key biometric cues (cosine {similarity:.3f})."
+        )
+        return VerificationResult(passed=passed, confidence=confidence, reasoning=reasoning)
+
+    def verify_batch(
+        self, audio_path: Path, metadatas: Sequence[Dict[str, Any]]
+    ) -> List[VerificationResult]:
+        """Verify many perturbations of the same original in one embedding pass."""
+        candidates = [self._candidate_audio(metadata) for metadata in metadatas]
+        return [self._result(score) for score in self.score_batch(audio_path, candidates)]
+
+    def verify(self, audio_path: Path, metadata: Dict[str, Any]) -> VerificationResult:
+        return self.verify_batch(audio_path, [metadata])[0]
+
+
+__all__ = [
+    "BatchSpeakerVerifier",
+    "EnrollmentCache",
+    "MFCCStatsEmbedder",
+    "SpeakerEmbedder",
+    "cosine_similarity",
+]
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+import tracemalloc
+
+from agentic_feedback import (
+    CachedCodecDetector,
+    CachedLLMAgent,
+    CodecDetector,
+    FeedbackOrchestrator,
+    LatencyLLMAgent,
+    PerturbationRequest,
+    StageProfiler,
+)
+
+LATENCY_S = 0.2
+
+
+def _trace(summary):
+    return (
+        summary.success,
+        [(step.iteration, step.perturbation.suggested_parameters, step.verification.confidence,
+          step.feedback) for step in summary.steps],
+    )
+
+
+def _paths(tmp_path, n):
+    paths = []
+    for i in range(n):
+        path = tmp_path / f"clip-{i}.wav"
+        path.touch()
+        paths.append(path)
+    return paths
+
+
+def test_run_batch_async_overlaps_agent_latency(tmp_path):
+    paths = _paths(tmp_path, 8)
+    orchestrator = FeedbackOrchestrator(llm_agent=LatencyLLMAgent(LATENCY_S))
+    expected = {path.resolve(): _trace(orchestrator.run_feedback_loop(path)) for path in paths}
+
+    async def collect():
+        return [summary async for summary in orchestrator.run_batch_async(paths, max_concurrency=len(paths))]
+
+    start = time.perf_counter()
+    summaries = asyncio.run(collect())
+    elapsed = time.perf_counter() - start
+
+    assert {summary.audio_path: _trace(summary) for summary in summaries} == expected
+    # One agent call per iteration; concurrent loops wait out their latency together
+    calls = [len(trace[1]) for trace in expected.values()]
+    assert sum(calls) * LATENCY_S > 2 * max(calls) * LATENCY_S
+    assert elapsed < max(calls) * LATENCY_S + LATENCY_S
+
+
+def test_profiler_traces_memory_only_during_stages(tmp_path):
+    assert not tracemalloc.is_tracing()
+    profiler = StageProfiler(track_memory=True)
+    summary = FeedbackOrchestrator(profiler=profiler).run_feedback_loop(_paths(tmp_path, 1)[0])
+    assert not tracemalloc.is_tracing()
+    assert all(t.memory_delta_kb is not None for t in summary.stage_totals().values())
+
+
+def test_profiler_cpu_time_excludes_other_threads():
+    done = threading.Event()
+
+    def spin():
+        while not done.is_set():
+            pass
+
+    spinner = threading.Thread(target=spin)
+    spinner.start()
+    timings = {}
+    try:
+        with StageProfiler().stage("idle", timings):
+            time.sleep(0.3)
+    finally:
+        done.set()
+        spinner.join()
+    assert timings["idle"].wall_s >= 0.3
+    assert timings["idle"].cpu_s < 0.1
+
+
+def test_codec_cache_saves_in_batches(tmp_path, monkeypatch):
+    cache_path = tmp_path / "codecs.json"
+    paths = _paths(tmp_path, 10)
+    writes = []
+    with CachedCodecDetector(cache_path=cache_path, save_every=4) as detector:
+        monkeypatch.setattr(detector, "save", lambda save=detector.save: (writes.append(1), save()))
+        for path in paths:
+            detector.detect_codec(path)
+            detector.detect_codec(path)
+        assert len(writes) == 2
+    assert len(writes) == 3
+
+    reloaded = CachedCodecDetector(cache_path=cache_path)
+    for path in paths:
+        reloaded.detect_codec(path)
+    assert (reloaded.hits, reloaded.misses) == (10, 0)
+
+
+def test_llm_cache_saves_in_batches_and_off_the_event_loop(tmp_path, monkeypatch):
+    cache_path = tmp_path / "llm.json"
+    paths = _paths(tmp_path, 6)
+    codec = CodecDetector().detect_codec(paths[0])
+    writes = []
+    with CachedLLMAgent(cache_path=cache_path, save_every=4) as agent:
+        save = agent.save
+        monkeypatch.setattr(agent, "save", lambda: (writes.append(threading.get_ident()), save()))
+        for path in paths[:3]:
+            agent.generate_perturbation(path, codec)
+        assert writes == []
+
+        async def generate_rest():
+            loop_thread = threading.get_ident()
+            await agent.generate_batch_async([PerturbationRequest(path, codec) for path in paths[3:]])
+            return loop_thread
+
+        loop_thread = asyncio.run(generate_rest())
+        assert len(writes) == 1 and writes[0] != loop_thread
+    assert len(writes) == 1  # nothing left unsaved on close
+
+    reloaded = CachedLLMAgent(cache_path=cache_path)
+    reloaded.generate_batch([PerturbationRequest(path, codec) for path in paths])
+    assert (reloaded.hits, reloaded.misses) == (6, 0)
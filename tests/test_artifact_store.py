@@ -0,0 +1,25 @@
+from artifact_store import ArtifactStore
+
+
+def _build(store, tmp_path, name):
+    produced = tmp_path / f"{name}.mp3"
+    produced.write_bytes(name.encode())
+    key = f"{name:0<64}"
+    store.add(key, produced, "mp3", ["-b:a", "32k"])
+    output = tmp_path / "out" / f"{name}.mp3"
+    store.materialize(key, output)
+    return output
+
+
+def test_gc_dry_run_reports_what_gc_removes(tmp_path):
+    store = ArtifactStore(tmp_path / "store")
+    kept = _build(store, tmp_path, "a")
+    deleted = _build(store, tmp_path, "b")
+    deleted.unlink()  # its object is now only referenced by a stale link
+
+    planned = store.gc(dry_run=True)
+    assert planned == [store.object_path("b" + "0" * 63, ".mp3")]
+    assert planned[0].exists()
+    assert store.gc() == planned
+    assert not planned[0].exists()
+    assert kept.exists() and store.gc(dry_run=True) == []
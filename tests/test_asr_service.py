@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from asr_service import (
+    ASRService,
+    TinyTemplateASR,
+    TranscriptCache,
+    batch_cer,
+    batch_edit_distance,
+    batch_wer,
+)
+from benchmark import synthetic_speech
+
+SR = 16000
+
+
+def _levenshtein(ref, hyp):
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        previous, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (r != h))
+    return row[-1]
+
+
+class CountingASR(TinyTemplateASR):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def transcribe_batch(self, mels, lengths):
+        self.calls.append(len(mels))
+        return super().transcribe_batch(mels, lengths)
+
+
+def test_batch_edit_distance_matches_reference_dp():
+    rng = np.random.default_rng(0)
+    vocabulary = list("abcde")
+    references = [list(rng.choice(vocabulary, rng.integers(0, 9))) for _ in range(50)]
+    hypotheses = [list(rng.choice(vocabulary, rng.integers(0, 9))) for _ in range(50)]
+    expected = [_levenshtein(r, h) for r, h in zip(references, hypotheses)]
+    np.testing.assert_array_equal(batch_edit_distance(references, hypotheses), expected)
+
+
+def test_batch_wer_and_cer():
+    references = ["the cat sat", "the cat sat", "", ""]
+    hypotheses = ["The cat sat", "the bat", "", "noise"]
+    np.testing.assert_allclose(batch_wer(references, hypotheses), [0.0, 2 / 3, 0.0, 1.0])
+    np.testing.assert_allclose(batch_cer(references, hypotheses), [0.0, 4 / 9, 0.0, 1.0])
+
+
+@pytest.fixture
+def clips():
+    rng = np.random.default_rng(1)
+    speech = synthetic_speech(2.0, SR)
+    return [speech, speech[: SR], speech + 0.05 * rng.standard_normal(len(speech)).astype(np.float32)]
+
+
+def test_transcripts_do_not_depend_on_batch(clips):
+    service = ASRService(TinyTemplateASR())
+    batched = service.transcribe_batch(clips)
+    assert batched == [ASRService(TinyTemplateASR()).transcribe(clip) for clip in clips]
+    assert all(batched)
+
+
+def test_transcript_cache_hits(clips, tmp_path):
+    cache_path = tmp_path / "transcripts.json"
+    model = CountingASR()
+    service = ASRService(model, TranscriptCache(cache_path), batch_size=2)
+
+    first = service.transcribe_batch(clips + [clips[0]])
+    # Duplicates collapse; three distinct clips in batches of two
+    assert model.calls == [2, 1]
+    assert service.transcribe_batch(clips) == first[:3]
+    assert model.calls == [2, 1]
+    assert (service.cache.misses, service.cache.hits) == (4, 3)
+
+    service.cache.save()
+    reloaded = ASRService(model, TranscriptCache(cache_path))
+    assert reloaded.transcribe_batch(clips) == first[:3]
+    assert model.calls == [2, 1]
+    assert reloaded.cache.hits == 3
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from analyze_audio import compute_stoi
+from batch_metrics import batch_stoi, compute_batch_metrics
+from benchmark import synthetic_speech
+
+SR = 16000
+
+
+def _pairs():
+    rng = np.random.default_rng(0)
+    reference = synthetic_speech(2.0, SR)
+    noisy = [reference + (level * rng.standard_normal(len(reference))).astype(np.float32)
+             for level in (0.01, 0.05, 0.2)]
+    # A shorter degraded signal puts one pair in its own (trimmed) group
+    return [(reference, noisy[0]), (reference, noisy[1]), (reference, noisy[2][: SR + 4000])]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_stoi_matches_compute_stoi(workers):
+    pairs = _pairs()
+    expected = [compute_stoi(ref, deg, SR) for ref, deg in pairs]
+    np.testing.assert_allclose(batch_stoi(pairs, SR, workers), expected, atol=1e-9)
+
+
+def test_compute_batch_metrics_reports_stoi():
+    metrics = compute_batch_metrics(_pairs(), SR, include_pesq=False)
+    assert set(metrics) == {"snr", "segmental_snr", "lsd", "stoi"}
+    assert metrics["stoi"][0] > metrics["stoi"][1]
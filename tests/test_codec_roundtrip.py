@@ -0,0 +1,39 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+from codec_roundtrip import encode_decode
+from compress_adversarial_audio import CompressionError
+
+# Stand-in for ffmpeg: the encoder floods stderr (1 MiB, far beyond a pipe
+# buffer) and both ends pass PCM through unchanged.
+FAKE_FFMPEG = f"""#!{sys.executable}
+import shutil, sys
+if "-c:a" in sys.argv:
+    sys.stderr.write("encoder chatter\\n" * 65536)
+    sys.stderr.flush()
+    if "-b:a" in sys.argv and sys.argv[sys.argv.index("-b:a") + 1] == "0k":
+        sys.exit(1)
+shutil.copyfileobj(sys.stdin.buffer, sys.stdout.buffer)
+"""
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    path = tmp_path / "ffmpeg"
+    path.write_text(FAKE_FFMPEG)
+    path.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+
+def test_verbose_encoder_does_not_stall(fake_ffmpeg):
+    audio = np.random.default_rng(0).standard_normal(16000).astype(np.float32)
+    np.testing.assert_array_equal(encode_decode(audio, "mp3", 32, timeout=20), audio)
+
+
+def test_encoder_failure_reports_its_stderr(fake_ffmpeg):
+    audio = np.zeros(1600, dtype=np.float32)
+    with pytest.raises(CompressionError, match="encoder chatter"):
+        encode_decode(audio, "mp3", 0, timeout=20)
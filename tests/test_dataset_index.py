@@ -0,0 +1,89 @@
+import random
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+import dataset_index
+from dataset_index import ParsedName, parse_filename, scan_dataset
+
+SR = 16000
+TYPES = ("short", "long")
+# Six originals per type, 0.1 s to 0.6 s long
+DURATIONS_S = [0.1 * (i + 1) for i in range(6)]
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    root = tmp_path / "dataset"
+    for signal_type in TYPES:
+        for i, duration in enumerate(DURATIONS_S):
+            sample_id = f"{i:06d}"
+            audio = np.zeros(int(duration * SR), dtype=np.float32)
+            path = root / f"{signal_type}-signals" / "Original-examples" / f"sample-{sample_id}.wav"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            sf.write(path, audio, SR)
+            for target in TYPES:
+                path = root / f"{signal_type}-signals" / f"adv-{target}-target" / f"adv-{signal_type}2{target}-{sample_id}.wav"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                sf.write(path, audio, SR)
+    (root / "short-signals" / "Original-examples" / "notes.wav").write_bytes(b"not audio")
+    return root
+
+
+def test_parse_filename():
+    assert parse_filename("sample-000303.wav") == ParsedName("original", None, None, "000303")
+    assert parse_filename("adv-short2long-000303.wav") == ParsedName("adversarial", "short", "long", "000303")
+    for name in ("sample-.wav", "adv-shortlong-000303.wav", "adv-short2long.wav", "notes.wav"):
+        assert parse_filename(name) is None
+
+
+def test_rescan_reuses_unchanged_entries(dataset, monkeypatch):
+    index = scan_dataset(dataset, workers=2)
+    assert len(index) == len(TYPES) * len(DURATIONS_S) * (1 + len(TYPES)) + 1
+    assert index.table.value_counts("error")[None] == len(index) - 1
+    assert len(index.table.where(role=None)) == 1  # notes.wav, kept with its error
+    record = next(r for r in index.table.to_records() if r["path"] == "short-signals/Original-examples/sample-000002.wav")
+    assert record["duration_s"] == pytest.approx(0.3) and record["sr"] == SR
+
+    hashed = []
+    digest = dataset_index.file_digest
+    monkeypatch.setattr(dataset_index, "file_digest", lambda path: (hashed.append(path.name), digest(path))[1])
+    changed = dataset / "long-signals" / "adv-short-target" / "adv-long2short-000004.wav"
+    sf.write(changed, np.ones(SR, dtype=np.float32) * 0.1, SR)
+    rescanned = scan_dataset(dataset, previous=index, workers=2)
+
+    assert hashed == [changed.name]
+    assert rescanned.duration("long-signals/adv-short-target/adv-long2short-000004.wav") == 1.0
+    assert rescanned.table.to_records()[0] == index.table.to_records()[0]
+
+
+def test_duration_sampling_draws_one_original_per_bin(dataset):
+    index = scan_dataset(dataset)
+    per_type = 3
+    for seed in range(5):
+        sampled = index.sample_originals(per_type, "duration", seed=seed)
+        for signal_type in TYPES:
+            durations = sampled.where(signal_type=signal_type)["duration_s"]
+            # Sorted by duration, the six originals fall into bins of two
+            bins = sorted(int(round(d * 10 - 1)) // 2 for d in durations)
+            assert bins == list(range(per_type))
+
+
+def test_schedule_keeps_an_originals_targets_in_one_chunk(dataset):
+    index = scan_dataset(dataset)
+    tasks = index.pair_tasks()
+    random.Random(0).shuffle(tasks)
+    ordered, sizes = index.schedule(tasks, workers=2, chunks_per_worker=2)
+
+    assert sorted(map(tuple, ordered)) == sorted(map(tuple, tasks))
+    assert sum(sizes) == len(tasks) and len(sizes) > 1
+    chunk_of = {}
+    start = 0
+    for chunk, size in enumerate(sizes):
+        for task in ordered[start:start + size]:
+            assert chunk_of.setdefault(task.original_path, chunk) == chunk
+        start += size
+    # Longest originals go out first
+    costs = [index.task_cost(task) for task in ordered]
+    assert costs == sorted(costs, reverse=True)
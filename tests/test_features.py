@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+import analyze_audio
+from analyze_audio import compute_stoi
+from benchmark import synthetic_speech
+from features import FeatureCache, stoi_with_reference
+
+SR = 16000
+
+
+def test_stoi_of_whole_signal_is_exact():
+    reference = synthetic_speech(3.0, SR)
+    degraded = reference + 0.05 * np.random.default_rng(0).standard_normal(len(reference)).astype(np.float32)
+    features = FeatureCache().get(reference, SR)
+    assert stoi_with_reference(features, degraded) == compute_stoi(reference, degraded, SR)
+
+
+def test_stoi_regions_are_exact():
+    reference = synthetic_speech(4.0, SR)
+    rng = np.random.default_rng(1)
+    cache = FeatureCache()
+    for start, stop in [(0, len(reference) - 300), (1203, len(reference)), (77, len(reference) - 5000)]:
+        degraded = reference[start:stop] + 0.02 * rng.standard_normal(stop - start).astype(np.float32)
+        features = cache.get(reference, SR)
+        score = stoi_with_reference(features, degraded, start, stop)
+        assert score == compute_stoi(reference[start:stop], degraded, SR)
+    assert (cache.misses, cache.hits) == (1, 2)
+
+
+@pytest.mark.parametrize("lag", [-1100, -281, -218, -1, 0, 3, 281, 877])
+def test_analyze_sample_pair_stoi_matches_compute_stoi(lag, tmp_path, monkeypatch):
+    monkeypatch.setattr(analyze_audio, "_audio_cache", None)
+    original = synthetic_speech(3.0, SR)
+    noisy = original + 0.05 * np.random.default_rng(2).standard_normal(len(original)).astype(np.float32)
+    # Same length as the original, so the aligned region runs to its end
+    shifted = np.concatenate([np.zeros(lag, np.float32), noisy])[: len(noisy)] if lag >= 0 else \
+        np.concatenate([noisy[-lag:], np.zeros(-lag, np.float32)])
+    sf.write(tmp_path / "orig.wav", original, SR)
+    sf.write(tmp_path / "adv.wav", shifted, SR)
+
+    result = analyze_audio.analyze_sample_pair(str(tmp_path / "orig.wav"), str(tmp_path / "adv.wav"),
+                                               "speech", "short")
+    assert result["error"] is None
+    orig_audio, _ = analyze_audio.load_audio(str(tmp_path / "orig.wav"))
+    adv_audio, _ = analyze_audio.load_audio(str(tmp_path / "adv.wav"))
+    ref, deg, info = analyze_audio.align_signals(orig_audio, adv_audio, SR, return_info=True)
+    assert result["alignment_lag"] == info.lag
+    assert result["stoi"] == compute_stoi(ref, deg, SR)
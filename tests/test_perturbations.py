@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from agentic_feedback import PerturbationInstruction
+from benchmark import synthetic_speech
+from perturbations import FRAME_MS, apply_perturbation, classify_frames, frame_view
+
+SR = 16000
+FRAME_LEN = SR * FRAME_MS // 1000
+FAMILY_CLASS = {
+    "narrowband_noise": "plosive",
+    "phase_jitter": "silence",
+    "quantization_bias": "vowel",
+}
+
+
+@pytest.fixture
+def speech():
+    # A faint noise floor, so silence frames have a phase to jitter; and a
+    # partial trailing frame that no family may touch
+    audio = synthetic_speech(2.0, SR)[: 2 * SR - FRAME_LEN // 2]
+    return audio + 1e-4 * np.random.default_rng(0).standard_normal(len(audio)).astype(np.float32)
+
+
+def _instruction(family, **params):
+    return PerturbationInstruction(f"{family} test", "", "mp3", {"family": family, **params})
+
+
+@pytest.mark.parametrize("family", FAMILY_CLASS)
+def test_family_changes_only_its_frame_class(family, speech):
+    before = speech.copy()
+    perturbed, metadata = apply_perturbation(speech, _instruction(family), SR)
+    np.testing.assert_array_equal(speech, before)
+
+    frames = frame_view(speech, FRAME_LEN)
+    targets = classify_frames(frames)[FAMILY_CLASS[family]]
+    changed = np.any(frame_view(perturbed, FRAME_LEN) != frames, axis=1)
+    assert metadata["applied"] and metadata["family"] == family
+    assert changed.any() and not (changed & ~targets).any()
+    assert metadata["frames_modified"] == targets.sum()
+    np.testing.assert_array_equal(perturbed[len(frames) * FRAME_LEN:], speech[len(frames) * FRAME_LEN:])
+    assert np.isfinite(metadata["snr_db"]) and 0.0 < metadata["stoi"] <= 1.0
+
+
+def test_writeable_frame_view_writes_through_to_its_array_only(speech):
+    before = speech.copy()
+    output = speech.copy()
+    frames = frame_view(speech, FRAME_LEN)
+    out_frames = frame_view(output, FRAME_LEN, writeable=True)
+    out_frames[3] = 0.5
+    assert np.all(output[3 * FRAME_LEN:4 * FRAME_LEN] == 0.5)
+    np.testing.assert_array_equal(speech, before)
+    np.testing.assert_array_equal(frames[3], before[3 * FRAME_LEN:4 * FRAME_LEN])
+    with pytest.raises(ValueError):
+        frames[3] = 0.5
+
+
+def test_same_instruction_and_seed_give_identical_output(speech):
+    for family in FAMILY_CLASS:
+        first, _ = apply_perturbation(speech, _instruction(family, seed=7), SR)
+        again, _ = apply_perturbation(speech, _instruction(family, seed=7), SR)
+        other, _ = apply_perturbation(speech, _instruction(family, seed=8), SR)
+        np.testing.assert_array_equal(first, again)
+        if family != "quantization_bias":  # deterministic, no random draws
+            assert not np.array_equal(first, other)
+
+
+def test_unknown_family_returns_audio_unchanged(speech):
+    instruction = PerturbationInstruction("reverse the tape", "", "mp3", {"family": "tape_reversal"})
+    perturbed, metadata = apply_perturbation(speech, instruction, SR)
+    np.testing.assert_array_equal(perturbed, speech)
+    assert perturbed is not speech
+    assert metadata["family"] is None and not metadata["applied"]
+    assert metadata["frames_modified"] == 0
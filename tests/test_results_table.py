@@ -0,0 +1,96 @@
+import json
+import math
+import statistics
+
+import numpy as np
+import pytest
+
+from results_table import ResultsTable
+
+TYPES = ["short2short", "short2long", "medium2long", None]
+
+
+def _records(n=60, seed=0):
+    rng = np.random.default_rng(seed)
+    records = []
+    for i in range(n):
+        snr = float(rng.normal(20, 5))
+        if i % 7 == 0:
+            snr = None
+        elif i % 11 == 0:
+            snr = float("nan")
+        elif i % 13 == 0:
+            snr = float("inf")
+        records.append({
+            "adversarial_file": f"adv-{i:06d}.wav",
+            "signal_type": TYPES[int(rng.integers(len(TYPES)))],
+            "error": "decode failed" if i % 9 == 0 else None,
+            "snr": snr,
+            "stoi": float(rng.uniform(0.5, 1.0)),
+        })
+    return records
+
+
+def test_missing_values_round_trip(tmp_path):
+    records = _records()
+    table = ResultsTable.from_records(records, ["adversarial_file", "signal_type", "error"], ["snr", "stoi"])
+    path = tmp_path / "results.npz"
+    table.save(path)
+    loaded = ResultsTable.load(path)
+
+    for table_records in (table.to_records(), loaded.to_records()):
+        for got, record in zip(table_records, records):
+            assert got["signal_type"] == record["signal_type"]
+            assert got["error"] == record["error"]
+            assert got["stoi"] == record["stoi"]
+            # None and NaN both read back as missing; inf is kept
+            snr = record["snr"]
+            assert got["snr"] == (None if snr is None or math.isnan(snr) else snr)
+    for name in table.columns:
+        np.testing.assert_array_equal(loaded.data[name], table.data[name])
+    assert loaded["signal_type"].tolist() == [r["signal_type"] or "" for r in records]
+
+
+def test_where_and_rows_match_a_scan():
+    records = _records()
+    table = ResultsTable.from_records(records)
+    for value in TYPES:
+        expected = [i for i, r in enumerate(records) if r["signal_type"] == value]
+        assert table.rows("signal_type", value).tolist() == expected
+        filtered = table.where(signal_type=value, error=None)
+        assert [r["adversarial_file"] for r in filtered.to_records()] == \
+            [r["adversarial_file"] for r in records if r["signal_type"] == value and r["error"] is None]
+    assert table.rows("signal_type", "long2long").tolist() == []
+    assert table.value_counts("signal_type") == {v: sum(r["signal_type"] == v for r in records) for v in TYPES}
+
+
+@pytest.mark.parametrize("metric", ["snr", "stoi"])
+def test_group_by_matches_plain_python(metric):
+    records = _records(seed=1)
+    summary = ResultsTable.from_records(records).group_by("signal_type", [metric])
+    assert set(summary) == {r["signal_type"] for r in records}
+    for group, stats in summary.items():
+        values = [r[metric] for r in records if r["signal_type"] == group
+                  and r[metric] is not None and math.isfinite(r[metric])]
+        expected = {
+            "count": len(values),
+            "mean": statistics.fmean(values) if values else float("nan"),
+            "std": statistics.stdev(values) if len(values) > 1 else 0.0,
+            "min": min(values, default=float("nan")),
+            "max": max(values, default=float("nan")),
+        }
+        assert stats[metric] == pytest.approx(expected, rel=1e-9, nan_ok=True)
+
+
+def test_from_results_splits_pair_types(tmp_path):
+    path = tmp_path / "results.jsonl"
+    lines = [
+        {"adversarial_file": "adv-short2long-000001.wav", "signal_type": "short2long", "snr": 12.5},
+        {"adversarial_file": "adv-medium2short-000002.wav", "signal_type": "medium2short", "error": "boom"},
+    ]
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines))
+    table = ResultsTable.from_results(path)
+    assert table["source_type"].tolist() == ["short", "medium"]
+    assert table["target_type"].tolist() == ["long", "short"]
+    assert [r["adversarial_file"] for r in table.valid().to_records()] == ["adv-short2long-000001.wav"]
+    assert np.isnan(table["pesq"]).all()
@@ -0,0 +1,44 @@
+import numpy as np
+import soundfile as sf
+
+import analyze_audio
+from speaker_verification import BatchSpeakerVerifier, MFCCStatsEmbedder
+
+SR = 16000
+
+
+def _clips():
+    rng = np.random.default_rng(0)
+    quiet = (0.01 * rng.standard_normal(SR)).astype(np.float32)
+    loud = (0.5 * rng.standard_normal(2 * SR)).astype(np.float32)
+    return quiet, loud
+
+
+def test_embedding_does_not_depend_on_batch():
+    quiet, loud = _clips()
+    embedder = MFCCStatsEmbedder()
+    alone = embedder.embed_batch([quiet], SR)[0]
+    batched = embedder.embed_batch([loud, quiet], SR)[1]
+    np.testing.assert_allclose(batched, alone, atol=1e-5)
+
+
+def test_embedding_is_gain_invariant():
+    quiet, _ = _clips()
+    embedder = MFCCStatsEmbedder()
+    np.testing.assert_allclose(embedder.embed_batch([4 * quiet], SR)[0],
+                               embedder.embed_batch([quiet], SR)[0], atol=1e-5)
+
+
+def test_verify_matches_verify_batch(tmp_path, monkeypatch):
+    quiet, loud = _clips()
+    enrollment = tmp_path / "original.wav"
+    sf.write(enrollment, quiet, SR)
+    monkeypatch.setattr(analyze_audio, "_audio_cache", None)
+
+    verifier = BatchSpeakerVerifier()
+    candidates = [{"audio": quiet * 0.9}, {"audio": loud}]
+    batched = verifier.verify_batch(enrollment, candidates)
+    single = [verifier.verify(enrollment, candidate) for candidate in candidates]
+    for a, b in zip(batched, single):
+        assert a.passed == b.passed
+        assert abs(a.confidence - b.confidence) < 1e-6
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+import analyze_audio
+from benchmark import synthetic_speech
+from streaming import analyze_sample_pair_streaming
+
+SR = 16000
+LAG = 437
+
+
+@pytest.mark.parametrize("lag", [LAG, -LAG])
+def test_streaming_matches_in_memory_analysis(lag, tmp_path, monkeypatch):
+    monkeypatch.setattr(analyze_audio, "_audio_cache", None)
+    original = synthetic_speech(3.0, SR)
+    noisy = original + 0.02 * np.random.default_rng(0).standard_normal(len(original)).astype(np.float32)
+    shifted = np.concatenate([np.zeros(lag, np.float32), noisy]) if lag >= 0 else noisy[-lag:]
+    orig_path, adv_path = str(tmp_path / "orig.wav"), str(tmp_path / "adv.wav")
+    sf.write(orig_path, original, SR)
+    sf.write(adv_path, shifted, SR)
+
+    expected = analyze_audio.analyze_sample_pair(orig_path, adv_path, "short", "short")
+    # Blocks far smaller than the file, so the aligned streams span many of them
+    streamed = analyze_sample_pair_streaming(orig_path, adv_path, "short", "short", block_frames=4096)
+
+    assert expected["error"] is None and streamed["error"] is None
+    assert streamed["alignment_lag"] == expected["alignment_lag"] == lag
+    assert streamed["snr"] == pytest.approx(expected["snr"], abs=1e-4)
+    assert streamed["stoi"] == pytest.approx(expected["stoi"], abs=1e-6)
@@ -0,0 +1,67 @@
+import multiprocessing
+import sqlite3
+import time
+
+from work_queue import WorkQueue, run_nodes, run_worker
+
+LEASE_S = 1.0
+N_JOBS = 40
+
+
+def _flaky(payload):
+    """Fails every seventh job for good, and the rest after a short pause."""
+    if payload["n"] % 7 == 3:
+        raise RuntimeError(f"job {payload['n']} is broken")
+    time.sleep(0.01)
+    return payload["n"] ** 2
+
+
+def _stall(payload):
+    time.sleep(60)
+
+
+def _attempts(path, key):
+    with sqlite3.connect(str(path)) as db:
+        return db.execute("SELECT attempts FROM jobs WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_nodes_drain_queue_and_recover_killed_worker(tmp_path):
+    path = tmp_path / "queue.sqlite"
+    queue = WorkQueue(path, "test", lease_s=LEASE_S, max_attempts=2)
+    assert queue.enqueue((f"job-{n}", {"n": n}, 1.0) for n in range(N_JOBS)) == N_JOBS
+
+    # A worker that takes the first job and is killed while holding its lease
+    stalled = multiprocessing.Process(
+        target=run_worker, args=(path, "test", _stall),
+        kwargs={"worker_id": "stalled", "lease_s": LEASE_S, "max_attempts": 2},
+    )
+    stalled.start()
+    deadline = time.time() + 30
+    while queue.counts()["leased"] == 0:
+        assert time.time() < deadline
+        time.sleep(0.05)
+    stalled.kill()
+    stalled.join()
+
+    run_nodes(path, "test", _flaky, 4, lease_s=LEASE_S, max_attempts=2, poll_s=0.1)
+
+    counts = queue.counts()
+    assert counts["pending"] == counts["leased"] == 0
+    results = {key: (status, result) for key, status, _, result, _ in queue.results()}
+    assert len(results) == N_JOBS
+    for n in range(N_JOBS):
+        status, result = results[f"job-{n}"]
+        if n % 7 == 3:
+            assert status == "failed"
+        else:
+            assert (status, result) == ("done", n ** 2)
+
+    # The killed worker's lease expired and another node picked the job up
+    assert results["job-0"] == ("done", 0)
+    assert _attempts(path, "job-0") == 2
+
+    workers = {w["id"]: w for w in queue.progress()["workers"]}
+    assert not workers["stalled"]["alive"] and not workers["stalled"]["exited"]
+    others = [w for worker_id, w in workers.items() if worker_id != "stalled"]
+    assert len(others) == 4
+    assert all(w["exited"] and not w["alive"] for w in others)
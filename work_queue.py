@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Leased work queue for spreading pair analysis and compression over nodes.
+
+`analyze_audio.main` and `compress_adversarial_audio.main` each iterate one
+list in one process on one machine. Here the list becomes rows of a SQLite
+database that every node opens (a local file for several processes on one
+box, or a file on a shared filesystem with working POSIX locks for several
+hosts). Workers claim jobs by taking a lease:
+
+* `lease` atomically moves the oldest pending jobs to `leased`, stamping the
+  worker id and an expiry `lease_s` seconds out, and counts the attempt.
+* A heartbeat thread in `run_worker` extends the leases of the jobs it is
+  still working on, and records the worker as alive; a worker that returns
+  records its exit (`retire`).
+* A worker that dies stops heartbeating; once its leases expire the next
+  `lease` call by any worker re-queues them (or marks them failed after
+  `max_attempts`).
+* `complete` / `fail` only apply while the caller still owns the lease, so a
+  worker that lost its lease (e.g. stalled past expiry) cannot overwrite the
+  result of the worker that picked the job up after it.
+
+Enqueueing is idempotent on (queue, key), so every node can seed the same
+plan and then start working. Results are stored with their jobs as JSON, and
+`progress` aggregates counts, audio cost and per-worker throughput across
+all nodes. Lease expiry compares wall-clock times, so hosts need roughly
+synchronized clocks (well within `lease_s`).
+
+    python work_queue.py --db analysis_queue.sqlite [--queue analysis] [--retry-failed]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+# Configuration
+DEFAULT_LEASE_S = 120.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_POLL_S = 2.0
+BUSY_TIMEOUT_S = 60.0
+JOB_STATUSES = ("pending", "leased", "done", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    queue TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    cost REAL NOT NULL DEFAULT 1.0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    updated REAL NOT NULL,
+    UNIQUE (queue, key)
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (queue, status, id);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    queue TEXT NOT NULL,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    started REAL NOT NULL,
+    heartbeat REAL NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    exited REAL
+);
+"""
+
+
+class Lease(NamedTuple):
+    """A job claimed by a worker until `expires` (unless extended)."""
+
+    id: int
+    key: str
+    payload: Any
+    attempt: int
+    expires: float
+
+
+def default_worker_id(suffix: str = "") -> str:
+    """Unique-per-process worker id: <host>:<pid>[:suffix]."""
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    return f"{worker_id}:{suffix}" if suffix else worker_id
+
+
+class WorkQueue:
+    """
+    SQLite-backed queue of JSON jobs with leases, shared by many processes.
+
+    Each call opens its own short-lived connection and state-changing calls
+    run inside `BEGIN IMMEDIATE` transactions, so one instance may be used
+    from several threads and any number of processes/hosts may share the file.
+    """
+
+    def __init__(self, path: Path, name: str = "default", lease_s: float = DEFAULT_LEASE_S,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> None:
+        self.path = Path(path)
+        self.name = name
+        self.lease_s = lease_s
+        self.max_attempts = max(1, max_attempts)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+            columns = {row[1] for row in db.execute("PRAGMA table_info(workers)")}
+            if "exited" not in columns:
+                # Databases created before workers recorded their exit
+                db.execute("ALTER TABLE workers ADD COLUMN exited REAL")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        db = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT_S, isolation_level=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    # -- producers ----------------------------------------------------------
+
+    def enqueue(self, jobs: Iterable[Tuple[str, Any, float]]) -> int:
+        """
+        Add (key, payload, cost) jobs in order; keys already queued are left alone.
+
+        Returns the number of new jobs. `cost` is any additive work measure
+        (e.g. seconds of audio) used for progress reporting.
+        """
+        now = time.time()
+        rows = [(self.name, key, json.dumps(payload), float(cost), now) for key, payload, cost in jobs]
+        with self._transaction() as db:
+            before = db.total_changes
+            db.executemany(
+                "INSERT OR IGNORE INTO jobs (queue, key, payload, cost, updated) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            return db.total_changes - before
+
+    def retry_failed(self) -> int:
+        """Move failed jobs back to pending with a fresh attempt budget."""
+        with self._transaction() as db:
+            return db.execute(
+                "UPDATE jobs SET status = 'pending', attempts = 0, updated = ? "
+                "WHERE queue = ? AND status = 'failed'",
+                (time.time(), self.name),
+            ).rowcount
+
+    # -- workers ------------------------------------------------------------
+
+    def register(self, worker_id: str) -> None:
+        now = time.time()
+        host, pid = socket.gethostname(), os.getpid()
+        with self._transaction() as db:
+            db.execute(
+                "INSERT INTO workers (id, queue, host, pid, started, heartbeat) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET heartbeat = excluded.heartbeat, exited = NULL",
+                (worker_id, self.name, host, pid, now, now),
+            )
+
+    def retire(self, worker_id: str) -> None:
+        """Record that the worker exited, so progress stops counting it as alive."""
+        now = time.time()
+        with self._transaction() as db:
+            db.execute("UPDATE workers SET heartbeat = ?, exited = ? WHERE id = ?",
+                       (now, now, worker_id))
+
+    def _expire(self, db: sqlite3.Connection, now: float) -> int:
+        """Re-queue (or fail, once out of attempts) leases that ran out."""
+        return db.execute(
+            "UPDATE jobs SET "
+            "status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "error = CASE WHEN attempts >= ? THEN 'Lease expired after ' || attempts || ' attempt(s)' "
+            "ELSE error END, "
+            "lease_owner = NULL, lease_expires = NULL, updated = ? "
+            "WHERE queue = ? AND status = 'leased' AND lease_expires < ?",
+            (self.max_attempts, self.max_attempts, now, self.name, now),
+        ).rowcount
+
+    def requeue_expired(self) -> int:
+        """Apply lease expiry now; `lease` also does this on every call."""
+        with self._transaction() as db:
+            return self._expire(db, time.time())
+
+    def lease(self, worker_id: str, n: int = 1) -> List[Lease]:
+        """Claim up to n pending jobs (oldest first) for lease_s seconds."""
+        with self._transaction() as db:
+            now = time.time()
+            self._expire(db, now)
+            rows = db.execute(
+                "SELECT id, key, payload, attempts FROM jobs "
+                "WHERE queue = ? AND status = 'pending' ORDER BY id LIMIT ?",
+                (self.name, max(1, n)),
+            ).fetchall()
+            expires = now + self.lease_s
+            db.executemany(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated = ? WHERE id = ?",
+                [(worker_id, expires, now, job_id) for job_id, _, _, _ in rows],
+            )
+        return [Lease(job_id, key, json.loads(payload), attempts + 1, expires)
+                for job_id, key, payload, attempts in rows]
+
+    def heartbeat(self, worker_id: str, job_ids: Sequence[int] = ()) -> List[int]:
+        """Mark the worker alive and extend its leases on job_ids; returns the ids it still holds."""
+        now = time.time()
+        with self._transaction() as db:
+            db.execute("UPDATE workers SET heartbeat = ? WHERE id = ?", (now, worker_id))
+            held = []
+            for job_id in job_ids:
+                updated = db.execute(
+                    "UPDATE jobs SET lease_expires = ?, updated = ? "
+                    "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                    (now + self.lease_s, now, job_id, worker_id),
+                ).rowcount
+                if updated:
+                    held.append(job_id)
+            return held
+
+    def complete(self, worker_id: str, lease: Lease, result: Any) -> bool:
+        """Store a job's result; False if the worker no longer held the lease."""
+        now = time.time()
+        with self._transaction() as db:
+            updated = db.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_owner = NULL, "
+                "lease_expires = NULL, updated = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (json.dumps(result), now, lease.id, worker_id),
+            ).rowcount
+            if updated:
+                db.execute("UPDATE workers SET done = done + 1, heartbeat = ? WHERE id = ?", (now, worker_id))
+            return bool(updated)
+
+    def fail(self, worker_id: str, lease: Lease, error: str) -> bool:
+        """Record a failed attempt: back to pending, or failed once out of attempts."""
+        now = time.time()
+        with self._transaction() as db:
+            updated = db.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, lease_owner = NULL, lease_expires = NULL, updated = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (self.max_attempts, error, now, lease.id, worker_id),
+            ).rowcount
+            if updated:
+                db.execute("UPDATE workers SET failed = failed + 1, heartbeat = ? WHERE id = ?",
+                           (now, worker_id))
+            return bool(updated)
+
+    # -- reporting ----------------------------------------------------------
+
+    def counts(self) -> Dict[str, int]:
+        """Jobs per status."""
+        with self._connect() as db:
+            rows = db.execute("SELECT status, COUNT(*) FROM jobs WHERE queue = ? GROUP BY status",
+                              (self.name,)).fetchall()
+        counts = {status: 0 for status in JOB_STATUSES}
+        counts.update(dict(rows))
+        return counts
+
+    def drained(self) -> bool:
+        """True once no job is pending or leased."""
+        counts = self.counts()
+        return counts["pending"] == 0 and counts["leased"] == 0
+
+    def progress(self) -> Dict[str, Any]:
+        """Counts and cost per status plus per-worker activity, across all nodes."""
+        now = time.time()
+        with self._connect() as db:
+            by_status = db.execute(
+                "SELECT status, COUNT(*), COALESCE(SUM(cost), 0) FROM jobs WHERE queue = ? GROUP BY status",
+                (self.name,),
+            ).fetchall()
+            workers = db.execute(
+                "SELECT id, host, started, heartbeat, exited, done, failed FROM workers "
+                "WHERE queue = ? ORDER BY started",
+                (self.name,),
+            ).fetchall()
+        counts = {status: 0 for status in JOB_STATUSES}
+        cost = {status: 0.0 for status in JOB_STATUSES}
+        for status, count, total in by_status:
+            counts[status], cost[status] = count, total
+        return {
+            "queue": self.name,
+            "counts": counts,
+            "cost": cost,
+            "total": sum(counts.values()),
+            "workers": [
+                {
+                    "id": worker_id,
+                    "host": host,
+                    "alive": exited is None and now - heartbeat < self.lease_s,
+                    "exited": exited is not None,
+                    "done": done,
+                    "failed": failed,
+                    "jobs_per_min": 60 * done / max(heartbeat - started, 1e-9) if done else 0.0,
+                }
+                for worker_id, host, started, heartbeat, exited, done, failed in workers
+            ],
+        }
+
+    def results(self) -> Iterator[Tuple[str, str, Any, Any, Optional[str]]]:
+        """(key, status, payload, result, error) of every finished job in enqueue order."""
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT key, status, payload, result, error FROM jobs "
+                "WHERE queue = ? AND status IN ('done', 'failed') ORDER BY id",
+                (self.name,),
+            )
+            for key, status, payload, result, error in rows:
+                yield (key, status, json.loads(payload),
+                       json.loads(result) if result is not None else None, error)
+
+
+def format_progress(progress: Dict[str, Any]) -> str:
+    """Human-readable summary of `WorkQueue.progress`."""
+    counts, cost = progress["counts"], progress["cost"]
+    total_cost = sum(cost.values())
+    lines = [
+        f"{progress['queue']}: {counts['done']}/{progress['total']} done, {counts['leased']} leased, "
+        f"{counts['pending']} pending, {counts['failed']} failed"
+        + (f" ({cost['done'] / total_cost:.0%} of work)" if total_cost else ""),
+    ]
+    alive = [w for w in progress["workers"] if w["alive"]]
+    lines.append(f"  workers: {len(alive)} alive of {len(progress['workers'])} seen "
+                 f"on {len({w['host'] for w in alive})} host(s)")
+    for worker in progress["workers"]:
+        state = "alive" if worker["alive"] else "exited" if worker["exited"] else "gone"
+        lines.append(f"  {worker['id']:<32}{state:>6}{worker['done']:>7} done{worker['failed']:>5} failed"
+                     f"{worker['jobs_per_min']:>9.1f}/min")
+    return "\n".join(lines)
+
+
+def run_worker(
+    path: Path,
+    queue_name: str,
+    handler: Callable[[Any], Any],
+    worker_id: Optional[str] = None,
+    batch: int = 1,
+    lease_s: float = DEFAULT_LEASE_S,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    poll_s: float = DEFAULT_POLL_S,
+    initializer: Optional[Callable[..., None]] = None,
+    initargs: Tuple = (),
+) -> Dict[str, int]:
+    """
+    Lease and run jobs until the queue is drained; returns this worker's counts.
+
+    `handler(payload)` returns the JSON-serializable result; an exception
+    counts as a failed attempt. While other workers still hold leases the
+    loop keeps polling, so it picks up their jobs if they die. Module-level
+    handlers and initializers can be run in spawned processes (`run_nodes`).
+    """
+    if initializer is not None:
+        initializer(*initargs)
+    queue = WorkQueue(path, queue_name, lease_s, max_attempts)
+    worker_id = worker_id or default_worker_id()
+    queue.register(worker_id)
+
+    held: Dict[int, Lease] = {}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(lease_s / 3):
+            with lock:
+                job_ids = list(held)
+            try:
+                queue.heartbeat(worker_id, job_ids)
+            except sqlite3.Error:
+                pass  # transient (e.g. locked); the next beat retries well before expiry
+
+    heartbeat = threading.Thread(target=beat, name=f"heartbeat-{worker_id}", daemon=True)
+    heartbeat.start()
+    stats = {"done": 0, "failed": 0, "lost": 0}
+    try:
+        while True:
+            leases = queue.lease(worker_id, batch)
+            if not leases:
+                if queue.drained():
+                    break
+                time.sleep(poll_s)
+                continue
+            with lock:
+                held.update((lease.id, lease) for lease in leases)
+            for lease in leases:
+                try:
+                    result = handler(lease.payload)
+                except Exception as e:
+                    recorded = queue.fail(worker_id, lease, f"{type(e).__name__}: {e}")
+                    stats["failed" if recorded else "lost"] += 1
+                else:
+                    recorded = queue.complete(worker_id, lease, result)
+                    stats["done" if recorded else "lost"] += 1
+                with lock:
+                    held.pop(lease.id, None)
+    finally:
+        stop.set()
+        heartbeat.join()
+        try:
+            queue.retire(worker_id)
+        except sqlite3.Error:
+            pass  # then it shows as gone once its heartbeat is lease_s old
+    return stats
+
+
+def run_nodes(path: Path, queue_name: str, handler: Callable[[Any], Any], count: int,
+              threads: bool = False, **worker_kwargs: Any) -> None:
+    """
+    Run `count` workers on this host until the queue drains.
+
+    Processes (the default) are independent: one dying, even natively,
+    only leaves its leases to expire and be picked up by the others. Use
+    threads for handlers that mostly wait on subprocesses (ffmpeg).
+    """
+    if threads:
+        workers = [
+            threading.Thread(target=run_worker, args=(path, queue_name, handler),
+                             kwargs={**worker_kwargs, "worker_id": default_worker_id(f"t{i}")})
+            for i in range(count)
+        ]
+    else:
+        workers = [
+            multiprocessing.Process(target=run_worker, args=(path, queue_name, handler),
+                                    kwargs=worker_kwargs)
+            for _ in range(count)
+        ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+__all__ = [
+    "Lease",
+    "WorkQueue",
+    "default_worker_id",
+    "format_progress",
+    "run_nodes",
+    "run_worker",
+]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="Queue database shared by the nodes")
+    parser.add_argument("--queue", default="analysis", help="Queue name within the database")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Re-queue failed jobs with a fresh attempt budget")
+    parser.add_argument("--requeue-expired", action="store_true",
+                        help="Re-queue jobs whose leases have expired now")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        raise SystemExit(f"Error: {args.db} not found!")
+    queue = WorkQueue(args.db, args.queue)
+    if args.requeue_expired:
+        print(f"Re-queued {queue.requeue_expired()} expired lease(s).")
+    if args.retry_failed:
+        print(f"Re-queued {queue.retry_failed()} failed job(s).")
+    print(format_progress(queue.progress()))
+